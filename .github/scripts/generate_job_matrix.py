@@ -19,7 +19,7 @@
 
 from os import environ
 from sys import argv as sys_argv, exit as sys_exit
-from fpgaperf import get_combinations, get_projects, get_project, toolchains
+from fpgaperf import get_catalog, get_combinations, toolchains
 
 if len(sys_argv) < 2:
     print("Usage {} <tool>".format(sys_argv[0]))
@@ -30,9 +30,9 @@ tools = sys_argv[1:]
 all_toolchains = "all" in tools
 
 jobs = dict()
-combinations = get_combinations()
-for project_file in get_projects():
-    project_dict = get_project(project_file)
+catalog = get_catalog()
+combinations = set(get_combinations())
+for project_file, project_dict in catalog.projects.items():
     project_name = project_dict["name"]
 
     for toolchain in toolchains.keys():
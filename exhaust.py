@@ -28,10 +28,12 @@ from terminaltables import AsciiTable
 from termcolor import colored
 from multiprocessing import cpu_count
 
+from utils.abort import check_abort_policy
 from utils.utils import safe_get_dict_value
 
 from infrastructure.tasks import Tasks
 from infrastructure.runner import Runner
+from infrastructure.distributed import Coordinator, Worker
 from infrastructure.tool_parameters import ToolParametersHelper
 from fpgaperf import get_project_names, get_toolchains, get_boards
 
@@ -74,11 +76,11 @@ def print_summary_table(
     failed_required_tests = []
     for build in sorted(builds):
         # Split directory name into columns
-        # Example: oneblink_vpr_xc7_a35tcsg326-1_arty_generic-build_0_options
+        # Example: oneblink_vpr_xc7_a35tcsg326-1_arty_generic-build_0_options_<task id>
         pattern = ''
         for i in range(0, len(table_data[0]) - 1):
             pattern += '([^_]*)_?'
-        pattern += '(.*)'
+        pattern += '(.*?)(?:_?[0-9a-f]{12})?$'
 
         row = list(re.match(pattern, build).groups())
 
@@ -94,26 +96,34 @@ def print_summary_table(
             continue
 
         # Check if metadata was generated
-        # It is created for successful builds only
-        with open(os.path.join(root_dir, out_prefix, build,
-                               'meta.json')) as meta:
-            meta_data = json.load(meta)
-            if meta_data["status"] == "succeeded":
-                row.append(colored('passed', 'green'))
-                passed += 1
+        # It is missing if the task was killed before writing it
+        meta_path = os.path.join(root_dir, out_prefix, build, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as meta:
+                status = json.load(meta)["status"]
+        else:
+            status = "failed"
+
+        if status == "succeeded":
+            row.append(colored('passed', 'green'))
+            passed += 1
+        elif status in ["cancelled", "aborted"]:
+            # Stopped by --fail-fast or given up on by an abort policy,
+            # neither passed nor failed
+            row.append(colored(status, 'yellow'))
+        else:
+            assert status in ["failed", "timeout"]
+            if is_required:
+                row.append(colored(status, 'red'))
+
+                build_status = False
+                failed_required_tests.append(
+                    "{} {} {}".format(row[0], row[1], row[4])
+                )
             else:
-                assert meta_data["status"] == "failed"
-                if is_required:
-                    row.append(colored('failed', 'red'))
+                row.append(colored('allowed to fail', 'blue'))
 
-                    build_status = False
-                    failed_required_tests.append(
-                        "{} {} {}".format(row[0], row[1], row[4])
-                    )
-                else:
-                    row.append(colored('allowed to fail', 'blue'))
-
-                failed += 1
+            failed += 1
 
         table_data.append(row)
         build_count += 1
@@ -183,6 +193,12 @@ def parse_args():
         help="Run configuration file in YAML format."
     )
     parser.add_argument('--fail', action='store_true', help='fail on error')
+    parser.add_argument(
+        '--fail-fast',
+        action='store_true',
+        help=
+        'Cancel the remaining tasks as soon as a required task fails (implies --fail)'
+    )
     parser.add_argument(
         '--verbose', action='store_true', help='verbose output'
     )
@@ -191,6 +207,12 @@ def parse_args():
         action='store_true',
         help='deletes previous exhuast builds before running'
     )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help=
+        'skips the tasks that already succeeded with the same inputs (sources, constraints, parameters, seed and tool versions)'
+    )
     parser.add_argument(
         '--only_required',
         action='store_true',
@@ -200,7 +222,105 @@ def parse_args():
         '--num-cpu',
         default=cpu_count(),
         type=int,
-        help='Number of CPUs to use in parallel to run the tests'
+        help=
+        'Number of physical cores to use in parallel to run the tests (multi-threaded toolchains reserve several cores)'
+    )
+    parser.add_argument(
+        '--max-mem',
+        default=None,
+        type=int,
+        help=
+        'Memory budget in MiB: a task is started only if its predicted peak memory use fits'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        help=
+        'Directory of the build cache: tasks with the same inputs as a cached build reuse its results'
+    )
+    parser.add_argument(
+        '--cache-size',
+        default=None,
+        type=int,
+        help=
+        'Maximum size of the build cache in MiB, least recently used builds are evicted first'
+    )
+    parser.add_argument(
+        '--share-synthesis',
+        action='store_true',
+        help=
+        'Synthesize each project, toolchain and board once and share the netlist between seeds, build numbers and parameters'
+    )
+    parser.add_argument(
+        '--scratch-dir',
+        default=None,
+        help=
+        'Run the tasks in SCRATCH_DIR (e.g. a tmpfs) and copy them back to the output prefix once done: all of each task without --prune or if it failed, only the files kept by the policy of --prune otherwise'
+    )
+    parser.add_argument(
+        '--prune',
+        action='store_true',
+        help=
+        'Delete or compress the intermediate files of the successful tasks, following the policy of the build type in assets/prune.yaml'
+    )
+    parser.add_argument(
+        '--progress',
+        default=None,
+        type=int,
+        metavar='SECONDS',
+        help=
+        'Follow the logs of the running tasks and print their progress (stage, router iteration, overused nodes) every SECONDS'
+    )
+    parser.add_argument(
+        '--abort-policy',
+        action='append',
+        type=check_abort_policy,
+        metavar='POLICY:VALUE',
+        help=
+        'Abort the tasks whose routing is hopeless, with the aborted status: stall:K if the overused nodes did not improve for K router iterations, cpd:X if the critical path is X%% longer than the best one of the finished tasks of the same project, toolchain and board (can be given several times)'
+    )
+    parser.add_argument(
+        '--stage-chipdb',
+        default=None,
+        metavar='DIR',
+        help=
+        'Copy the chip databases needed by the tasks once to DIR (e.g. a tmpfs) and load them from there'
+    )
+    parser.add_argument(
+        '--chipdb-cache',
+        default=None,
+        choices=['cold', 'warm'],
+        help=
+        'Evict the chip databases from the page cache (cold) or load them into it (warm) before each task'
+    )
+    parser.add_argument(
+        '--shard',
+        default=None,
+        metavar='I/N',
+        help=
+        'Run only the I-th of N shards of the tasks, balanced by the runtime of previous runs'
+    )
+    parser.add_argument(
+        '--history',
+        default=None,
+        action='append',
+        metavar='FILE',
+        help=
+        'Estimate the runtimes from the given results-*.json.gz or dataframe.json files instead of the ones of the output prefix, e.g. to compute the same shards on all the machines (can be given several times)'
+    )
+    parser.add_argument(
+        '--coordinator',
+        default=None,
+        metavar='ADDRESS',
+        help=
+        'Serve the tasks to worker agents on ADDRESS (<host>:<port> or unix:<path>) instead of running them'
+    )
+    parser.add_argument(
+        '--worker',
+        default=None,
+        metavar='ADDRESS',
+        help=
+        'Run as a worker agent pulling tasks from the coordinator at ADDRESS'
     )
     parser.add_argument(
         '--timeout',
@@ -227,8 +347,32 @@ def main():
         logger.setLevel(logging.DEBUG)
     logger.debug("Parsing Arguments")
 
+    num_cpu = min(args.num_cpu, cpu_count())
+
+    if args.worker:
+        # The build settings are received from the coordinator
+        runner = Runner(
+            [],
+            args.verbose,
+            args.out_prefix,
+            root_dir,
+            args.build_type, [],
+            False,
+            num_cpu,
+            cache_dir=args.cache_dir,
+            cache_size=args.cache_size,
+            scratch_dir=os.path.abspath(args.scratch_dir)
+            if args.scratch_dir else None
+        )
+        Worker(args.worker, runner).run()
+        return
+
     tasks = Tasks(root_dir + '/src')
 
+    assert not (
+        args.overwrite and args.resume
+    ), "--overwrite and --resume are mutually exclusive."
+
     assert args.run_config is None or args.run_config and not (
         args.project or args.toolchain
     )
@@ -276,23 +420,42 @@ def main():
             params_strings.append(" ".join(params))
 
     logger.debug("Getting Tasks")
-    required_task_list = [
-        (task[0], task[1], task[2]) for task in
-        tasks.get_tasks(args_dict, seeds, build_numbers, params_strings, True)
-    ]
-    task_list = tasks.get_tasks(
+    required_tasks = tasks.iter_tasks(
+        args_dict, seeds, build_numbers, params_strings, True
+    )
+    required_task_list = set(
+        (task.project, task.toolchain, task.board) for task in required_tasks
+    )
+    task_list = tasks.iter_tasks(
         args_dict, seeds, build_numbers, params_strings, args.only_required
     )
-
-    num_cpu = min(args.num_cpu, cpu_count())
+    combinations = set(
+        tasks.select_combinations(args_dict, args.only_required)
+    )
 
     runner = Runner(
         task_list, args.verbose, args.out_prefix, root_dir, args.build_type,
-        build_numbers, args.overwrite, num_cpu, args.timeout
+        build_numbers, args.overwrite, num_cpu, args.timeout, args.max_mem,
+        args.resume, args.fail_fast, args.cache_dir, args.cache_size,
+        args.share_synthesis,
+        os.path.abspath(args.stage_chipdb) if args.stage_chipdb else None,
+        args.chipdb_cache, args.prune,
+        os.path.abspath(args.scratch_dir) if args.scratch_dir else None,
+        args.progress, args.abort_policy, args.history, combinations
     )
 
+    if args.shard:
+        shard_index, shard_count = [int(x) for x in args.shard.split('/')]
+        assert 1 <= shard_index <= shard_count, "Invalid shard {}".format(
+            args.shard
+        )
+        runner.select_shard(shard_index, shard_count)
+
     logger.debug("Running Projects")
-    runner.run()
+    if args.coordinator:
+        Coordinator(args.coordinator, runner).run()
+    else:
+        runner.run()
 
     logger.debug("Merging results data")
     runner.merge_results()
@@ -302,8 +465,11 @@ def main():
         args.out_prefix, args.project, args.toolchain, args.board,
         args.build_type, required_task_list, args.build
     )
+    runner.print_makespan()
+    runner.print_staging()
+    runner.print_cancelled()
 
-    if not result and args.fail:
+    if not result and (args.fail or args.fail_fast):
         print("ERROR: Some required tests have failed.")
         for failed_required_test in failed_required_tests:
             print(failed_required_test)
@@ -17,14 +17,13 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import copy
 import glob
 import logging
-from pathlib import Path
 import os
 import re
 import signal
 import sys
-import yaml
 from terminaltables import AsciiTable
 
 from toolchains.icestorm import NextpnrIcestorm
@@ -39,6 +38,12 @@ from toolchains.vivado import (
 from toolchains.f4pga import VPR, Quicklogic
 from toolchains.fasm2bels import VPRFasm2Bels, NextpnrXilinxFasm2Bels
 from toolchains.radiant import RadiantSynpro, RadiantLSE
+from utils.abort import EarlyAbort, RunAborted, check_abort_policy, get_abort_policies
+from utils.artifacts import get_prune_policy, prune_directory
+from utils.cache import BuildCache
+from utils.catalog import load_catalog
+from utils.proc import terminate_children
+from utils.progress import ProgressMonitor
 
 # to find data files
 root_dir = os.path.dirname(os.path.abspath(__file__))
@@ -103,6 +108,8 @@ def print_stats(t):
 {"=" * len(title)}
 ''')
 
+    metrics = t.collect_metrics()
+
     print_section_header('Setting')
 
     table_data = [
@@ -126,7 +133,7 @@ def print_stats(t):
     print(table.table)
 
     print_section_header('Clocks')
-    max_freq = t.max_freq()
+    max_freq = metrics.max_freq
     table_data = [
         [
             'Clock domain', 'Actual freq', 'Requested freq', 'Met?',
@@ -152,7 +159,7 @@ def print_stats(t):
 
     print_section_header('Toolchain Run-Times')
     table_data = [['Stage', 'Run Time (seconds)']]
-    for k, v in t.get_runtimes().items():
+    for k, v in metrics.runtimes.items():
         value = "%0.3f" % v if v else "N/A"
         table_data.append([k, value])
 
@@ -161,7 +168,7 @@ def print_stats(t):
 
     resource_map = {"synth": "Post synthesys", "impl": "Post place and route"}
 
-    for k, v in sorted(t.resources().items()):
+    for k, v in sorted(metrics.resources.items()):
         print_section_header(f"FPGA {resource_map[k]} resource utilization")
         table_data = [['Resource', 'Used']]
 
@@ -173,8 +180,23 @@ def print_stats(t):
         print(table.table)
 
 
+class TimeoutReached(Exception):
+    pass
+
+
 def timeout_handler(signum, frame):
-    raise Exception("ERROR: Timeout reached!")
+    # The exception alone would leave the tools spawned by the toolchain
+    # running: stop them before unwinding.
+    terminate_children()
+    raise TimeoutReached("ERROR: Timeout reached!")
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+def cancel_handler(signum, frame):
+    raise TaskCancelled("ERROR: Task cancelled!")
 
 
 def run(
@@ -192,7 +214,19 @@ def run(
     carry=None,
     build=None,
     build_type=None,
-    timeout=0
+    timeout=0,
+    resume=False,
+    task_id=None,
+    cache_dir=None,
+    cache_size=None,
+    share_synthesis=False,
+    base_build=None,
+    chipdb_dir=None,
+    prune=False,
+    scratch_dir=None,
+    progress_file=None,
+    abort_policies=None,
+    best_critical_path=None
 ):
     assert board is not None
     assert toolchain is not None
@@ -245,6 +279,9 @@ def run(
 
     tch.build = build
     tch.build_type = build_type
+    tch.task_id = task_id
+    tch.base_build = os.path.realpath(base_build) if base_build else None
+    tch.chipdb_dir = chipdb_dir
 
     logger.debug("Running Project")
 
@@ -264,42 +301,133 @@ def run(
         out_prefix=out_prefix,
         overwrite=overwrite,
     )
+
+    if resume and tch.is_up_to_date():
+        print(
+            'Skipping {}: already built from the same inputs'.format(
+                tch.design()
+            )
+        )
+        return tch.out_dir
+
+    cache = BuildCache(cache_dir, cache_size) if cache_dir else None
+    if cache is not None:
+        fingerprint = tch.fingerprint()
+        if cache.restore(fingerprint, tch.out_dir):
+            # The metadata describes the cached build, not this one
+            tch.update_metadata(
+                design=tch.design(),
+                build=tch.build,
+                build_type=tch.build_type,
+                task_id=tch.task_id,
+                cache_hit=True
+            )
+            print('Restored {} from the build cache'.format(tch.design()))
+            return tch.out_dir
+
+        # Stages built with the same inputs and options are reused as well
+        tch.stage_cache = cache
+    elif share_synthesis and tch.has_synthesis_stage():
+        # Only the synthesis is shared, next to the builds of the same prefix
+        tch.stage_cache = BuildCache(
+            os.path.join(os.path.dirname(tch.out_dir), '.synthesis')
+        )
+        tch.cached_targets = [tch.get_synthesis_target()]
+
+    if scratch_dir:
+        tch.enter_scratch_dir(scratch_dir)
+
+    monitor = None
+    if progress_file or abort_policies:
+        monitor = ProgressMonitor(
+            tch.out_dir, tch.get_progress_extractors(), progress_file
+        )
+
+    early_abort = None
+    if abort_policies:
+        early_abort = EarlyAbort(
+            get_abort_policies(abort_policies, best_critical_path), monitor
+        )
+
     err = None
+    status = None
     try:
-        signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(timeout)
-        tch.run()
-        signal.alarm(0)
-    except Exception as e:
-        err = str(e)
-        if not verbose and len(err) > 1000:
-            err = f"[...]\n{err[-1000:]}"
-        logger.debug(f"ERROR: {err}")
-        err = err.split("\n")
-    else:
-        logger.debug("Printing Stats")
-        print_stats(tch)
+        try:
+            signal.signal(signal.SIGALRM, timeout_handler)
+            signal.signal(signal.SIGTERM, cancel_handler)
+            signal.alarm(timeout)
+            if early_abort is not None:
+                early_abort.arm()
+            if monitor is not None:
+                monitor.start()
+            tch.run()
+            if early_abort is not None:
+                early_abort.disarm()
+        except Exception as e:
+            err = str(e)
+            if not verbose and len(err) > 1000:
+                err = f"[...]\n{err[-1000:]}"
+            logger.debug(f"ERROR: {err}")
+            err = err.split("\n")
+            if isinstance(e, TimeoutReached):
+                status = "timeout"
+            elif isinstance(e, TaskCancelled):
+                status = "cancelled"
+            elif isinstance(e, RunAborted):
+                status = "aborted"
+        else:
+            logger.debug("Printing Stats")
+            print_stats(tch)
+        finally:
+            signal.alarm(0)
+            if early_abort is not None:
+                early_abort.disarm()
+            if monitor is not None:
+                monitor.stop()
+                tch.progress = dict(monitor.status)
+
+        logger.debug("Writing Metadata")
+        tch.write_metadata(err, status)
+
+        if cache is not None and err is None:
+            cache.store(fingerprint, tch.out_dir, tch.retained_files)
+
+        policy = get_prune_policy(root_dir, build_type) if prune else None
+        if policy is not None and err is None:
+            reclaimed = prune_directory(
+                tch.out_dir, policy, tch.retained_files
+            )
+            tch.update_metadata(pruned_bytes=reclaimed)
+            print(
+                'Pruned {}: {:.1f} MiB reclaimed'.format(
+                    tch.design(), reclaimed / (1024 * 1024)
+                )
+            )
+    finally:
+        # The run is copied back, pruned if successful, even if it failed or
+        # timed out
+        if scratch_dir:
+            tch.leave_scratch_dir()
 
-    logger.debug("Writing Metadata")
-    tch.write_metadata(err)
+    return tch.out_dir
 
 
 def get_combinations():
     """ Returns a list of tuples with all the possible combinations of supported builds """
+    catalog = get_catalog()
     combs = list()
-    for p in get_projects():
-        project = get_project(p)
+    for p, project in catalog.projects.items():
         vendor_info = project["vendors"]
         project_name = project["name"]
         for t in get_toolchains():
-            vendors = get_vendors(t)
-            for vendor in vendors:
+            for vendor in catalog.vendors_by_toolchain.get(t, []):
                 if vendor not in vendor_info:
                     continue
 
                 board_info = vendor_info[vendor]
-                for b in get_boards():
-                    if b not in get_vendors()[vendor]["boards"]:
+                vendor_boards = catalog.get_vendor_boards(vendor)
+                for b in catalog.boards:
+                    if b not in vendor_boards:
                         continue
 
                     if board_info is None or b not in board_info:
@@ -314,22 +442,23 @@ def list_combinations(
     board=None,
 ):
     '''Query all possible project/toolchain/board combinations'''
+    catalog = get_catalog()
+    boards = get_boards(board)
     table_data = [['Project', 'Toolchain', 'Board', 'Status']]
     for p in get_projects(project):
-        toolchain_info = get_project(p).get("required_toolchains", [])
-        vendor_info = get_project(p)["vendors"]
+        vendor_info = catalog.get_project(p)["vendors"]
         for t in get_toolchains(toolchain):
-            vendors = get_vendors(t)
-            for vendor in vendors:
+            for vendor in catalog.vendors_by_toolchain.get(t, []):
                 if vendor not in vendor_info:
                     continue
 
                 text = "Supported"
                 board_info = vendor_info[vendor]
-                if t not in toolchain_info:
+                if not catalog.is_required(p, t):
                     text = "Missing"
-                for b in get_boards(board):
-                    if b not in get_vendors()[vendor]["boards"]:
+                vendor_boards = catalog.get_vendor_boards(vendor)
+                for b in boards:
+                    if b not in vendor_boards:
                         continue
                     text2 = text
                     if board_info is None or b not in board_info:
@@ -340,45 +469,37 @@ def list_combinations(
     print(table.table)
 
 
+def get_catalog(refresh=False):
+    '''Return the indexed catalog of projects, vendors and boards, reloaded
+    if refresh is set and its files changed'''
+    return load_catalog(root_dir, refresh)
+
+
 def get_vendors(toolchain=None, board=None):
     '''Return vendor information'''
-    with (Path(root_dir) / 'assets/vendors.yaml').open('r') as vendors_file:
-        vendors = yaml.safe_load(vendors_file)
+    catalog = get_catalog()
 
     if toolchain is None and board is None:
-        return vendors
-
-    both_specified = all([toolchain, board])
-
-    _vendors = list()
-    for v in vendors:
-        toolchains = vendors[v]["toolchains"]
-        boards = vendors[v]["boards"]
-
-        if both_specified and toolchain in toolchains and board in boards:
-            _vendors.append(v)
-            return _vendors
+        return copy.deepcopy(catalog.vendors)
 
-        if both_specified:
-            continue
-
-        if toolchain in toolchains:
-            _vendors.append(v)
-            continue
+    if all([toolchain, board]):
+        board_vendors = catalog.vendors_by_board.get(board, [])
+        for v in catalog.vendors_by_toolchain.get(toolchain, []):
+            if v in board_vendors:
+                return [v]
+        return []
 
-        if board in boards:
-            _vendors.append(v)
-            continue
+    if toolchain is not None:
+        return list(catalog.vendors_by_toolchain.get(toolchain, []))
 
-    return _vendors
+    return list(catalog.vendors_by_board.get(board, []))
 
 
 def get_boards(board=None):
     '''Query all supported boards'''
-    with (Path(root_dir) / 'assets/boards.yaml').open('r') as boards_file:
-        boards = yaml.safe_load(boards_file)
+    boards = get_catalog().boards
     if board is None:
-        return boards
+        return copy.deepcopy(boards)
     if board in boards:
         return [board]
     return []
@@ -412,9 +533,7 @@ def matching_pattern(path, pattern):
 
 def get_projects(project=None):
     '''Query all supported projects'''
-    projects = matching_pattern(
-        os.path.join(project_dir, '*.yaml'), '/.*/(.*)[.]yaml'
-    )
+    projects = list(get_catalog().projects)
     if project is None:
         return projects
     elif project in projects:
@@ -425,14 +544,8 @@ def get_projects(project=None):
 
 def get_project_names():
     '''Query all supported project names'''
-    projects = get_projects()
-    project_names = []
-
-    for p in projects:
-        project = get_project(p)
-        project_names.append(project["name"])
-
-    return project_names
+    catalog = get_catalog()
+    return [catalog.get_project_name(p) for p in catalog.projects]
 
 
 def list_projects():
@@ -500,9 +613,7 @@ def get_constraint(project, board, toolchain, extension):
 
 
 def get_project(name):
-    project_fn = os.path.join(project_dir, '{}.yaml'.format(name))
-    with open(project_fn, 'r') as f:
-        return yaml.safe_load(f)
+    return copy.deepcopy(get_catalog().get_project(name))
 
 
 def add_bool_arg(parser, yes_arg, default=False, **kwargs):
@@ -531,6 +642,54 @@ def main():
         action='store_true',
         help='Overwrite the folder with this run'
     )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Skip the run if it already succeeded with the same inputs'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        help='Reuse the results of builds with the same inputs from this cache'
+    )
+    parser.add_argument(
+        '--cache-size',
+        default=None,
+        type=int,
+        help='Maximum size of the build cache in MiB'
+    )
+    parser.add_argument(
+        '--scratch-dir',
+        default=None,
+        help=
+        'Run in a directory of SCRATCH_DIR (e.g. a tmpfs) and copy it back to the output directory once done: all of it without --prune or if the run failed, only the files kept by the policy of --prune otherwise'
+    )
+    parser.add_argument(
+        '--prune',
+        action='store_true',
+        help=
+        'Delete or compress the intermediate files of a successful run, following the policy of its build type in assets/prune.yaml'
+    )
+    parser.add_argument(
+        '--progress-file',
+        default=None,
+        help=
+        'Follow the logs of the tools while they run and keep their progress (stage, router iteration, overused nodes) in PROGRESS_FILE'
+    )
+    parser.add_argument(
+        '--abort-policy',
+        action='append',
+        type=check_abort_policy,
+        metavar='POLICY:VALUE',
+        help=
+        'Abort the run, with the aborted status, when its routing is hopeless: stall:K if the overused nodes did not improve for K router iterations (can be given several times)'
+    )
+    parser.add_argument(
+        '--base-build',
+        default=None,
+        help=
+        'Output directory of a build of the base toolchain (e.g. vpr for vpr-fasm2bels) to start from'
+    )
     parser.add_argument(
         '--params_file', default=None, help='Use custom tool parameters'
     )
@@ -645,7 +804,15 @@ def main():
             carry=args.carry,
             seed=seed,
             build=args.build,
-            build_type=args.build_type
+            build_type=args.build_type,
+            resume=args.resume,
+            cache_dir=args.cache_dir,
+            cache_size=args.cache_size,
+            base_build=args.base_build,
+            prune=args.prune,
+            scratch_dir=args.scratch_dir,
+            progress_file=args.progress_file,
+            abort_policies=args.abort_policy
         )
 
 
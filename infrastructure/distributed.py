@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+"""Distributed execution of the exhaust tasks.
+
+A coordinator serves the task list over a TCP or unix socket, and worker
+agents pull the tasks, run them and stream back their results.
+
+The protocol is made of JSON messages, one per line. Once connected, the
+worker receives the settings of the runner the tasks are run with (see
+SETTINGS), then requests the tasks one at a time:
+    coordinator -> worker:      {"type": "settings", "settings": {...}}
+    worker      -> coordinator: {"type": "request"}
+    coordinator -> worker:      {"type": "task", "id": ..., "task": [...],
+                                 "best_critical_path": ...}
+                                {"type": "wait", "delay": ...}
+                                {"type": "done"}
+    worker      -> coordinator: {"type": "result", "id": ..., "design": ...,
+                                 "failed": ...,
+                                 "files": {<name>: <zlib+base64 content>}}
+    coordinator -> worker:      {"type": "ack"}
+
+Tasks assigned to a worker whose connection drops, or that does not send
+the result within the timeout of the task, are put back in the queue.
+"""
+
+import base64
+import glob
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import zlib
+from collections import deque
+from multiprocessing import Pipe, Process
+
+from infrastructure.tasks import Task
+
+# Files of the task output directory streamed back to the coordinator
+RESULT_FILES = ['meta.json', '*.log', '*.rpt', '*.txt']
+
+# Attributes of the coordinator runner applied to the runners of the workers
+SETTINGS = [
+    'build_type', 'overwrite', 'timeout', 'resume', 'share_synthesis', 'prune',
+    'abort_policies'
+]
+
+
+def parse_address(address):
+    """Parses an address in the unix:<path> or <host>:<port> format."""
+    if address.startswith('unix:'):
+        return socket.AF_UNIX, address[len('unix:'):]
+
+    host, port = address.rsplit(':', 1)
+    return socket.AF_INET, (host or 'localhost', int(port))
+
+
+def send_message(wfile, message):
+    wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+    wfile.flush()
+
+
+def receive_message(rfile):
+    line = rfile.readline()
+    if not line:
+        raise ConnectionError('Connection closed')
+    return json.loads(line.decode('utf-8'))
+
+
+def encode_file(path):
+    with open(path, 'rb') as fp:
+        return base64.b64encode(zlib.compress(fp.read())).decode('ascii')
+
+
+def decode_file(data):
+    return zlib.decompress(base64.b64decode(data.encode('ascii')))
+
+
+class TaskQueue:
+    """Thread-safe queue of the tasks served by the coordinator, keeping
+    track of the tasks currently assigned to a worker."""
+    def __init__(self, tasks):
+        self.lock = threading.Condition()
+        self.pending = deque(enumerate(tasks))
+        self.assigned = dict()
+
+    def get(self):
+        with self.lock:
+            if not self.pending:
+                return None
+
+            task_id, task = self.pending.popleft()
+            self.assigned[task_id] = task
+            return task_id, task
+
+    def complete(self, task_id):
+        with self.lock:
+            self.assigned.pop(task_id, None)
+            self.lock.notify_all()
+
+    def requeue(self, task_id):
+        with self.lock:
+            task = self.assigned.pop(task_id, None)
+            if task is not None:
+                self.pending.appendleft((task_id, task))
+            self.lock.notify_all()
+
+    def is_done(self):
+        with self.lock:
+            return not self.pending and not self.assigned
+
+    def wait_done(self):
+        with self.lock:
+            while self.pending or self.assigned:
+                self.lock.wait()
+
+
+def set_keepalive(sock):
+    """Enables the keepalive probes of a TCP socket, so that a peer that
+    went away without closing the connection is detected in minutes."""
+    if sock.family == socket.AF_UNIX:
+        return
+
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    for option, value in (('TCP_KEEPIDLE', 60), ('TCP_KEEPINTVL', 10),
+                          ('TCP_KEEPCNT', 6)):
+        if hasattr(socket, option):
+            sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
+
+
+class CoordinatorHandler(socketserver.StreamRequestHandler):
+    """Serves the tasks to a single worker connection."""
+    def handle(self):
+        coordinator = self.server.coordinator
+        assigned = None
+
+        set_keepalive(self.request)
+        self.request.settimeout(coordinator.idle_timeout)
+
+        try:
+            send_message(
+                self.wfile, {
+                    'type': 'settings',
+                    'settings': coordinator.settings
+                }
+            )
+
+            while True:
+                message = receive_message(self.rfile)
+
+                if message['type'] == 'request':
+                    item = coordinator.queue.get()
+                    if item is not None:
+                        assigned, task = item
+                        cpd = coordinator.get_best_critical_path(task)
+                        send_message(
+                            self.wfile, {
+                                'type': 'task',
+                                'id': assigned,
+                                'task': task,
+                                'best_critical_path': cpd
+                            }
+                        )
+                        # Bound the time the task stays assigned to a worker
+                        # that hangs without closing the connection.
+                        self.request.settimeout(coordinator.get_task_timeout())
+                    elif coordinator.queue.is_done():
+                        send_message(self.wfile, {'type': 'done'})
+                        return
+                    else:
+                        # Tasks assigned to other workers might get requeued
+                        send_message(
+                            self.wfile, {
+                                'type': 'wait',
+                                'delay': coordinator.poll_interval
+                            }
+                        )
+
+                elif message['type'] == 'result':
+                    coordinator.store_result(message, task)
+                    coordinator.queue.complete(message['id'])
+                    assigned = None
+                    self.request.settimeout(coordinator.idle_timeout)
+                    send_message(self.wfile, {'type': 'ack'})
+        except (ConnectionError, OSError, ValueError) as e:
+            if assigned is not None:
+                print(
+                    'Lost worker {}, requeueing task {}: {}'.format(
+                        self.client_address, assigned, e
+                    )
+                )
+        finally:
+            if assigned is not None:
+                coordinator.queue.requeue(assigned)
+
+
+class Coordinator:
+    """Serves the tasks of a runner to worker agents and collects their
+    results in the output prefix of the runner."""
+    def __init__(self, address, runner):
+        self.address = address
+        self.runner = runner
+        self.poll_interval = 5
+        # Serializes the accesses of the handlers to the runner
+        self.lock = threading.Lock()
+        # Time a connected worker has to send its next request
+        self.idle_timeout = 60
+        # Time given to a worker, on top of the task timeout, to send the
+        # result of a task
+        self.result_grace = 600
+        self.queue = TaskQueue([list(task) for task in runner.order_tasks()])
+        self.settings = {key: getattr(runner, key) for key in SETTINGS}
+
+    def get_task_timeout(self):
+        """Returns how long a task can stay assigned to a worker, None if
+        the tasks have no timeout."""
+        if not self.runner.timeout:
+            return None
+
+        runner = self.runner
+        return runner.timeout + runner.timeout_grace + self.result_grace
+
+    def get_best_critical_path(self, task):
+        """Returns the best critical path of the finished tasks of the same
+        project, toolchain and board, for the cpd abort policy: the workers
+        do not see the results of each other."""
+        if not self.runner.abort_policies:
+            return None
+
+        with self.lock:
+            return self.runner.get_best_critical_path(Task(*task))
+
+    def store_result(self, message, task):
+        if message.get('failed'):
+            print(
+                'Task {} failed on its worker'.format(
+                    os.path.basename(message['design'])
+                )
+            )
+
+        out_dir = os.path.join(
+            self.runner.root_dir, self.runner.out_prefix,
+            os.path.basename(message['design'])
+        )
+        os.makedirs(out_dir, exist_ok=True)
+
+        for name, data in message['files'].items():
+            with open(os.path.join(out_dir, os.path.basename(name)),
+                      'wb') as fp:
+                fp.write(decode_file(data))
+
+        with self.lock:
+            self.runner.finished.add(Task(*task))
+
+    def run(self):
+        family, address = parse_address(self.address)
+
+        if family == socket.AF_UNIX:
+            if os.path.exists(address):
+                os.unlink(address)
+            base_class = socketserver.ThreadingUnixStreamServer
+        else:
+            base_class = socketserver.ThreadingTCPServer
+
+        class server_class(base_class):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        os.makedirs(
+            os.path.join(self.runner.root_dir, self.runner.out_prefix),
+            exist_ok=True
+        )
+
+        start = time.time()
+        with server_class(address, CoordinatorHandler) as server:
+            server.coordinator = self
+            thread = threading.Thread(target=server.serve_forever)
+            thread.daemon = True
+            thread.start()
+
+            print('Serving tasks on {}'.format(self.address))
+            self.queue.wait_done()
+
+            server.shutdown()
+        self.runner.actual_makespan = time.time() - start
+
+        if family == socket.AF_UNIX:
+            os.unlink(address)
+
+
+class Worker:
+    """Worker agent pulling tasks from a coordinator and running them with
+    the given runner."""
+    def __init__(self, address, runner):
+        self.address = address
+        self.runner = runner
+        self.sock = None
+
+        # Tasks are received one at a time, the coordinator does not order
+        # them by dependencies.
+        self.runner.stream_exhausted = True
+
+    def execute(self, task, best_critical_path, writer):
+        # The connection must drop as soon as the agent dies, do not keep it
+        # open in the task process.
+        os.close(self.sock.detach())
+        writer.send(
+            self.runner.worker(task, best_critical_path=best_critical_path)
+        )
+
+    def run_task(self, task, best_critical_path=None):
+        """Runs a task in a separate process and returns its output
+        directory, and whether the process died without writing its
+        metadata."""
+        task = Task(*task)
+        reader, writer = Pipe(duplex=False)
+        start = time.time()
+        process = Process(
+            target=self.execute, args=(task, best_critical_path, writer)
+        )
+        process.start()
+        writer.close()
+
+        try:
+            out_dir = reader.recv()
+        except EOFError:
+            out_dir = None
+        process.join()
+
+        if process.exitcode != 0 and not self.runner.has_metadata(task, start):
+            return self.runner.write_failure(task, process.exitcode), True
+
+        if out_dir is None:
+            # The process died after writing the metadata
+            out_dir = self.runner.get_out_dir(task)
+        if out_dir is None:
+            return self.runner.write_failure(task, process.exitcode), True
+
+        return out_dir, False
+
+    def get_result_files(self, out_dir):
+        files = dict()
+        for pattern in RESULT_FILES:
+            for path in glob.glob(os.path.join(out_dir, pattern)):
+                files[os.path.basename(path)] = encode_file(path)
+
+        return files
+
+    def run(self):
+        family, address = parse_address(self.address)
+
+        with socket.socket(family, socket.SOCK_STREAM) as self.sock:
+            set_keepalive(self.sock)
+            self.sock.connect(address)
+            rfile = self.sock.makefile('rb')
+            wfile = self.sock.makefile('wb')
+
+            try:
+                settings = receive_message(rfile)['settings']
+                for key in SETTINGS:
+                    if key in settings:
+                        setattr(self.runner, key, settings[key])
+
+                while True:
+                    send_message(wfile, {'type': 'request'})
+                    message = receive_message(rfile)
+
+                    if message['type'] == 'done':
+                        break
+
+                    if message['type'] == 'wait':
+                        time.sleep(message['delay'])
+                        continue
+
+                    out_dir, failed = self.run_task(
+                        message['task'], message.get('best_critical_path')
+                    )
+                    send_message(
+                        wfile, {
+                            'type': 'result',
+                            'id': message['id'],
+                            'design': os.path.basename(out_dir),
+                            'failed': failed,
+                            'files': self.get_result_files(out_dir)
+                        }
+                    )
+                    receive_message(rfile)
+            except ConnectionError:
+                # The coordinator exits once all the tasks are completed
+                print('Connection to the coordinator closed')
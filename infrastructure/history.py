@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import glob
+import gzip
+import heapq
+import json
+import os
+from collections import defaultdict
+from statistics import median
+
+
+class RuntimeHistory:
+    """Class to collect the outcome of previous runs found in an output
+    prefix and to estimate the cost of the tasks that are about to run.
+
+    The history is read from the merged results files (results-*.json.gz)
+    and from the dataframe (dataframe.json) produced by earlier runs, found
+    in the output prefix unless the history files are given.
+    Both the total runtime (seconds) and the maximum memory use (MiB)
+    of each run are collected.
+    """
+    def __init__(self, out_prefix, history_files=None):
+        self.out_prefix = out_prefix
+        self.runtimes = defaultdict(list)
+        self.memory = defaultdict(list)
+
+        if history_files is None:
+            history_files = sorted(
+                glob.glob(os.path.join(out_prefix, 'results-*.json.gz'))
+            )
+            dataframe_file = os.path.join(out_prefix, 'dataframe.json')
+            if os.path.exists(dataframe_file):
+                history_files.append(dataframe_file)
+
+        for history_file in history_files:
+            if history_file.endswith('.json.gz'):
+                self.load_results(history_file)
+            else:
+                self.load_dataframe(history_file)
+
+    @staticmethod
+    def add_sample(samples, project, toolchain, board, value):
+        if None in (project, toolchain, board, value):
+            return
+
+        samples[(project, toolchain, board)].append(float(value))
+
+    @staticmethod
+    def get_toolchain_name(toolchain):
+        # The toolchain entry is stored as {<toolchain>: {synth_tool, pr_tool}}
+        if isinstance(toolchain, dict):
+            return next(iter(toolchain), None)
+        return toolchain
+
+    def load_results(self, results_file):
+        try:
+            with gzip.open(results_file, 'rb') as fp:
+                results = json.loads(fp.read().decode('utf-8'))['results']
+        except (OSError, ValueError, KeyError):
+            return
+
+        for samples, metric in ((self.runtimes, 'runtime'),
+                                (self.memory, 'maximum_memory_use')):
+            columns = [
+                results.get(column, [])
+                for column in ('project', 'toolchain', 'board', metric)
+            ]
+            for project, toolchain, board, value in zip(*columns):
+                if metric == 'runtime':
+                    value = value.get('total') if value else None
+                self.add_sample(
+                    samples, project, self.get_toolchain_name(toolchain),
+                    board, value
+                )
+
+    def load_dataframe(self, dataframe_file):
+        try:
+            with open(dataframe_file, 'r') as fp:
+                dataframe = json.load(fp)
+        except (OSError, ValueError):
+            return
+
+        columns = ('project', 'toolchain', 'board', 'total_time')
+        if not all(column in dataframe for column in columns):
+            return
+
+        projects, toolchains, boards, totals = [
+            dataframe[column] for column in columns
+        ]
+        memory = dataframe.get('maximum_memory_use', dict())
+        for row, project in projects.items():
+            toolchain = self.get_toolchain_name(toolchains.get(row))
+            board = boards.get(row)
+
+            self.add_sample(
+                self.runtimes, project, toolchain, board, totals.get(row)
+            )
+            self.add_sample(
+                self.memory, project, toolchain, board, memory.get(row)
+            )
+
+    def __len__(self):
+        return len(self.runtimes)
+
+    @staticmethod
+    def get_estimate(samples, project, toolchain, board):
+        """Returns the median of the samples of the given combination.
+
+        Combinations without history fall back to the median of the same
+        toolchain and, if that is missing too, to the global median.
+        """
+        values = samples.get((project, toolchain, board))
+        if values:
+            return median(values)
+
+        values = [
+            value for (_, tch, _), values in samples.items()
+            if tch == toolchain for value in values
+        ]
+        if values:
+            return median(values)
+
+        values = [value for values in samples.values() for value in values]
+        if values:
+            return median(values)
+
+        return 0.0
+
+    def estimate(self, project, toolchain, board):
+        """Returns the estimated runtime in seconds of the given combination."""
+        return self.get_estimate(self.runtimes, project, toolchain, board)
+
+    def estimate_memory(self, project, toolchain, board):
+        """Returns the estimated peak memory use in MiB of the given
+        combination."""
+        return self.get_estimate(self.memory, project, toolchain, board)
+
+
+def predict_makespan(estimates, num_cores):
+    """Returns the makespan of running the estimated tasks, given as
+    (runtime, cores) pairs, in the given order on num_cores cores.
+
+    Like the runner, each task starts as soon as enough cores are free for
+    it, and no task starts before the ones preceding it.
+    """
+    num_cores = max(num_cores, 1)
+    free = num_cores
+    now = 0.0
+    # (end, cores) of the running tasks
+    running = []
+    makespan = 0.0
+    for estimate, cores in estimates:
+        cores = min(cores, num_cores)
+        while free < cores:
+            end, released = heapq.heappop(running)
+            now = max(now, end)
+            free += released
+
+        heapq.heappush(running, (now + estimate, cores))
+        free -= cores
+        makespan = max(makespan, now + estimate)
+
+    return makespan
+
+
+def partition(tasks, estimates, num_shards):
+    """Splits the tasks in num_shards shards with balanced estimated runtime.
+
+    The tasks are assigned, longest first, to the least loaded shard
+    (ties broken by the number of tasks, then by the shard index). Tasks
+    with the same estimate are sorted by their ID, so that the partition
+    only depends on the tasks and on their estimates.
+    """
+    shards = [list() for _ in range(num_shards)]
+    loads = [(0.0, 0, idx) for idx in range(num_shards)]
+
+    tasks = sorted(tasks, key=lambda task: (-estimates[task], task.task_id))
+    for task in tasks:
+        load, count, idx = loads[0]
+        shards[idx].append(task)
+        heapq.heapreplace(loads, (load + estimates[task], count + 1, idx))
+
+    return shards
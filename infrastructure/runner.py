@@ -24,12 +24,27 @@ import glob
 import gzip
 import json
 import pandas
-from multiprocessing import Pool, cpu_count
+import shutil
+import signal
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from multiprocessing import Process, cpu_count
+from multiprocessing.connection import wait
 
-from fpgaperf import run
+from fpgaperf import run, get_catalog, get_constraint, get_vendors, toolchains
 from infrastructure.dataframe import generate_dataframe
+from infrastructure.history import RuntimeHistory, partition, predict_makespan
+from infrastructure.tasks import Task, get_task_id
+from toolchains.toolchain import Toolchain
+from utils.chipdb import get_staged_path, set_page_cache, stage_file
+from utils.proc import get_tree_rss, get_physical_cores, set_affinity, terminate_process_groups
+from utils.progress import read_progress
 import utils.sow as sow
 
+RunningTask = namedtuple('RunningTask', ['task', 'memory', 'cores', 'start'])
+
 
 class Runner:
     """Class to create a runner object that, given a list of tasks
@@ -45,7 +60,21 @@ class Runner:
         build_numbers,
         overwrite,
         num_cpu,
-        timeout=0
+        timeout=0,
+        max_mem=None,
+        resume=False,
+        fail_fast=False,
+        cache_dir=None,
+        cache_size=None,
+        share_synthesis=False,
+        chipdb_dir=None,
+        chipdb_cache=None,
+        prune=False,
+        scratch_dir=None,
+        progress_interval=None,
+        abort_policies=None,
+        history_files=None,
+        combinations=None
     ):
         self.verbose = verbose
         self.out_prefix = out_prefix
@@ -58,20 +87,97 @@ class Runner:
         self.overwrite = overwrite
         self.num_cpu = num_cpu
         self.timeout = timeout
+        self.max_mem = max_mem
+        self.resume = resume
+        self.fail_fast = fail_fast
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.share_synthesis = share_synthesis
+        self.chipdb_dir = chipdb_dir
+        self.chipdb_cache = chipdb_cache
+        self.prune = prune
+        self.scratch_dir = scratch_dir
+        self.progress_interval = progress_interval
+        self.abort_policies = abort_policies
+        self.progress_printed = None
+        self.staged_files = set()
+        # Chip database -> copy to chipdb_dir, made by the staging thread
+        self.staging = dict()
+        self.stager = None
+        self.staged_size = 0
+        self.staging_time = 0.0
+        self.poll_interval = 1.0
+        # Time given to a task to stop by itself once the timeout is reached
+        self.timeout_grace = 60
+        # Time given to a cancelled task to stop before being killed
+        self.cancel_grace = 10
+        self.failed_required = None
+        self.cancelled = []
+        # Tasks killed after their timeout
+        self.expired = set()
+
+        # (project, toolchain, board) -> task synthesizing for the others
+        self.synthesis_tasks = dict()
+        self.queued = set()
+        self.finished = set()
+        self.stream_exhausted = False
+        # (project, toolchain, board) combinations the tasks are generated
+        # from, if known
+        self.combinations = combinations
+
+        # Each task reserves as many physical cores as its toolchain uses
+        self.cores = get_physical_cores()[:num_cpu]
+        self.free_cores = list(range(len(self.cores)))
+
+        self.history_files = history_files
+        self.history = RuntimeHistory(
+            os.path.join(root_dir, out_prefix), history_files
+        )
+        self.predicted_makespan = None
+        self.actual_makespan = None
+
+    def worker(self, arglist, cpus=None, best_critical_path=None):
+        """Single worker function that is run in a separate process.
 
-    def worker(self, arglist):
-        """Single worker function that is run in the Pool of workers.
+        This takes, as argument list, the various tasks to perform, and the
+        logical CPUs the task gets pinned to. It returns the output directory
+        of the task.
 
-        This takes, as argument list, the various tasks to perform.
+        The best critical path the cpd abort policy compares to is the one
+        of the tasks finished by this runner, unless it is given (e.g. by the
+        coordinator of a distributed run).
         """
         def eprint(*args, **kwargs):
             print(*args, file=sys.stderr, **kwargs)
 
-        project, toolchain, board, seed, option, build_number = arglist
+        # Start a new session, so that the task and all the tools it spawns
+        # can be stopped all together.
+        os.setsid()
+
+        if cpus:
+            set_affinity(cpus)
+
+        task = Task(*arglist)
+        project, toolchain, board, seed, option, build_number, task_id = task
+
+        if self.chipdb_cache is not None:
+            for path in self.get_chip_files(task):
+                set_page_cache(path, self.chipdb_cache == 'warm')
 
         build = self.build_format.format(build_number)
 
-        run(
+        if best_critical_path is None and self.abort_policies:
+            best_critical_path = self.get_best_critical_path(task)
+
+        base_build = None
+        base_task = self.get_base_task(task)
+        if base_task is not None and self.get_status(base_task) == 'succeeded':
+            base_build = self.get_out_dir(base_task)
+
+        # The builds other tasks start from are kept whole
+        has_dependents = self.has_dependents(task)
+
+        return run(
             board,
             toolchain,
             project,
@@ -86,16 +192,647 @@ class Runner:
             None,  #carry
             build,
             self.build_type,
-            self.timeout
+            self.timeout,
+            resume=self.resume,
+            task_id=task_id,
+            cache_dir=self.cache_dir,
+            cache_size=self.cache_size,
+            share_synthesis=self.share_synthesis,
+            base_build=base_build,
+            chipdb_dir=self.chipdb_dir,
+            prune=self.prune and not has_dependents,
+            scratch_dir=None if has_dependents else self.scratch_dir,
+            progress_file=self.get_progress_file(task),
+            abort_policies=self.abort_policies,
+            best_critical_path=best_critical_path
+        )
+
+    def get_best_critical_path(self, task):
+        """Returns the shortest critical path (ns) of the finished tasks of
+        the same project, toolchain and board, if any."""
+        best = None
+        for other in self.finished:
+            if other[:3] != task[:3] or self.get_status(other) != 'succeeded':
+                continue
+
+            meta_path = os.path.join(self.get_out_dir(other), 'meta.json')
+            with open(meta_path, 'r') as fp:
+                max_freq = json.load(fp).get('max_freq')
+            if not isinstance(max_freq, dict):
+                continue
+
+            # The critical path is the one of the slowest clock domain
+            freqs = [
+                clk['actual'] for clk in max_freq.values() if clk['actual']
+            ]
+            if freqs:
+                cpd = 1e3 / min(freqs)
+                best = cpd if best is None else min(best, cpd)
+
+        return best
+
+    def get_chip_files(self, task):
+        """Returns the chip databases a task loads, as they get loaded
+        (i.e. staged, if they were)."""
+        board = get_catalog().boards[task.board]
+        chip_files = []
+        for path in toolchains[task.toolchain].get_chip_files(
+                self.root_dir, board['family'], board['device'],
+                board['package']):
+            if self.chipdb_dir is not None and path in self.staged_files:
+                path = get_staged_path(self.chipdb_dir, path)
+            if os.path.exists(path):
+                chip_files.append(path)
+
+        return chip_files
+
+    def copy_chip_file(self, path):
+        """Copies a chip database to chipdb_dir, in the staging thread.
+
+        Returns the size of the copied data and the time it took, or None if
+        the copy failed (the tasks then load the original file).
+        """
+        start = time.time()
+        try:
+            size = stage_file(self.chipdb_dir, path)
+        except OSError as e:
+            print('Failed to stage {}: {}'.format(path, e))
+            return None
+
+        return size, time.time() - start
+
+    def stage_chip_files(self, task):
+        """Starts copying the chip databases of a task to chipdb_dir in the
+        background, the first time they are needed.
+
+        Returns whether the copies are complete, so that the task can start
+        without blocking the dispatch of the other tasks meanwhile.
+        """
+        board = get_catalog().boards[task.board]
+        staged = True
+        for path in toolchains[task.toolchain].get_chip_files(
+                self.root_dir, board['family'], board['device'],
+                board['package']):
+            if path in self.staged_files or not os.path.exists(path):
+                continue
+
+            future = self.staging.get(path)
+            if future is None:
+                if self.stager is None:
+                    self.stager = ThreadPoolExecutor(max_workers=1)
+                future = self.stager.submit(self.copy_chip_file, path)
+                self.staging[path] = future
+
+            if not future.done():
+                staged = False
+                continue
+
+            result = future.result()
+            if result is not None:
+                size, duration = result
+                self.staged_size += size
+                self.staging_time += duration
+                self.staged_files.add(path)
+
+        return staged
+
+    def stop_staging(self):
+        """Drops the pending copies and waits for the one in progress."""
+        if self.stager is None:
+            return
+
+        for future in self.staging.values():
+            future.cancel()
+        self.stager.shutdown()
+        self.stager = None
+
+    def print_staging(self):
+        if self.chipdb_dir is None:
+            return
+
+        print(
+            'Staged {} chip databases ({:.1f} MiB copied) in {:.1f}s'.format(
+                len(self.staged_files), self.staged_size / (1024 * 1024),
+                self.staging_time
+            )
+        )
+
+    def estimate(self, task):
+        """Returns the estimated runtime of a task based on previous runs."""
+        project, toolchain, board = task[:3]
+        return self.history.estimate(
+            get_catalog().get_project_name(project), toolchain, board
+        )
+
+    def estimate_memory(self, task):
+        """Returns the estimated peak memory use (MiB) of a task based on
+        previous runs."""
+        project, toolchain, board = task[:3]
+        return self.history.estimate_memory(
+            get_catalog().get_project_name(project), toolchain, board
+        )
+
+    def fits_in_memory(self, task, running):
+        """Returns whether a task can be started without exceeding the memory
+        budget.
+
+        Running tasks are charged with their live RSS, or with their predicted
+        peak RSS when that is higher, as they might not have reached it yet.
+        A task is always allowed to start when nothing else is running.
+        """
+        if self.max_mem is None or not running:
+            return True
+
+        live_rss = get_tree_rss([process.pid for process in running])
+        used = sum(
+            max(live_rss[process.pid], running_task.memory)
+            for process, running_task in running.items()
+        )
+
+        return used + self.estimate_memory(task) <= self.max_mem
+
+    def get_required_cores(self, task):
+        toolchain = task[1]
+        return max(1, min(toolchains[toolchain].cores(), len(self.cores)))
+
+    def get_base_task(self, task):
+        """Returns the task of the base toolchain (see
+        Toolchain.base_toolchain) a task starts from, if any."""
+        base_toolchain = toolchains[task.toolchain].base_toolchain()
+        if base_toolchain is None:
+            return None
+
+        entry = (
+            task.project, base_toolchain, task.board, task.seed, task.option,
+            task.build_number
+        )
+        return Task(*entry, get_task_id(*entry))
+
+    def might_run(self, task):
+        """Returns whether a task is, or might still become, part of the
+        run."""
+        if task in self.queued:
+            return True
+        if self.stream_exhausted:
+            return False
+
+        # Tasks are still being generated, from the selected combinations
+        return self.combinations is None or task[:3] in self.combinations
+
+    def has_dependents(self, task):
+        """Returns whether tasks of the run start from the build of a task
+        (see get_base_task)."""
+        for toolchain, toolchain_class in toolchains.items():
+            if toolchain_class.base_toolchain() != task.toolchain:
+                continue
+
+            entry = (
+                task.project, toolchain, task.board, task.seed, task.option,
+                task.build_number
+            )
+            if self.might_run(Task(*entry, get_task_id(*entry))):
+                return True
+
+        return False
+
+    def get_dependency(self, task):
+        """Returns the task that has to finish before a task starts, if any.
+
+        A task whose toolchain starts from the build of a base toolchain
+        (e.g. vpr-fasm2bels) waits for the matching task of the base
+        toolchain, as long as that task might be part of the run.
+
+        With shared synthesis, the first task of each project, toolchain and
+        board combination synthesizes the design and the other ones (other
+        seeds, build numbers or parameters) start once it finished.
+        """
+        base_task = self.get_base_task(task)
+        if base_task is not None and self.might_run(base_task):
+            return base_task
+
+        if not self.share_synthesis:
+            return None
+        if not toolchains[task.toolchain].has_synthesis_stage():
+            return None
+
+        synthesis_task = self.synthesis_tasks.setdefault(
+            (task.project, task.toolchain, task.board), task
+        )
+        return None if synthesis_task == task else synthesis_task
+
+    def is_waiting(self, task):
+        """Returns whether a task waits for another task, or for its chip
+        databases to be staged."""
+        dependency = self.get_dependency(task)
+        if dependency is not None and dependency not in self.finished:
+            return True
+
+        return self.chipdb_dir is not None and not self.stage_chip_files(task)
+
+    def next_task(self, pending, running):
+        """Pops the first pending task that fits in the memory budget and
+        does not wait for another task.
+
+        The search stops at the first task that does not have enough free
+        cores, so that multi-core tasks are not starved by smaller ones.
+        """
+        for idx, task in enumerate(pending):
+            if self.is_waiting(task):
+                continue
+
+            if self.get_required_cores(task) > len(self.free_cores):
+                break
+
+            if self.fits_in_memory(task, running):
+                return pending.pop(idx)
+
+        return None
+
+    def reserve_cores(self, task):
+        """Reserves the physical cores needed by a task and returns the
+        logical CPUs belonging to them."""
+        required = self.get_required_cores(task)
+        reserved = self.free_cores[:required]
+        self.free_cores = self.free_cores[required:]
+
+        return reserved
+
+    def release_cores(self, reserved):
+        self.free_cores = sorted(self.free_cores + reserved)
+
+    def select_shard(self, index, count):
+        """Restricts the tasks to the index-th (1-based) of count shards.
+
+        The shards are balanced by estimated runtime only if the history
+        files are given, as all the nodes must compute the same partition:
+        the history found in the output prefix of each node only holds its
+        own shard. Otherwise the tasks are spread by task ID.
+        """
+        if self.history_files is None:
+            estimates = {task: 0.0 for task in self.task_list}
+        else:
+            estimates = {task: self.estimate(task) for task in self.task_list}
+        shards = partition(estimates.keys(), estimates, count)
+        self.task_list = shards[index - 1]
+
+        if self.history_files is None:
+            print(
+                'Shard {}/{}: {} tasks (no history given, split by task ID)'.
+                format(index, count, len(self.task_list))
+            )
+            return
+
+        loads = [sum(estimates[task] for task in shard) for shard in shards]
+        print(
+            'Shard {}/{}: {} tasks, estimated {:.1f}s (shards: {})'.format(
+                index, count, len(self.task_list), loads[index - 1],
+                ', '.join('{:.1f}s'.format(load) for load in loads)
+            )
+        )
+
+    def order_tasks(self):
+        """Sorts the tasks so that the most expensive ones are dispatched
+        first (longest processing time first)."""
+        estimates = {task: self.estimate(task) for task in self.task_list}
+        tasks = sorted(
+            self.task_list, key=lambda task: estimates[task], reverse=True
         )
 
+        self.predicted_makespan = predict_makespan(
+            [
+                (estimates[task], self.get_required_cores(task))
+                for task in tasks
+            ], len(self.cores)
+        )
+
+        return tasks
+
     def run(self):
+        get_catalog(refresh=True)
         os.makedirs(os.path.expanduser(self.out_prefix), exist_ok=True)
         print('Writing to %s' % self.out_prefix)
 
-        with Pool(self.num_cpu) as pool:
-            for _ in pool.imap_unordered(self.worker, self.task_list):
-                pass
+        if self.progress_interval is not None:
+            os.makedirs(
+                os.path.join(self.root_dir, self.out_prefix, '.progress'),
+                exist_ok=True
+            )
+
+        if len(self.history):
+            tasks = self.order_tasks()
+            count = len(tasks)
+        else:
+            # Without history all the tasks have the same estimate: run them
+            # as they get generated, instead of expanding the whole list first.
+            tasks = self.task_list
+            count = len(self.cores)
+        task_list, stream = [], iter(tasks)
+
+        # Process -> RunningTask
+        running = dict()
+
+        start = time.time()
+        self.pull(task_list, stream, count)
+        while task_list or running:
+            while task_list and self.free_cores:
+                task = self.next_task(task_list, running)
+                if task is None:
+                    if not all(map(self.is_waiting, task_list)):
+                        break
+
+                    # Do not leave cores idle while the queued tasks wait for
+                    # other tasks.
+                    if not self.pull(task_list, stream, 1):
+                        break
+                    continue
+
+                self.pull(task_list, stream, 1)
+
+                reserved = self.reserve_cores(task)
+                cpus = [cpu for core in reserved for cpu in self.cores[core]]
+
+                process = Process(target=self.worker, args=(task, cpus))
+                process.start()
+                running[process] = RunningTask(
+                    task, self.estimate_memory(task), reserved, time.time()
+                )
+
+            # Wake up as soon as a task finishes, or periodically to re-check
+            # the memory budget and the timeouts.
+            wait([process.sentinel for process in running], self.poll_interval)
+
+            self.kill_expired(running)
+            self.print_progress(running)
+
+            for process in [p for p in running if not p.is_alive()]:
+                process.join()
+                running_task = running.pop(process)
+                if process.exitcode != 0 and not self.has_metadata(
+                        running_task.task, running_task.start):
+                    self.write_failure(running_task.task, process.exitcode)
+                self.release_cores(running_task.cores)
+                self.finished.add(running_task.task)
+                self.clean_scratch_dir(running_task.task)
+                self.clean_progress_file(running_task.task)
+
+                if self.fail_fast and self.failed_required is None:
+                    if self.is_required_failure(running_task.task):
+                        self.failed_required = running_task.task
+                        self.cancel(task_list, stream, running)
+                        stream = iter(())
+        self.actual_makespan = time.time() - start
+
+        self.stop_staging()
+
+    def pull(self, task_list, stream, count):
+        """Queues up to count tasks from the task stream.
+
+        Returns whether the stream still had tasks.
+        """
+        tasks = list(islice(stream, count))
+        task_list.extend(tasks)
+        self.queued.update(tasks)
+        if len(tasks) < count:
+            self.stream_exhausted = True
+
+        return len(tasks) > 0
+
+    def clean_scratch_dir(self, task):
+        """Removes what is left in the scratch directory by a task that was
+        killed."""
+        if self.scratch_dir is None:
+            return
+
+        for path in glob.glob(os.path.join(self.scratch_dir,
+                                           '*_{}'.format(task.task_id))):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def get_progress_file(self, task):
+        """Returns the file a running task keeps its progress in, if the
+        progress is followed."""
+        if self.progress_interval is None:
+            return None
+
+        return os.path.join(
+            self.root_dir, self.out_prefix, '.progress',
+            '{}.json'.format(task.task_id)
+        )
+
+    def clean_progress_file(self, task):
+        progress_file = self.get_progress_file(task)
+        if progress_file is not None and os.path.exists(progress_file):
+            os.remove(progress_file)
+
+    def print_progress(self, running):
+        """Prints the progress of the running tasks, parsed from the logs of
+        their tools, every progress_interval seconds."""
+        if self.progress_interval is None:
+            return
+
+        now = time.time()
+        if self.progress_printed is not None and now - self.progress_printed < self.progress_interval:
+            return
+        self.progress_printed = now
+
+        print(
+            'Progress: {} running, {} finished'.format(
+                len(running), len(self.finished)
+            )
+        )
+        for running_task in running.values():
+            progress = read_progress(
+                self.get_progress_file(running_task.task)
+            ) or dict()
+
+            status = [progress.get('stage', 'starting')]
+            if 'iteration' in progress:
+                status.append('iteration {}'.format(progress['iteration']))
+            if 'overused' in progress:
+                status.append('{} overused nodes'.format(progress['overused']))
+            if 'cpd' in progress:
+                status.append('critical path {} ns'.format(progress['cpd']))
+
+            print(
+                '  {}: {} ({:.0f}s)'.format(
+                    ' '.join(str(x) for x in running_task.task[:3]),
+                    ', '.join(status), now - running_task.start
+                )
+            )
+
+    def get_out_dir(self, task):
+        """Returns the output directory of a finished task, if any."""
+        metadata_path = '*_{}/meta.json'.format(task.task_id)
+        for filename in glob.iglob(os.path.join(self.root_dir, self.out_prefix,
+                                                metadata_path)):
+            return os.path.dirname(filename)
+
+        return None
+
+    def has_metadata(self, task, start):
+        """Returns whether a task wrote its metadata since start."""
+        out_dir = self.get_out_dir(task)
+        if out_dir is None:
+            return False
+
+        return os.path.getmtime(os.path.join(out_dir, 'meta.json')) >= start
+
+    def write_failure(self, task, exitcode):
+        """Writes the metadata of a task that died without writing it (e.g.
+        on an error setting up its project, or killed after its timeout), so
+        that it is reported as failed. Returns its output directory."""
+        project, toolchain, board, seed, option, build_number, task_id = task
+
+        if task in self.expired:
+            status = 'timeout'
+        elif task in self.cancelled:
+            status = 'cancelled'
+        else:
+            status = 'failed'
+
+        # Describe the task as fpgaperf.run does, without instantiating the
+        # toolchain, which might be what failed.
+        catalog = get_catalog()
+        project_dict = catalog.get_project(project)
+        board_info = catalog.boards[board]
+
+        tch = Toolchain(self.root_dir)
+        tch.toolchain = toolchain
+        tch.strategy = None
+        tch.family = board_info['family']
+        tch.device = board_info['device']
+        tch.package = board_info['package']
+        tch.part = "".join(
+            (tch.device, tch.package)
+        ) if tch.package is not None else tch.device
+        tch.board = board
+        tch.vendor = next(
+            iter(get_vendors(toolchain=toolchain, board=board)), None
+        )
+        tch.project_name = project_dict['name']
+        tch.top = project_dict['top']
+        tch.srcs = tch.canonicalize(project_dict['srcs'])
+        if toolchains[toolchain].seedable():
+            tch.seed = seed
+        tch.params_string = option
+        tch.build = self.build_format.format(build_number)
+        tch.build_type = self.build_type
+        tch.task_id = task_id
+        for extension in ('pcf', 'sdc', 'xdc', 'pdc'):
+            constraint = get_constraint(
+                tch.project_name, board, toolchain, extension
+            )
+            setattr(
+                tch, extension,
+                os.path.realpath(constraint) if constraint else None
+            )
+
+        # Keep the output directory created by the task, if any
+        out_dirs = glob.glob(
+            os.path.join(
+                self.root_dir, self.out_prefix, '*_{}'.format(task_id)
+            )
+        )
+        if out_dirs:
+            tch.out_dir = out_dirs[0]
+        else:
+            tch.out_dir = os.path.join(
+                self.root_dir, self.out_prefix, tch.design()
+            )
+            os.makedirs(tch.out_dir, exist_ok=True)
+
+        print(
+            'Task {} exited with code {} without writing its metadata'.format(
+                ' '.join(str(x) for x in task[:3]), exitcode
+            )
+        )
+        tch.write_failure_metadata(
+            ['Exited with code {}'.format(exitcode)], status
+        )
+
+        return tch.out_dir
+
+    def get_status(self, task):
+        """Returns the status recorded in the metadata of a finished task.
+
+        Tasks without metadata were killed before writing it.
+        """
+        out_dir = self.get_out_dir(task)
+        if out_dir is None:
+            return "failed"
+
+        with open(os.path.join(out_dir, 'meta.json'), 'r') as fp:
+            return json.load(fp)["status"]
+
+    def is_required_failure(self, task):
+        # Aborted tasks were given up on purpose
+        return get_catalog().is_required(
+            task.project, task.toolchain
+        ) and self.get_status(task) not in ("succeeded", "aborted")
+
+    def cancel(self, task_list, stream, running):
+        """Drops the queued tasks and stops the running ones, giving them
+        time to record their cancellation."""
+        print(
+            'Required task {} failed, cancelling the remaining tasks'.format(
+                ' '.join(str(x) for x in self.failed_required[:3])
+            )
+        )
+
+        self.cancelled = task_list + list(stream)
+        self.cancelled += [
+            running_task.task for running_task in running.values()
+        ]
+        task_list.clear()
+
+        # All the tasks share the same grace period
+        terminate_process_groups(
+            [process.pid for process in running], self.cancel_grace
+        )
+
+    def print_cancelled(self):
+        if self.failed_required is None:
+            return
+
+        print(
+            'Fail fast: {} tasks cancelled after {} failed'.format(
+                len(self.cancelled),
+                ' '.join(str(x) for x in self.failed_required[:3])
+            )
+        )
+
+    def kill_expired(self, running):
+        """Kills the session of the tasks that did not stop by themselves
+        after the timeout was reached."""
+        if not self.timeout:
+            return
+
+        deadline = time.time() - self.timeout - self.timeout_grace
+        for process, running_task in running.items():
+            if running_task.start < deadline and process.is_alive():
+                self.expired.add(running_task.task)
+                print(
+                    'Killing {} after timeout'.format(
+                        ' '.join(str(x) for x in running_task.task[:3])
+                    )
+                )
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def print_makespan(self):
+        if not len(self.history):
+            print(
+                'Makespan: {:.1f}s (no history available for a prediction)'.
+                format(self.actual_makespan)
+            )
+            return
+
+        print(
+            'Makespan: predicted {:.1f}s, actual {:.1f}s'.format(
+                self.predicted_makespan, self.actual_makespan
+            )
+        )
 
     def get_reports(self):
         reports = []
@@ -141,7 +878,9 @@ class Runner:
     def merge_results(self):
         exclude_results = [
             "date", "build_type", "carry", "cmds", "design", "parameters",
-            "sources", "strategy", "optstr", "top", "xdc", "sdc", "pcf"
+            "sources", "strategy", "optstr", "top", "xdc", "sdc", "pcf",
+            "cpu_affinity", "fingerprint", "task_id", "cache_hit",
+            "stage_cache_hits", "base_build", "pruned_bytes", "progress"
         ]
         for report in self.get_reports():
             sow.merge(
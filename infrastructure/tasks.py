@@ -17,10 +17,29 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import hashlib
+import json
 import os
+from collections import namedtuple
 from itertools import product
 
-from fpgaperf import get_projects, get_project, get_toolchains, get_constraint, get_vendors, verify_constraint
+from fpgaperf import get_catalog, get_toolchains, get_constraint, verify_constraint
+
+Task = namedtuple(
+    'Task', [
+        'project', 'toolchain', 'board', 'seed', 'option', 'build_number',
+        'task_id'
+    ]
+)
+
+
+def get_task_id(project, toolchain, board, seed, option, build_number):
+    """Returns an identifier derived from the content of a task, stable across
+    runs and machines."""
+    content = json.dumps(
+        [project, toolchain, board, seed, option, build_number]
+    )
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()[:12]
 
 
 class Tasks:
@@ -44,21 +63,17 @@ class Tasks:
 
         combinations = set()
 
-        vendors = get_vendors()
-        for project_file in get_projects():
-            project_dict = get_project(project_file)
+        catalog = get_catalog()
+        vendors = catalog.vendors
+        for project_file, project_dict in catalog.projects.items():
             project_name = project_dict["name"]
 
             for vendor in project_dict["vendors"]:
-                project_boards = project_dict["vendors"][vendor]
-
                 toolchains = vendors[vendor]["toolchains"]
                 vendor_boards = vendors[vendor]["boards"]
                 skip_toolchains = project_dict.get("skip_toolchains", list())
 
-                boards = [
-                    board for board in project_boards if board in vendor_boards
-                ]
+                boards = catalog.get_project_boards(project_file, vendor)
 
                 if all_combinations:
                     boards = vendor_boards
@@ -74,18 +89,12 @@ class Tasks:
     def get_all_combinations(self):
         return self.iter_options(all_combinations=True)
 
-    def get_tasks(
-        self,
-        args,
-        seeds=[0],
-        build_number=[0],
-        options=[None],
-        only_required=False
-    ):
-        """Returns all the tasks filtering out the ones that do not correspond
-        to the selected criteria"""
+    def select_combinations(self, args, only_required=False):
+        """Returns the (project, toolchain, board) combinations that
+        correspond to the selected criteria."""
 
-        tasks = []
+        catalog = get_catalog()
+        combinations = []
 
         for task in self.tasks:
             take_task = True
@@ -103,37 +112,36 @@ class Tasks:
 
             if take_task:
                 if only_required:
-                    required_toolchains = get_project(prj_file).get(
-                        "required_toolchains", []
-                    )
-                    if toolchain in required_toolchains:
-                        tasks.append(runner_task)
+                    if catalog.is_required(prj_file, toolchain):
+                        combinations.append(runner_task)
                 else:
-                    tasks.append(runner_task)
+                    combinations.append(runner_task)
 
-        tasks = self.add_extra_entry(seeds, tasks, create_new_tasks=True)
-        tasks = self.add_extra_entry(options, tasks)
-        tasks = self.add_extra_entry(
-            build_number, tasks, create_new_tasks=True
-        )
-        return tasks
+        return combinations
 
-    def add_extra_entry(
-        self, entries, tasks, with_idx=False, create_new_tasks=False
+    def iter_tasks(
+        self,
+        args,
+        seeds=[0],
+        build_number=[0],
+        options=[None],
+        only_required=False
     ):
-        def add_tuple_to_tasks(tasks, tpl):
-            new_tasks = []
+        """Yields all the tasks, filtering out the ones that do not correspond
+        to the selected criteria.
 
-            for task in tasks:
-                new_tasks.append(task + tpl)
+        The tasks are generated lazily, so that large sweeps (e.g. many
+        parameters combinations) can start running right away.
+        """
 
-            return new_tasks
+        tasks = self.select_combinations(args, only_required)
 
-        task_list = []
-        for idx, entry in enumerate(entries):
-            if create_new_tasks:
-                task_list += add_tuple_to_tasks(tasks, (entry, ))
-            else:
-                task_list = add_tuple_to_tasks(tasks, (entry, ))
+        for build, option, seed, task in product(build_number, options, seeds,
+                                                 tasks):
+            entry = task + (seed, option, build)
+            yield Task(*entry, get_task_id(*entry))
 
-        return task_list
+    def get_tasks(self, *args, **kwargs):
+        """Returns all the tasks filtering out the ones that do not correspond
+        to the selected criteria"""
+        return list(self.iter_tasks(*args, **kwargs))
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+import timeit
+
+import asciitable
+from terminaltables import AsciiTable
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.utils import get_vivado_max_freq
+from utils.vivado_report import read_report_tables
+
+UTILIZATION_SECTIONS = [
+    ('1.', 'Slice Logic'),
+    ('1.1', 'Summary of Registers by Type'),
+    ('2.', 'Slice Logic Distribution'),
+    ('3.', 'Memory'),
+    ('4.', 'DSP'),
+    ('5.', 'IO and GT Specific'),
+    ('6.', 'Clocking'),
+    ('7.', 'Specific Feature'),
+    ('8.', 'Primitives'),
+    ('9.', 'Black Boxes'),
+    ('10.', 'Instantiated Netlists'),
+]
+
+
+def scrape_resources(report_file):
+    """Former parsing of the primitives of a utilization report, kept as the
+    reference of the benchmark."""
+    with open(report_file, 'r') as fp:
+        report_data = fp.read()
+        report_data = report_data.split('\n\n')
+        report = dict()
+        section = None
+        for d in report_data:
+            match = re.search(r'\n-+$', d)
+            if match is not None:
+                match = re.search(r'\n?[0-9\.]+ (.*)', d)
+                if match is not None:
+                    section = match.groups()[0]
+            if d.startswith('+--'):
+                if section is not None:
+                    # cleanup the table
+                    d = re.sub(r'\+-.*-\+\n', '', d)
+                    d = re.sub(r'\+-.*-\+$', '', d)
+                    d = re.sub(r'^\|\s+', '', d, flags=re.M)
+                    d = re.sub(r'\s\|\n', '\n', d)
+
+                    report[section.lower()] = asciitable.read(
+                        d,
+                        delimiter='|',
+                        guess=False,
+                        comment=r'(\+.*)|(\*.*)',
+                        numpy=False
+                    )
+
+    prims = report["primitives"]
+    zip_it = zip(prims["Ref Name"], prims["Used"])
+
+    return dict(zip_it)
+
+
+def read_resources(report_file):
+    tables = read_report_tables(report_file, ['Primitives'])
+
+    return {row['Ref Name']: row['Used'] for row in tables['primitives']}
+
+
+def format_table(header, rows):
+    widths = [
+        max(len(str(cell))
+            for cell in column)
+        for column in zip(header, *rows)
+    ]
+    border = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+
+    def format_row(row):
+        return '| ' + ' | '.join(
+            str(cell).rjust(width) for cell, width in zip(row, widths)
+        ) + ' |'
+
+    return '\n'.join(
+        [border, format_row(header), border] +
+        [format_row(row) for row in rows] + [border]
+    )
+
+
+def write_utilization_report(fp, rows):
+    """Writes a utilization report with the layout of report_utilization,
+    with the given number of rows in each table."""
+    fp.write('Copyright 1986-2020 Xilinx, Inc. All Rights Reserved.\n')
+    fp.write('-' * 80 + '\n')
+    fp.write('| Tool Version : Vivado v.2020.2 (lin64) Build 3064766\n')
+    fp.write('| Design       : top\n')
+    fp.write('| Device       : 7a35ticsg324-1L\n')
+    fp.write('-' * 80 + '\n\n')
+    fp.write('Utilization Design Information\n\n')
+    fp.write('Table of Contents\n-----------------\n')
+    for number, section in UTILIZATION_SECTIONS:
+        fp.write(f'{number} {section}\n')
+
+    for number, section in UTILIZATION_SECTIONS:
+        heading = f'{number} {section}'
+        fp.write(f'\n{heading}\n{"-" * len(heading)}\n\n')
+        if section == 'Primitives':
+            header = ['Ref Name', 'Used', 'Functional Category']
+            table = [[f'PRIM{i}', i * 7, 'Flop & Latch'] for i in range(rows)]
+        else:
+            header = ['Site Type', 'Used', 'Fixed', 'Available', 'Util%']
+            table = [
+                [f'Site {i}*', i, 0, 63400, f'{i / 634:.2f}']
+                for i in range(rows)
+            ]
+        fp.write(format_table(header, table) + '\n')
+        fp.write('* Warning! The Final LUT count may be lower.\n')
+
+
+def write_timing_summary(fp, paths):
+    """Writes a timing summary with the layout of report_timing_summary, with
+    the given number of detailed paths."""
+    fp.write('Timing Report\n\n')
+    fp.write('Slack (MET) :              1.000ns  (required time)\n\n')
+    for i in range(paths):
+        group = f'clk{i % 8}'
+        path_type = 'Setup (Max' if i % 2 == 0 else 'Hold (Min'
+        fp.write(f'Slack (MET) :              {i % 5}.250ns\n')
+        fp.write(f'  Source:                 reg{i}_reg/C\n')
+        fp.write(f'  Destination:            reg{i + 1}_reg/D\n')
+        fp.write(f'  Path Group:             {group}\n')
+        fp.write(f'  Path Type:              {path_type} at Slow Corner)\n')
+        fp.write(
+            f'  Requirement:            10.000ns  ({group} rise@10.000ns '
+            f'- {group} rise@0.000ns)\n'
+        )
+        fp.write(
+            f'  Data Path Delay:        {5 + i % 3}.500ns  '
+            '(logic 1.000ns (20.0%)  route 4.500ns (80.0%))\n\n'
+        )
+        fp.write(
+            '    Location             Delay type                Incr(ns)  '
+            'Path(ns)    Netlist Resource(s)\n'
+        )
+        fp.write('  -------------------    -------------------\n')
+        for j in range(30):
+            fp.write(
+                f'    SLICE_X{j}Y{i % 100}         FDRE (Prop_fdre_C_Q)  '
+                f'0.456     {j}.456 r  reg{i}_reg/Q\n'
+            )
+        fp.write('\n')
+
+
+def measure(function, report_file, repeat):
+    timer = timeit.Timer(lambda: function(report_file))
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat, number)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the parsing of the Vivado reports'
+    )
+    parser.add_argument(
+        '--utilization',
+        nargs='*',
+        default=list(),
+        help='Utilization reports (e.g. of baselitex and ibex builds)'
+    )
+    parser.add_argument(
+        '--timing-summary',
+        nargs='*',
+        default=list(),
+        help='Timing summary reports'
+    )
+    parser.add_argument(
+        '--rows',
+        type=int,
+        default=1000,
+        help='Rows of the tables of the generated utilization report'
+    )
+    parser.add_argument(
+        '--paths',
+        type=int,
+        default=1000,
+        help='Detailed paths of the generated timing summary'
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=5, help='Repetitions of each measure'
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        utilization = args.utilization
+        if not utilization:
+            report_file = os.path.join(tmp_dir, 'utilization.rpt')
+            with open(report_file, 'w') as fp:
+                write_utilization_report(fp, args.rows)
+            utilization = [report_file]
+
+        timing_summary = args.timing_summary
+        if not timing_summary:
+            report_file = os.path.join(tmp_dir, 'timing_summary.rpt')
+            with open(report_file, 'w') as fp:
+                write_timing_summary(fp, args.paths)
+            timing_summary = [report_file]
+
+        table_data = [
+            ['Report', 'Size (KiB)', 'Scraping (ms)', 'Streaming (ms)']
+        ]
+        for report_file in utilization:
+            if scrape_resources(report_file) != read_resources(report_file):
+                print(f'Mismatching resources in {report_file}')
+                sys.exit(1)
+
+            table_data.append(
+                [
+                    os.path.basename(report_file),
+                    os.path.getsize(report_file) // 1024,
+                    '{:.3f}'.format(
+                        measure(scrape_resources, report_file, args.repeat) *
+                        1e3
+                    ),
+                    '{:.3f}'.format(
+                        measure(read_resources, report_file, args.repeat) * 1e3
+                    ),
+                ]
+            )
+
+        for report_file in timing_summary:
+            table_data.append(
+                [
+                    os.path.basename(report_file),
+                    os.path.getsize(report_file) // 1024,
+                    '',
+                    '{:.3f}'.format(
+                        measure(get_vivado_max_freq, report_file, args.repeat)
+                        * 1e3
+                    ),
+                ]
+            )
+
+    print(AsciiTable(table_data).table)
+
+
+if __name__ == '__main__':
+    main()
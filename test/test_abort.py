@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.abort import SlowCriticalPath, StalledRouting, check_abort_policy, get_abort_policies
+
+
+def first_abort(policy, statuses):
+    """Returns the index of the status the policy gives up at, if any."""
+    for idx, status in enumerate(statuses):
+        if policy.check(status) is not None:
+            return idx
+
+    return None
+
+
+def routing(*overused):
+    return [
+        {
+            'iteration': iteration,
+            'overused': count
+        } for iteration, count in overused
+    ]
+
+
+class TestStalledRouting(unittest.TestCase):
+    def test_sequences(self):
+        # (iterations, statuses, index of the first abort)
+        cases = [
+            # Improving at every iteration
+            (2, routing((1, 50), (2, 40), (3, 30), (4, 20)), None),
+            # No improvement since iteration 2
+            (2, routing((1, 50), (2, 40), (3, 40), (4, 45)), 3),
+            (3, routing((1, 50), (2, 40), (3, 40), (4, 45)), None),
+            # An improvement restarts the count
+            (2, routing((1, 50), (2, 50), (3, 40), (4, 40), (5, 41)), 4),
+            # The router started over: its iterations are counted again
+            (
+                2,
+                routing((1, 50), (2, 20), (3, 30), (1, 60), (2, 70),
+                        (3, 80)), 5
+            ),
+            (2, routing((1, 50), (2, 20), (3, 30), (1, 60), (2, 50)), None),
+            # Not routing yet
+            (1, [{}, {
+                'stage': 'place'
+            }, {
+                'iteration': 1
+            }], None),
+        ]
+        for iterations, statuses, expected in cases:
+            with self.subTest(iterations=iterations, statuses=statuses):
+                self.assertEqual(
+                    first_abort(StalledRouting(iterations), statuses), expected
+                )
+
+
+class TestSlowCriticalPath(unittest.TestCase):
+    def test_sequences(self):
+        # (margin, best critical path, statuses, index of the first abort)
+        cases = [
+            (10, 5.0, [{
+                'cpd': 5.0
+            }, {
+                'cpd': 5.5
+            }, {
+                'cpd': 5.0
+            }], None),
+            (10, 5.0, [{
+                'cpd': 5.0
+            }, {
+                'cpd': 5.6
+            }], 1),
+            (0, 5.0, [{
+                'cpd': 4.0
+            }, {
+                'cpd': 5.01
+            }], 1),
+            # No critical path yet, or nothing to compare to
+            (10, 5.0, [{}, {
+                'iteration': 1
+            }], None),
+            (10, None, [{
+                'cpd': 50.0
+            }], None),
+        ]
+        for margin, best, statuses, expected in cases:
+            with self.subTest(margin=margin, best=best, statuses=statuses):
+                self.assertEqual(
+                    first_abort(SlowCriticalPath(margin, best), statuses),
+                    expected
+                )
+
+
+class TestAbortPolicies(unittest.TestCase):
+    def test_check_abort_policy(self):
+        for spec in ['stall:10', 'cpd:5', 'cpd:2.5']:
+            with self.subTest(spec=spec):
+                self.assertEqual(check_abort_policy(spec), spec)
+
+        for spec in ['stall', 'stall:', 'stall:1.5', 'cpd:x', 'slow:5', '']:
+            with self.subTest(spec=spec):
+                with self.assertRaises(ValueError):
+                    check_abort_policy(spec)
+
+    def test_get_abort_policies(self):
+        policies = get_abort_policies(['stall:10', 'cpd:2.5'], 4.0)
+
+        self.assertIsInstance(policies[0], StalledRouting)
+        self.assertEqual(policies[0].iterations, 10)
+        self.assertIsInstance(policies[1], SlowCriticalPath)
+        self.assertEqual(policies[1].margin, 2.5)
+        self.assertEqual(policies[1].best_critical_path, 4.0)
+        self.assertEqual(get_abort_policies(None), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.cache import BuildCache
+
+
+class TestBuildCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, 'cache')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def make_build(self, name, files):
+        out_dir = os.path.join(self.tmp_dir, name)
+        os.makedirs(out_dir)
+        for filename, content in files.items():
+            with open(os.path.join(out_dir, filename), 'w') as fp:
+                fp.write(content)
+        return out_dir
+
+    def get_hidden_dirs(self, cache):
+        return [
+            name for _, dirs, _ in os.walk(cache.cache_dir) for name in dirs
+            if name.startswith('.')
+        ]
+
+    def test_restore_miss(self):
+        cache = BuildCache(self.cache_dir)
+        out_dir = self.make_build('out', {})
+
+        self.assertIsNone(cache.restore('0123456789abcdef', out_dir))
+        self.assertEqual(os.listdir(out_dir), [])
+
+    def test_store_restore(self):
+        cache = BuildCache(self.cache_dir)
+        build_dir = self.make_build(
+            'build', {
+                'meta.json': '{}',
+                'route.log': 'log',
+                'top.bit': 'bitstream'
+            }
+        )
+        cache.store('0123456789abcdef', build_dir, ['meta.json', '*.log'])
+
+        out_dir = self.make_build('out', {})
+        names = cache.restore('0123456789abcdef', out_dir)
+        self.assertEqual(sorted(names), ['meta.json', 'route.log'])
+        self.assertEqual(sorted(os.listdir(out_dir)), sorted(names))
+        with open(os.path.join(out_dir, 'route.log'), 'r') as fp:
+            self.assertEqual(fp.read(), 'log')
+
+    def test_atomic_store(self):
+        cache = BuildCache(self.cache_dir)
+        key = '0123456789abcdef'
+        entry_dir = cache.get_entry_dir(key)
+        mkdtemp = tempfile.mkdtemp
+
+        def concurrent_store(*args, **kwargs):
+            # Another build stores the same entry while this one copies
+            # its files
+            os.makedirs(entry_dir)
+            with open(os.path.join(entry_dir, 'meta.json'), 'w') as fp:
+                fp.write('concurrent')
+            return mkdtemp(*args, **kwargs)
+
+        build_dir = self.make_build('build', {'meta.json': 'build'})
+        with mock.patch('utils.cache.tempfile.mkdtemp', concurrent_store):
+            cache.store(key, build_dir, ['meta.json'])
+
+        # The entry is never mixed up or overwritten, and the partial copy
+        # is removed
+        self.assertEqual(os.listdir(entry_dir), ['meta.json'])
+        with open(os.path.join(entry_dir, 'meta.json'), 'r') as fp:
+            self.assertEqual(fp.read(), 'concurrent')
+        self.assertEqual(self.get_hidden_dirs(cache), [])
+
+        # Storing an existing entry leaves it as is
+        cache.store(key, build_dir, ['meta.json'])
+        with open(os.path.join(entry_dir, 'meta.json'), 'r') as fp:
+            self.assertEqual(fp.read(), 'concurrent')
+
+    def test_eviction(self):
+        # Each entry takes 0.4 MiB, only two of them fit
+        cache = BuildCache(self.cache_dir, max_size=1)
+        content = 'x' * (400 * 1024)
+        keys = ['{:016x}'.format(idx) for idx in range(3)]
+
+        now = time.time()
+        for idx, key in enumerate(keys[:2]):
+            build_dir = self.make_build(key, {'meta.json': content})
+            cache.store(key, build_dir, ['meta.json'])
+            last_use = now - 100 + idx
+            os.utime(cache.get_entry_dir(key), (last_use, last_use))
+
+        # The first entry becomes the most recently used one
+        self.assertIsNotNone(
+            cache.restore(keys[0], self.make_build('out', {}))
+        )
+
+        build_dir = self.make_build(keys[2], {'meta.json': content})
+        cache.store(keys[2], build_dir, ['meta.json'])
+
+        self.assertTrue(os.path.exists(cache.get_entry_dir(keys[0])))
+        self.assertFalse(os.path.exists(cache.get_entry_dir(keys[1])))
+        self.assertTrue(os.path.exists(cache.get_entry_dir(keys[2])))
+        self.assertLessEqual(
+            sum(size for _, size, _ in cache.get_entries()), 1024 * 1024
+        )
+
+    def test_no_eviction_without_limit(self):
+        cache = BuildCache(self.cache_dir)
+        for idx in range(3):
+            key = '{:016x}'.format(idx)
+            build_dir = self.make_build(key, {'meta.json': 'x' * 1024})
+            cache.store(key, build_dir, ['meta.json'])
+
+        self.assertEqual(len(cache.get_entries()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import infrastructure.runner
+from infrastructure.distributed import Coordinator, Worker, receive_message, send_message
+from infrastructure.runner import Runner
+from infrastructure.tasks import Task, get_task_id
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def stub_run(board, toolchain, project, *args, **kwargs):
+    '''Stands for fpgaperf.run: writes the metadata and the log of a build,
+    or fails before writing anything for seed 1.'''
+    out_prefix, seed, task_id = args[3], args[7], kwargs['task_id']
+    best_critical_path = kwargs['best_critical_path']
+    if seed == 1:
+        raise ValueError('Missing source file')
+
+    out_dir = os.path.join(
+        out_prefix, '{}_{}_{}_{}'.format(project, toolchain, board, task_id)
+    )
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as fp:
+        json.dump(
+            {
+                'status': 'succeeded',
+                'task_id': task_id,
+                'max_freq': {
+                    'clk': {
+                        'actual': 100.0
+                    }
+                },
+                'best_critical_path': best_critical_path
+            }, fp
+        )
+    with open(os.path.join(out_dir, 'stub.log'), 'w') as fp:
+        fp.write('Built {}\n'.format(task_id))
+
+    return out_dir
+
+
+def make_task(seed):
+    entry = ('oneblink', 'vpr', 'basys3', seed, None, 0)
+    return Task(*entry, get_task_id(*entry))
+
+
+class TestDistributed(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.run = infrastructure.runner.run
+        # The task processes are forked, they run the stub as well
+        infrastructure.runner.run = stub_run
+
+    def tearDown(self):
+        infrastructure.runner.run = self.run
+        shutil.rmtree(self.tmp_dir)
+
+    def make_runner(self, tasks, out_prefix):
+        return Runner(
+            tasks, False, os.path.join(self.tmp_dir, out_prefix), root_dir,
+            'generic', [0], False, 1
+        )
+
+    def test_coordinator_worker(self):
+        tasks = [make_task(seed) for seed in (0, 1, 2)]
+        coordinator_runner = self.make_runner(tasks, 'coordinator')
+        worker_runner = self.make_runner([], 'worker')
+        address = 'unix:' + os.path.join(self.tmp_dir, 'socket')
+
+        coordinator = Coordinator(address, coordinator_runner)
+        thread = threading.Thread(target=coordinator.run)
+        thread.start()
+        while not os.path.exists(address[len('unix:'):]):
+            thread.join(0.1)
+
+        Worker(address, worker_runner).run()
+        thread.join(60)
+        self.assertFalse(thread.is_alive())
+
+        # All the results are stored by the coordinator, the crashed task
+        # is recorded as failed.
+        for task in tasks:
+            status = coordinator_runner.get_status(task)
+            self.assertEqual(
+                status, 'failed' if task.seed == 1 else 'succeeded'
+            )
+
+        out_dir = coordinator_runner.get_out_dir(tasks[0])
+        with open(os.path.join(out_dir, 'stub.log'), 'r') as fp:
+            self.assertEqual(fp.read(), 'Built {}\n'.format(tasks[0].task_id))
+
+    def test_best_critical_path(self):
+        tasks = [make_task(seed) for seed in (0, 2)]
+        coordinator_runner = self.make_runner(tasks, 'coordinator')
+        coordinator_runner.abort_policies = ['cpd:10']
+        worker_runner = self.make_runner([], 'worker')
+        address = 'unix:' + os.path.join(self.tmp_dir, 'socket')
+
+        coordinator = Coordinator(address, coordinator_runner)
+        thread = threading.Thread(target=coordinator.run)
+        thread.start()
+        while not os.path.exists(address[len('unix:'):]):
+            thread.join(0.1)
+
+        Worker(address, worker_runner).run()
+        thread.join(60)
+        self.assertFalse(thread.is_alive())
+
+        # The second task gets the critical path of the first one (100 MHz)
+        best_critical_paths = []
+        for task in tasks:
+            out_dir = coordinator_runner.get_out_dir(task)
+            with open(os.path.join(out_dir, 'meta.json'), 'r') as fp:
+                best_critical_paths.append(json.load(fp)['best_critical_path'])
+        self.assertEqual(best_critical_paths, [None, 10.0])
+
+    def test_hung_worker(self):
+        task = make_task(0)
+        coordinator_runner = self.make_runner([task], 'coordinator')
+        coordinator_runner.timeout = 1
+        coordinator_runner.timeout_grace = 0
+        worker_runner = self.make_runner([], 'worker')
+        address = 'unix:' + os.path.join(self.tmp_dir, 'socket')
+
+        coordinator = Coordinator(address, coordinator_runner)
+        coordinator.poll_interval = 0.1
+        coordinator.result_grace = 0
+        thread = threading.Thread(target=coordinator.run)
+        thread.start()
+        while not os.path.exists(address[len('unix:'):]):
+            thread.join(0.1)
+
+        # A worker taking the task and hanging without closing the connection
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(address[len('unix:'):])
+            rfile = sock.makefile('rb')
+            wfile = sock.makefile('wb')
+            receive_message(rfile)
+            send_message(wfile, {'type': 'request'})
+            self.assertEqual(receive_message(rfile)['type'], 'task')
+
+            # The task is requeued once its timeout expired
+            Worker(address, worker_runner).run()
+            thread.join(60)
+            self.assertFalse(thread.is_alive())
+
+        self.assertEqual(coordinator_runner.get_status(task), 'succeeded')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from infrastructure.history import partition
+from infrastructure.tasks import Task, get_task_id
+
+
+def make_task(seed):
+    entry = ('oneblink', 'vpr', 'basys3', seed, None, 0)
+    return Task(*entry, get_task_id(*entry))
+
+
+class TestPartition(unittest.TestCase):
+    def setUp(self):
+        self.tasks = [make_task(seed) for seed in range(1, 21)]
+        self.estimates = {
+            task: float(seed % 4)
+            for seed, task in enumerate(self.tasks)
+        }
+
+    def test_complete_and_disjoint(self):
+        shards = partition(self.tasks, self.estimates, 3)
+        self.assertEqual(len(shards), 3)
+
+        assigned = [task for shard in shards for task in shard]
+        self.assertEqual(len(assigned), len(set(assigned)))
+        self.assertEqual(set(assigned), set(self.tasks))
+
+    def test_deterministic(self):
+        shards = partition(self.tasks, self.estimates, 3)
+
+        # The workers list the tasks in their own order
+        tasks = list(self.tasks)
+        random.Random(0).shuffle(tasks)
+        self.assertEqual(partition(tasks, self.estimates, 3), shards)
+
+    def test_balanced(self):
+        shards = partition(self.tasks, self.estimates, 3)
+        loads = [
+            sum(self.estimates[task] for task in shard) for shard in shards
+        ]
+        self.assertLessEqual(
+            max(loads) - min(loads), max(self.estimates.values())
+        )
+
+    def test_ties_broken_by_task_id(self):
+        # Without estimates, the tasks are dealt in the order of their IDs
+        estimates = {task: 0.0 for task in self.tasks}
+        shards = partition(reversed(self.tasks), estimates, 2)
+
+        tasks = sorted(self.tasks, key=lambda task: task.task_id)
+        self.assertEqual(shards, [tasks[0::2], tasks[1::2]])
+
+    def test_more_shards_than_tasks(self):
+        shards = partition(self.tasks[:2], self.estimates, 4)
+        self.assertEqual(sum(len(shard) for shard in shards), 2)
+        self.assertEqual(shards[2:], [[], []])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from toolchains.f4pga import VPR
+from toolchains.nextpnr import NextpnrGeneric
+from utils.log_parser import Extractor, parse_log
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+logs_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
+
+
+class TestNextpnrLog(unittest.TestCase):
+    '''The expected values are the ones parsed from the logs before the
+    extractors.'''
+    def setUp(self):
+        self.tch = NextpnrGeneric(root_dir)
+        self.tch.out_dir = logs_dir
+
+    def test_resources(self):
+        self.assertEqual(
+            self.tch.get_resources(), {
+                'SLICE_LUTX': 10,
+                'SLICE_FFX': 200
+            }
+        )
+
+    def test_clocks(self):
+        # The clocks reported before routing are not the final ones
+        self.assertEqual(
+            self.tch.max_freq(), {
+                'clk$SB_IO':
+                    {
+                        'actual': 73.05,
+                        'requested': 12.0,
+                        'met': True,
+                        'setup_violation': 0,
+                        'hold_violation': 0
+                    },
+                'sys':
+                    {
+                        'actual': 10.05,
+                        'requested': 12.0,
+                        'met': False,
+                        'setup_violation': 0,
+                        'hold_violation': 0
+                    }
+            }
+        )
+
+    def test_wirelength(self):
+        # The last wirelength reported is the final one
+        self.tch.add_wirelength()
+        self.assertEqual(self.tch.wirelength, 5678)
+
+    def test_runtimes(self):
+        self.assertEqual(
+            self.tch.get_nextpnr_runtimes('nextpnr.log'), {
+                'place': 1.75,
+                'route': 2.75
+            }
+        )
+
+
+class TestVprLog(unittest.TestCase):
+    '''The expected values are the ones parsed from the logs before the
+    extractors.'''
+    def setUp(self):
+        self.tch = VPR(root_dir)
+        self.tch.out_dir = logs_dir
+
+    def test_resources(self):
+        self.assertEqual(
+            self.tch.get_vpr_resources(), {
+                'GND': 1,
+                'BLK-TL-IOPAD': 2,
+                'lut': 5
+            }
+        )
+
+    def test_clocks(self):
+        freqs = self.tch.get_log_metrics('route.log')['freqs']
+        self.assertEqual(set(freqs), {'clk', 'sys'})
+        self.assertAlmostEqual(freqs['clk'] / 1e6, 175.07, places=2)
+        self.assertEqual(freqs['sys'], 0.0)
+
+    def test_wirelength(self):
+        self.tch.add_wirelength()
+        self.assertEqual(self.tch.wirelength, 12345)
+
+    def test_runtimes(self):
+        self.assertEqual(self.tch.get_log_metrics('pack.log')['runtime'], 0.52)
+        self.assertEqual(self.tch.get_log_metrics('route.log')['runtime'], 2.5)
+
+    def test_memory(self):
+        # Converted to MiB
+        self.assertEqual(
+            self.tch.get_log_metrics('pack.log')['max_rss'], [45.2, 1536.0]
+        )
+        self.assertEqual(
+            self.tch.get_log_metrics('route.log')['max_rss'], [70.0]
+        )
+
+
+class TestParseLog(unittest.TestCase):
+    def test_sections(self):
+        extractors = [
+            Extractor(
+                'after',
+                r'^value (\d+)',
+                lambda values, m: values + [int(m.group(1))],
+                initial=list,
+                start=r'^start$',
+                end=r'^end$'
+            ),
+            Extractor(
+                'first',
+                r'^value (\d+)',
+                lambda _, m: int(m.group(1)),
+                once=True
+            ),
+        ]
+        timings = dict()
+        values = parse_log(
+            os.path.join(logs_dir, 'sections.log'), extractors, timings
+        )
+
+        self.assertEqual(values, {'after': [2, 4], 'first': 1})
+        self.assertEqual(set(timings), {'after', 'first'})
+
+
+if __name__ == '__main__':
+    unittest.main()
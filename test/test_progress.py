@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.log_parser import Extractor
+from utils.progress import LogTail
+
+
+def get_extractors():
+    return [
+        Extractor('iteration', r'^iter=(\d+)', lambda _, m: int(m.group(1))),
+        Extractor(
+            'stage', r'^Running (\w+)', lambda _, m: m.group(1), once=True
+        ),
+    ]
+
+
+class TestLogTail(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_file = os.path.join(self.tmp_dir, 'route.log')
+        self.tail = LogTail(self.log_file, get_extractors())
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, content, mode='a'):
+        with open(self.log_file, mode) as fp:
+            fp.write(content)
+
+    def test_missing_log(self):
+        self.assertEqual(self.tail.poll(), dict())
+
+    def test_append(self):
+        self.write('Running route\niter=1\n')
+        self.assertEqual(self.tail.poll(), {'stage': 'route', 'iteration': 1})
+
+        # Nothing new
+        self.assertEqual(self.tail.poll(), dict())
+
+        # Lines are parsed once complete, the once extractor is done
+        self.write('Running other\niter=')
+        self.assertEqual(self.tail.poll(), dict())
+        self.write('2\n')
+        self.assertEqual(self.tail.poll(), {'iteration': 2})
+        self.assertEqual(self.tail.values['stage'], 'route')
+
+    def test_rotate(self):
+        self.write('Running route\niter=5\n')
+        self.tail.poll()
+
+        # The log is moved away and a new one is started, longer than the
+        # offset reached in the previous one
+        os.rename(self.log_file, self.log_file + '.1')
+        self.write('Running place\n' + 'x' * 64 + '\niter=1\n', 'w')
+        self.assertEqual(self.tail.poll(), {'stage': 'place', 'iteration': 1})
+
+    def test_truncate(self):
+        self.write('Running route\niter=1\niter=2\niter=3\n')
+        self.tail.poll()
+
+        # The log is parsed again from its start
+        self.write('Running pack\n', 'w')
+        self.assertEqual(self.tail.poll(), {'stage': 'pack'})
+        self.assertIsNone(self.tail.values['iteration'])
+
+        self.write('iter=1\n')
+        self.assertEqual(self.tail.poll(), {'iteration': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
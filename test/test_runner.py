@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import fpgaperf
+import infrastructure.runner
+from infrastructure.runner import Runner
+from infrastructure.tasks import Tasks
+from toolchains.toolchain import Metrics, Toolchain
+
+root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+
+def stub_run(board, toolchain, project, *args, **kwargs):
+    '''Stands for fpgaperf.run: records how the build would be pruned and
+    where it would run.'''
+    out_prefix, task_id = args[3], kwargs['task_id']
+    prune, scratch_dir = kwargs['prune'], kwargs['scratch_dir']
+
+    out_dir = os.path.join(
+        out_prefix, '{}_{}_{}_{}'.format(project, toolchain, board, task_id)
+    )
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as fp:
+        json.dump(
+            {
+                'status': 'succeeded',
+                'prune': prune,
+                'scratch_dir': scratch_dir
+            }, fp
+        )
+
+    return out_dir
+
+
+def stub_run_failing(board, toolchain, project, *args, **kwargs):
+    '''Stands for fpgaperf.run: the vpr-fasm2bels builds die before writing
+    their metadata, the other ones succeed.'''
+    if toolchain == 'vpr-fasm2bels':
+        sys.exit(1)
+
+    out_prefix, build, build_type = args[3], args[9], args[10]
+    task_id = kwargs['task_id']
+    project_dict = fpgaperf.get_project(project)
+    board_info = fpgaperf.get_boards()[board]
+
+    tch = Toolchain(root_dir)
+    tch.toolchain = toolchain
+    tch.strategy = None
+    tch.family = board_info['family']
+    tch.device = board_info['device']
+    tch.package = board_info['package']
+    tch.part = tch.device + (tch.package or '')
+    tch.board = board
+    tch.vendor = fpgaperf.get_vendors(toolchain=toolchain, board=board)[0]
+    tch.project_name = project_dict['name']
+    tch.srcs = tch.canonicalize(project_dict['srcs'])
+    tch.top = project_dict['top']
+    tch.build = build
+    tch.build_type = build_type
+    tch.task_id = task_id
+    tch.out_dir = os.path.join(out_prefix, tch.design())
+    os.makedirs(tch.out_dir)
+
+    metrics = Metrics(
+        max_freq={'clk': 100.0},
+        resources={'LUT': 1},
+        runtimes={'total': 1.0},
+        wirelength=1,
+        maximum_memory_use=1.0
+    )
+    with open(os.path.join(tch.out_dir, 'meta.json'), 'w') as fp:
+        json.dump(
+            tch.get_metadata(None, None, metrics, {toolchain: 'stub'}, 'stub'),
+            fp
+        )
+
+    return tch.out_dir
+
+
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.run = infrastructure.runner.run
+        # The task processes are forked, they run the stub as well
+        infrastructure.runner.run = stub_run
+
+    def tearDown(self):
+        infrastructure.runner.run = self.run
+        shutil.rmtree(self.tmp_dir)
+
+    def run_tasks(self, toolchains, merge=False):
+        args = {
+            'project': ['oneblink'],
+            'toolchain': toolchains,
+            'board': None
+        }
+        tasks = Tasks(os.path.join(root_dir, 'src'))
+        # Without history, the tasks are streamed as they get generated
+        runner = Runner(
+            tasks.iter_tasks(args),
+            False,
+            os.path.join(self.tmp_dir, 'out'),
+            root_dir,
+            'generic', [0],
+            False,
+            1,
+            prune=True,
+            scratch_dir=os.path.join(self.tmp_dir, 'scratch'),
+            combinations=set(tasks.select_combinations(args))
+        )
+        runner.run()
+        if merge:
+            runner.merge_results()
+            return runner
+
+        metas = dict()
+        for task in runner.finished:
+            with open(os.path.join(runner.get_out_dir(task), 'meta.json'),
+                      'r') as fp:
+                metas[task] = json.load(fp)
+
+        return metas
+
+    def test_prune_without_dependents(self):
+        metas = self.run_tasks(['vpr'])
+        self.assertTrue(metas)
+        for meta in metas.values():
+            self.assertTrue(meta['prune'])
+            self.assertIsNotNone(meta['scratch_dir'])
+
+    def test_keep_base_builds(self):
+        metas = self.run_tasks(['vpr', 'vpr-fasm2bels'])
+        for task, meta in metas.items():
+            # The vpr builds are the base of the vpr-fasm2bels ones
+            is_base = task.toolchain == 'vpr'
+            self.assertEqual(meta['prune'], not is_base)
+            self.assertEqual(meta['scratch_dir'] is None, is_base)
+
+    def test_merge_failed_tasks(self):
+        infrastructure.runner.run = stub_run_failing
+        runner = self.run_tasks(['vpr', 'vpr-fasm2bels'], merge=True)
+
+        results_file = os.path.join(
+            self.tmp_dir, 'out', 'results-generic.json.gz'
+        )
+        with gzip.open(results_file, 'rb') as fp:
+            results = json.loads(fp.read().decode('utf-8'))['results']
+
+        # Every row has an entry in every column
+        self.assertEqual(set(results['status']), {'succeeded', 'failed'})
+        for column, values in results.items():
+            self.assertEqual(len(values), len(runner.finished), column)
+        for toolchain, status in zip(results['toolchain'], results['status']):
+            name = next(iter(toolchain))
+            self.assertEqual(
+                status, 'succeeded' if name == 'vpr' else 'failed'
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.vivado_report import read_report_tables
+
+report_file = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'reports', 'utilization.rpt'
+)
+
+
+class TestReadReportTables(unittest.TestCase):
+    def test_sections(self):
+        tables = read_report_tables(
+            report_file, ['Primitives', 'Summary of Registers by Type']
+        )
+
+        self.assertEqual(
+            set(tables), {'primitives', 'summary of registers by type'}
+        )
+        self.assertEqual(
+            tables['primitives'], [
+                {
+                    'Ref Name': 'FDRE',
+                    'Used': 29,
+                    'Functional Category': 'Flop & Latch'
+                },
+                {
+                    'Ref Name': 'LUT6',
+                    'Used': 12,
+                    'Functional Category': 'LUT'
+                },
+                {
+                    'Ref Name': 'CARRY4',
+                    'Used': 6,
+                    'Functional Category': 'CarryLogic'
+                },
+                {
+                    'Ref Name': 'OBUF',
+                    'Used': 4,
+                    'Functional Category': 'IO'
+                },
+            ]
+        )
+        self.assertEqual(
+            [row['Total'] for row in tables['summary of registers by type']],
+            [0, 29]
+        )
+
+    def test_typed_cells(self):
+        tables = read_report_tables(report_file, ['Slice Logic', 'Memory'])
+
+        luts = tables['slice logic'][0]
+        self.assertEqual(luts['Site Type'], 'Slice LUTs')
+        self.assertIsInstance(luts['Used'], int)
+        self.assertEqual(luts['Available'], 20800)
+        self.assertIsInstance(luts['Util%'], float)
+        self.assertEqual(luts['Util%'], 0.12)
+
+        # Sub-types keep their name, without the indentation
+        self.assertEqual(tables['slice logic'][1]['Site Type'], 'LUT as Logic')
+        self.assertEqual(len(tables['slice logic']), 4)
+
+        self.assertEqual(tables['memory'][0]['Used'], 0.5)
+
+    def test_missing_section(self):
+        tables = read_report_tables(report_file, ['Clocking', 'Black Boxes'])
+        self.assertEqual(
+            tables, {'black boxes': [{
+                'Ref Name': 'blackbox',
+                'Used': 1
+            }]}
+        )
+
+    def test_early_stop(self):
+        lines_read = []
+
+        class RecordingFile:
+            def __init__(self, path, mode):
+                self.fp = open(path, mode)
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                self.fp.close()
+
+            def __iter__(self):
+                for line in self.fp:
+                    lines_read.append(line)
+                    yield line
+
+        with mock.patch('utils.vivado_report.open', RecordingFile,
+                        create=True):
+            tables = read_report_tables(report_file, ['Slice Logic'])
+
+        self.assertIn('slice logic', tables)
+        # The file is not read past the line following the table
+        self.assertTrue(lines_read[-1].startswith('* Warning!'))
+        with open(report_file, 'r') as fp:
+            self.assertLess(len(lines_read), len(fp.readlines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
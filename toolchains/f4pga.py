@@ -19,15 +19,39 @@
 
 import os
 import re
-import subprocess
 import edalize
 
 from toolchains.toolchain import Toolchain
-from utils.utils import Timed, have_exec, which, get_file_dict, get_yosys_resources
+from utils.log_parser import Extractor
+from utils.progress import get_stage_extractor
+from utils.utils import Timed, have_exec, which, get_file_dict, get_yosys_extractors
+from utils.versions import probe_output
 from infrastructure.tool_parameters import ToolParametersHelper
 
 YOSYS_REGEXP = re.compile("(Yosys [a-z0-9+.]+) (\(git sha1) ([a-z0-9]+),.*")
 
+# VPR options only affecting the routing: the packing and the placement are
+# reused from the stage cache when nothing else changes (see build_target).
+# Options used by the placer delay model (e.g. router_lookahead or
+# route_chan_width) are not part of them.
+VPR_ROUTE_OPTIONS = {
+    'acc_fac',
+    'bb_factor',
+    'check_route',
+    'congested_routing_iteration_threshold',
+    'first_iter_pres_fac',
+    'incremental_reroute_delay_ripup',
+    'initial_pres_fac',
+    'max_router_iterations',
+    'pres_fac_mult',
+    'router_high_fanout_threshold',
+    'routing_failure_predictor',
+}
+
+
+def safe_division_by_zero(n, d):
+    return n / d if d else 0.0
+
 
 class VPR(Toolchain):
     '''VPR using Yosys for synthesis'''
@@ -38,6 +62,7 @@ class VPR(Toolchain):
         self.files = []
         self.fasm2bels = False
         self.dbroot = None
+        self.vpr_options = []
 
         self.resources_map = dict(families=dict())
         self.resources_map["families"]["xc7"] = {
@@ -103,6 +128,10 @@ class VPR(Toolchain):
         elif self.params_string:
             tool_params = self.params_string.split(' ')
 
+        self.vpr_options = list(tool_params) + (
+            ["--seed", str(self.seed)] if self.seed else []
+        )
+
         return {
             'files':
                 self.files,
@@ -113,69 +142,88 @@ class VPR(Toolchain):
             'tool_options':
                 dict(
                     symbiflow={
-                        'part':
-                            part,
-                        'package':
-                            self.package,
-                        'vendor':
-                            self.vendor,
-                        'builddir':
-                            self.builddir,
-                        'pnr':
-                            'vpr',
-                        'vpr_options':
-                            tool_params +
-                            (["--seed", str(self.seed)] if self.seed else []),
-                        'fasm2bels':
-                            self.fasm2bels,
-                        'dbroot':
-                            self.dbroot,
-                        'clocks':
-                            self.clocks
+                        'part': part,
+                        'package': self.package,
+                        'vendor': self.vendor,
+                        'builddir': self.builddir,
+                        'pnr': 'vpr',
+                        'vpr_options': self.vpr_options,
+                        'fasm2bels': self.fasm2bels,
+                        'dbroot': self.dbroot,
+                        'clocks': self.clocks
                     }
                 )
         }, tool_params
 
+    def get_synthesis_target(self):
+        return self.top + '.eblif'
+
+    def get_stage_options(self, target):
+        '''Returns the VPR options a stage of the flow depends on.
+
+        Synthesis does not depend on any of them, packing and placement do
+        not depend on the routing options and packing does not depend on
+        the seed either.
+        '''
+        if target == self.get_synthesis_target():
+            return []
+
+        options = []
+        for token in ' '.join(self.vpr_options).split():
+            if token.startswith('--'):
+                options.append([token[2:]])
+            elif options:
+                options[-1].append(token)
+
+        if target.endswith('.net') or target.endswith('.place'):
+            options = [
+                option for option in options
+                if option[0] not in VPR_ROUTE_OPTIONS
+            ]
+        if target.endswith('.net'):
+            options = [option for option in options if option[0] != 'seed']
+
+        return options
+
     def run_steps(self):
-        try:
-            self.backend.build_main(self.top + '.eblif')
-            with Timed(self, 'pack_all', unprinted_runtime=True):
-                self.backend.build_main(self.top + '.net')
+        self.build_target(self.get_synthesis_target())
+        with Timed(self, 'pack_all', unprinted_runtime=True):
+            self.build_target(self.top + '.net')
 
-            with Timed(self, 'place_all', unprinted_runtime=True):
-                self.backend.build_main(self.top + '.place')
+        with Timed(self, 'place_all', unprinted_runtime=True):
+            self.build_target(self.top + '.place')
 
-            with Timed(self, 'route_all', unprinted_runtime=True):
-                self.backend.build_main(self.top + '.route')
+        with Timed(self, 'route_all', unprinted_runtime=True):
+            self.build_target(self.top + '.route')
 
-            self.backend.build_main(self.top + '.fasm')
-            with Timed(self, 'bitstream'):
-                self.backend.build_main(self.top + '.bit')
-        finally:
-            del os.environ['EDALIZE_LAUNCHER']
+        self.build_target(self.top + '.fasm')
+        with Timed(self, 'bitstream'):
+            self.build_target(self.top + '.bit')
 
     def run(self):
         with Timed(self, 'total'):
-            with Timed(self, 'prepare'):
-                os.environ[
-                    "EDALIZE_LAUNCHER"
-                ] = f"source {os.path.abspath('env.sh') + ' xilinx-' + self.device} &&"
-                os.makedirs(self.out_dir, exist_ok=True)
-
-                edam, tool_params = self.prepare_edam(
-                    self.family + self.device
-                )
+            try:
+                with Timed(self, 'prepare'):
+                    self.enter_environment(
+                        os.path.abspath('env.sh') + ' xilinx-' + self.device
+                    )
+                    os.makedirs(self.out_dir, exist_ok=True)
 
-                if tool_params:
-                    os.environ["EDALIZE_LAUNCHER"
-                               ] += ' VPR_OPTIONS="--echo_file on"'
+                    edam, tool_params = self.prepare_edam(
+                        self.family + self.device
+                    )
 
-                self.backend = edalize.get_edatool('symbiflow')(
-                    edam=edam, work_root=self.out_dir
-                )
-                self.backend.configure("")
+                    if tool_params:
+                        os.environ["VPR_OPTIONS"] = "--echo_file on"
+
+                    self.backend = edalize.get_edatool('symbiflow')(
+                        edam=edam, work_root=self.out_dir
+                    )
+                    self.backend.configure("")
 
-            self.run_steps()
+                self.run_steps()
+            finally:
+                self.exit_environment()
 
         self.add_runtimes()
         self.add_wirelength()
@@ -232,112 +280,169 @@ class VPR(Toolchain):
 
         return critical_paths
 
-    def add_wirelength(self):
-        def get_wirelength(log_file):
-            with open(log_file, 'r') as fp:
-                for l in fp:
-                    l = l.strip()
-                    if 'Total wirelength:' in l:
-                        return int(l.split()[2][:-1])
-            return 0
-
-        route_log = os.path.join(self.out_dir, 'route.log')
-        self.wirelength = get_wirelength(route_log)
-
-    def add_maximum_memory_use(self):
-        def get_usage(log_file, token="max_rss"):
+    def get_log_extractors(self):
+        def convert_max_rss(usage, match):
             unit_list = ["B", "KiB", "MiB", "GiB", "TiB", "PiB"]
-            memory_usage = list()
-            with open(log_file, 'r') as fp:
-                for l in fp:
-                    l = l.strip()
-                    if token in l:
-                        l_split = l.split()
-                        unit = l_split[l_split.index("(max_rss") + 2][:-1]
-                        max_rss = float(l_split[l_split.index("(max_rss") + 1])
-                        # convert memory to MiB
-                        unit_index = unit_list.index(unit) - 2
-                        if unit_index < 0:
-                            max_rss = max_rss / (
-                                1024 * (-unit_index)
-                            )  # make unit index positive
-                        elif unit_index > 0:
-                            max_rss = max_rss * 1024 * unit_index
-
-                        memory_usage.append(max_rss)
-
-            return memory_usage
-
-        pack_log = os.path.join(self.out_dir, 'pack.log')
-        place_log = os.path.join(self.out_dir, 'place.log')
-        route_log = os.path.join(self.out_dir, 'route.log')
-        fasm_log = os.path.join(self.out_dir, 'fasm.log')
-
-        self.maximum_memory_use = 0.0
-        self.maximum_memory_use = max(
-            max(get_usage(pack_log)), self.maximum_memory_use
-        )
-        self.maximum_memory_use = max(
-            max(get_usage(place_log)), self.maximum_memory_use
-        )
-        self.maximum_memory_use = max(
-            max(get_usage(route_log)), self.maximum_memory_use
-        )
-        self.maximum_memory_use = max(
-            max(get_usage(fasm_log)), self.maximum_memory_use
-        )
-
-    def max_freq(self):
-        def safe_division_by_zero(n, d):
-            return n / d if d else 0.0
-
-        freqs = dict()
-        clocks = dict()
-        route_log = os.path.join(self.out_dir, 'route.log')
-
-        intra_domain_cpd_processing = False
-        intra_domain_slack_processing = False
-
-        with open(route_log, 'r') as fp:
-            for l in fp:
-                if "Final intra-domain worst hold" in l:
-                    intra_domain_slack_processing = True
-                    continue
-
-                if "Final critical path" in l and "Fmax" in l:
-                    assert len(freqs.keys()) <= 1, (freqs, self.design())
-
-                    if len(freqs.keys()) < 1:
-                        clk = 'clk'
-                    else:
-                        clk = list(freqs.keys())[0]
+            unit = match.group(2)[:-1]
+            max_rss = float(match.group(1))
+            # convert memory to MiB
+            unit_index = unit_list.index(unit) - 2
+            if unit_index < 0:
+                max_rss = max_rss / (
+                    1024 * (-unit_index)
+                )  # make unit index positive
+            elif unit_index > 0:
+                max_rss = max_rss * 1024 * unit_index
+
+            usage.append(max_rss)
+            return usage
+
+        def get_step_extractors(step):
+            return [
+                Extractor(
+                    'runtime',
+                    re.escape(step) + r' took\s+(\S+)',
+                    lambda _, m: float(m.group(1)),
+                    once=True
+                ),
+                Extractor(
+                    'max_rss',
+                    r'\(max_rss\s+(\S+)\s+(\S+)',
+                    convert_max_rss,
+                    initial=list
+                ),
+            ]
+
+        def add_resource(resources, match):
+            restype = match.group(1).strip()
+            rescount = int(match.group(2).strip())
+            resources[restype] = resources.get(restype, 0) + rescount
+            return resources
+
+        def set_critical_path(freqs, match):
+            assert len(freqs.keys()) <= 1, (freqs, self.design())
+
+            if len(freqs.keys()) < 1:
+                clk = 'clk'
+            else:
+                clk = list(freqs.keys())[0]
+
+            freqs[clk] = safe_division_by_zero(1e9, float(match.group(1)))
+            return freqs
+
+        def set_hold_clock(freqs, match):
+            freqs[match.group(1)] = None
+            return freqs
+
+        def set_intra_domain_cpd(freqs, match):
+            group = match.group(1)
+            freqs[group] = safe_division_by_zero(1e9, float(match.group(2)))
+            return freqs
+
+        pack_extractors = get_step_extractors('# Packing') + [
+            # Pb types usage...
+            #   GND          : 1
+            #   BLK-TL-IOPAD : 2
+            Extractor(
+                'resources',
+                r'^([^:]*):([^:]*)',
+                add_resource,
+                initial=dict,
+                start=r'^\s*Pb types usage\.\.\.\s*$',
+                end=r'^\s*$'
+            ),
+        ]
+        route_extractors = get_step_extractors('# Routing') + [
+            Extractor(
+                'wirelength',
+                r'^\s*Total wirelength:\s+(\S+)',
+                lambda _, m: int(m.group(1)[:-1]),
+                initial=0,
+                once=True
+            ),
+            # Final critical path delay (least slack): 5.7 ns, Fmax: 175 MHz
+            Extractor(
+                'freqs',
+                r'^(?=.*Final critical path)(?=.*Fmax)[^,:]*:\s*([^,:\s]+)',
+                set_critical_path,
+                initial=dict
+            ),
+            Extractor(
+                'freqs',
+                r'^\s*(\S+)',
+                set_hold_clock,
+                start=r'Final intra-domain worst hold',
+                end=r'^$'
+            ),
+            Extractor(
+                'freqs',
+                r'^\s*([^\s:]+)[^:]*:\s*([^\s:]+)',
+                set_intra_domain_cpd,
+                start=r'^Final intra-domain critical path delays \(CPDs\):$',
+                end=r'^$'
+            ),
+        ]
 
-                    fields = l.split(",")
-                    cpd = float(fields[0].split(":")[1].split()[0].strip())
-                    freqs[clk] = safe_division_by_zero(1e9, cpd)
+        return {
+            '{}_synth.log'.format(self.top): get_yosys_extractors(),
+            'pack.log': pack_extractors,
+            'place.log': get_step_extractors('# Placement'),
+            'route.log': route_extractors,
+            # XXX: Need add to genfasm the amount of time it took to create the fasm file.
+            #      For now the whole command execution time is considered
+            'fasm.log': get_step_extractors('The entire flow of VPR'),
+        }
 
-                if l == "Final intra-domain critical path delays (CPDs):\n":
-                    intra_domain_cpd_processing = True
-                    continue
+    def get_progress_extractors(self):
+        # Iter   Time    pres  BBs    Heap  Re-Rtd  Re-Rtd Overused RR Nodes      Wirelength      CPD ...
+        #    1    0.1     0.0    0  123456    1234   12345    1234 ( 0.123%)   12345 ( 1.2%)    5.123 ...
+        router_iteration = r'^\s*(\d+)\s.*?\s(\d+) \(\s*[0-9.]+%\)' \
+            r'(?:\s+\d+ \(\s*[0-9.]+%\)\s+([0-9.]+)(?:\s|$))?'
 
-                if intra_domain_slack_processing:
-                    if len(l.strip('\n')) == 0:
-                        intra_domain_slack_processing = False
-                        continue
+        return {
+            '{}_synth.log'.format(self.top): [get_stage_extractor('synth')],
+            'pack.log': [get_stage_extractor('pack')],
+            'place.log': [get_stage_extractor('place')],
+            'route.log':
+                [
+                    get_stage_extractor('route'),
+                    Extractor(
+                        'iteration',
+                        router_iteration,
+                        lambda _, m: int(m.group(1)),
+                        start=r'^\s*Iter\s+Time'
+                    ),
+                    Extractor(
+                        'overused',
+                        router_iteration,
+                        lambda _, m: int(m.group(2)),
+                        start=r'^\s*Iter\s+Time'
+                    ),
+                    Extractor(
+                        'cpd',
+                        router_iteration,
+                        lambda cpd, m: float(m.group(3))
+                        if m.group(3) else cpd,
+                        start=r'^\s*Iter\s+Time'
+                    ),
+                ],
+            'fasm.log': [get_stage_extractor('fasm')],
+        }
 
-                    clk = l.split()[0]
-                    freqs[clk] = None
+    def add_wirelength(self):
+        self.wirelength = self.get_log_metrics('route.log')['wirelength']
 
-                if intra_domain_cpd_processing:
-                    if len(l.strip('\n')) == 0:
-                        intra_domain_cpd_processing = False
-                        continue
+    def add_maximum_memory_use(self):
+        self.maximum_memory_use = 0.0
+        for log_name in ['pack.log', 'place.log', 'route.log', 'fasm.log']:
+            self.maximum_memory_use = max(
+                max(self.get_log_metrics(log_name)['max_rss']),
+                self.maximum_memory_use
+            )
 
-                    fields = l.split(':')
-                    group = fields[0].split()[0]
-                    freqs[group] = safe_division_by_zero(
-                        1e9, float(fields[1].split()[0].strip())
-                    )
+    def max_freq(self):
+        freqs = dict(self.get_log_metrics('route.log')['freqs'])
+        clocks = dict()
 
         for clk in freqs:
             clocks[clk] = dict()
@@ -380,45 +485,11 @@ class VPR(Toolchain):
         return clocks
 
     def get_vpr_resources(self):
-        """
-        pack.log:
-        (...)
-        Pb types usage...
-          GND          : 1
-          BLK-TL-IOPAD : 2
-          lut          : 1
-          IOB33_MODES  : 2
-        (...)
-        """
-        pack_logfile = os.path.join(self.out_dir, "pack.log")
-        resources = {}
-        with open(pack_logfile, 'r') as fp:
-            processing = False
-            for l in fp:
-                l = l.strip()
-                if l == "Pb types usage...":
-                    processing = True
-                    continue
-
-                if not processing:
-                    continue
-                else:
-                    if len(l) == 0:
-                        break
-                    res = l.split(":")
-                    restype = res[0].strip()
-                    rescount = int(res[1].strip())
-                    if restype in resources:
-                        resources[restype] += rescount
-                    else:
-                        resources[restype] = rescount
-
-        return resources
+        return dict(self.get_log_metrics('pack.log')['resources'])
 
     def resources(self):
-        synth_resources = get_yosys_resources(
-            os.path.join(self.out_dir, f"{self.top}_synth.log")
-        )
+        synth_resources = self.get_log_metrics(f"{self.top}_synth.log"
+                                               )['cells']
         synth_resources = self.get_resources_count(synth_resources)
 
         impl_resources = self.get_vpr_resources()
@@ -426,31 +497,13 @@ class VPR(Toolchain):
 
         return {"synth": synth_resources, "impl": impl_resources}
 
-    def get_yosys_runtimes(self, logfile):
-        runtime_re = 'CPU: user (\d+\.\d+)s system (\d+\.\d+)s'
-        log = dict()
-        with open(logfile, 'r') as fp:
-            for l in fp:
-                m = re.search(runtime_re, l)
-                if not m:
-                    continue
-                time = float(m[1]) + float(m[2])
-                log['synthesis'] = time
+    def get_yosys_runtimes(self, log_name):
+        time = self.get_log_metrics(log_name)['synthesis']
+        assert time is not None, "No run time found for yosys."
 
-                return log
-
-        assert False, "No run time found for yosys."
+        return {'synthesis': time}
 
     def get_vpr_runtimes(self):
-        def get_step_runtime(step, logfile):
-            with open(logfile, 'r') as fp:
-                for l in fp:
-                    l = l.strip()
-                    if '{} took'.format(step) in l:
-                        l = l.split()
-                        position = l.index("took") + 1
-                        return float(l[position])
-
         def get_overhead_runtime(name, log):
             if name in log and "%s_all" % name in self.unprinted_runtimes:
                 if 'overhead' not in log:
@@ -460,17 +513,10 @@ class VPR(Toolchain):
 
         log = dict()
 
-        pack_log = os.path.join(self.out_dir, 'pack.log')
-        place_log = os.path.join(self.out_dir, 'place.log')
-        route_log = os.path.join(self.out_dir, 'route.log')
-        fasm_log = os.path.join(self.out_dir, 'fasm.log')
-
-        log['pack'] = get_step_runtime('# Packing', pack_log)
-        log['place'] = get_step_runtime('# Placement', place_log)
-        log['route'] = get_step_runtime('# Routing', route_log)
-        # XXX: Need add to genfasm the amount of time it took to create the fasm file.
-        #      For now the whole command execution time is considered
-        log['fasm'] = get_step_runtime('The entire flow of VPR', fasm_log)
+        log['pack'] = self.get_log_metrics('pack.log')['runtime']
+        log['place'] = self.get_log_metrics('place.log')['runtime']
+        log['route'] = self.get_log_metrics('route.log')['runtime']
+        log['fasm'] = self.get_log_metrics('fasm.log')['runtime']
 
         get_overhead_runtime("pack", log)
         get_overhead_runtime("place", log)
@@ -481,9 +527,7 @@ class VPR(Toolchain):
     def add_runtimes(self):
         """Returns the runtimes of the various steps"""
 
-        yosys_log = os.path.join(self.out_dir, '{}_synth.log'.format(self.top))
-
-        synth_times = self.get_yosys_runtimes(yosys_log)
+        synth_times = self.get_yosys_runtimes('{}_synth.log'.format(self.top))
         impl_times = self.get_vpr_runtimes()
 
         for t in synth_times:
@@ -494,9 +538,7 @@ class VPR(Toolchain):
     @staticmethod
     def yosys_ver():
         # Yosys 0.7+352 (git sha1 baddb017, clang 3.8.1-24 -fPIC -Os)
-        yosys_version = subprocess.check_output(
-            "yosys -V", shell=True, universal_newlines=True
-        ).strip()
+        yosys_version = probe_output("yosys -V", ["yosys"]).strip()
 
         m = YOSYS_REGEXP.match(yosys_version)
 
@@ -518,9 +560,7 @@ class VPR(Toolchain):
         vtr-users@googlegroups.com
         This is free open source code under MIT license.
         '''
-        out = subprocess.check_output(
-            "vpr --version", shell=True, universal_newlines=True
-        ).strip()
+        out = probe_output("vpr --version", ["vpr"]).strip()
         version = None
         revision = None
         for l in out.split('\n'):
@@ -543,6 +583,10 @@ class VPR(Toolchain):
     def seedable():
         return True
 
+    @staticmethod
+    def has_synthesis_stage():
+        return True
+
     @staticmethod
     def check_env():
         return {
@@ -582,16 +626,19 @@ class Quicklogic(VPR):
 
     def run(self):
         with Timed(self, 'total'):
-            with Timed(self, 'prepare'):
-                os.environ[
-                    "EDALIZE_LAUNCHER"
-                ] = f"source {os.path.abspath('env.sh') + ' quicklogic'} &&"
-                os.makedirs(self.out_dir, exist_ok=True)
-
-                edam, _ = self.prepare_edam(self.device)
-                self.backend = edalize.get_edatool('symbiflow')(
-                    edam=edam, work_root=self.out_dir
-                )
-                self.backend.configure("")
+            try:
+                with Timed(self, 'prepare'):
+                    self.enter_environment(
+                        os.path.abspath('env.sh') + ' quicklogic'
+                    )
+                    os.makedirs(self.out_dir, exist_ok=True)
+
+                    edam, _ = self.prepare_edam(self.device)
+                    self.backend = edalize.get_edatool('symbiflow')(
+                        edam=edam, work_root=self.out_dir
+                    )
+                    self.backend.configure("")
 
-            self.run_steps()
+                self.run_steps()
+            finally:
+                self.exit_environment()
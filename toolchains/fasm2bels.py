@@ -22,6 +22,7 @@ import subprocess
 
 from toolchains.f4pga import VPR
 from toolchains.nextpnr import NextpnrXilinx
+from utils.environment import capture_environment
 from utils.utils import Timed, get_vivado_max_freq
 
 
@@ -62,13 +63,17 @@ class VPRFasm2Bels(VPR):
         assert self.dbroot
 
     def run_steps(self):
-        self.backend.build_main(self.top + '.eblif')
-        self.backend.build_main(self.top + '.net')
-        self.backend.build_main(self.top + '.place')
-        self.backend.build_main(self.top + '.route')
-        self.backend.build_main(self.top + '.fasm')
+        # The targets of the base build are up to date
+        if self.base_build is not None:
+            self.reuse_build(self.base_build)
+
+        self.build_target(self.get_synthesis_target())
+        self.build_target(self.top + '.net')
+        self.build_target(self.top + '.place')
+        self.build_target(self.top + '.route')
+        self.build_target(self.top + '.fasm')
         with Timed(self, 'bitstream'):
-            self.backend.build_main(self.top + '.bit')
+            self.build_target(self.top + '.bit')
 
         with Timed(self, 'fasm2bels'):
             self.backend.build_main('timing_summary.rpt')
@@ -77,6 +82,10 @@ class VPRFasm2Bels(VPR):
         report_file = os.path.join(self.out_dir, 'timing_summary.rpt')
         return get_vivado_max_freq(report_file)
 
+    @staticmethod
+    def base_toolchain():
+        return 'vpr'
+
 
 class NextpnrXilinxFasm2Bels(NextpnrXilinx):
     '''nextpnr using Yosys for synthesis'''
@@ -87,12 +96,13 @@ class NextpnrXilinxFasm2Bels(NextpnrXilinx):
         self.files = []
         self.fasm2bels = True
 
+        env = capture_environment('env.sh', ['nextpnr'])
         self.dbroot = subprocess.check_output(
-            'bash -c ". ./env.sh nextpnr && prjxray-config"', shell=True
+            'prjxray-config', shell=True, env=env
         ).decode('utf-8').strip()
 
         capnp_schema_dir = subprocess.check_output(
-            'bash -c ". ./env.sh nextpnr && capnp-schemas-dir"', shell=True
+            'capnp-schemas-dir', shell=True, env=env
         ).decode('utf-8').strip()
 
         # FIXME: remove when package from https://github.com/hdl/conda-eda/pull/127 is used
@@ -114,3 +124,7 @@ class NextpnrXilinxFasm2Bels(NextpnrXilinx):
     def max_freq(self):
         report_file = os.path.join(self.out_dir, 'timing_summary.rpt')
         return get_vivado_max_freq(report_file)
+
+    @staticmethod
+    def base_toolchain():
+        return 'nextpnr-xilinx'
@@ -25,6 +25,7 @@ import edalize
 from toolchains.toolchain import Toolchain
 from utils.utils import Timed, have_exec, get_yosys_resources, get_file_dict
 from utils.utils import removeprefix
+from utils.versions import probe_output
 
 YOSYS_REGEXP = re.compile("(Yosys [a-z0-9+.]+) (\(git sha1) ([a-z0-9]+),.*")
 
@@ -82,22 +83,25 @@ class Icestorm(Toolchain):
             os.makedirs(self.out_dir, exist_ok=True)
 
             self.env_script = os.path.abspath('env.sh') + ' nextpnr'
-            os.environ["EDALIZE_LAUNCHER"] = f"source {self.env_script} &&"
-
-            edam = self.prepare_edam(pnr, args)
-            self.backend = edalize.get_edatool('icestorm')(
-                edam=edam, work_root=self.out_dir
-            )
-            self.backend.configure("")
-            self.backend.build()
-            self.backend.build_main('timing')
-        del os.environ["EDALIZE_LAUNCHER"]
+            try:
+                self.enter_environment(self.env_script)
+
+                edam = self.prepare_edam(pnr, args)
+                self.backend = edalize.get_edatool('icestorm')(
+                    edam=edam, work_root=self.out_dir
+                )
+                self.backend.configure("")
+                self.backend.build()
+                self.backend.build_main('timing')
+            finally:
+                self.exit_environment()
 
     def icebox_stat(self, backend, stat_file):
-        os.environ["EDALIZE_LAUNCHER"] = f"source {self.env_script} &&"
-
-        backend.build_main("stats")
-        del os.environ["EDALIZE_LAUNCHER"]
+        try:
+            self.enter_environment(self.env_script)
+            backend.build_main("stats")
+        finally:
+            self.exit_environment()
         '''
         DFFs:     22
         LUTs:     24
@@ -160,9 +164,7 @@ class Icestorm(Toolchain):
     @staticmethod
     def yosys_ver():
         # Yosys 0.7+352 (git sha1 baddb017, clang 3.8.1-24 -fPIC -Os)
-        yosys_version = subprocess.check_output(
-            "yosys -V", shell=True, universal_newlines=True
-        ).strip()
+        yosys_version = probe_output("yosys -V", ["yosys"]).strip()
 
         m = YOSYS_REGEXP.match(yosys_version)
 
@@ -202,10 +204,8 @@ class NextpnrIcestorm(Icestorm):
         '''
         nextpnr-ice40  -V
         '''
-        return subprocess.check_output(
-            "nextpnr-ice40 -V || true",
-            shell=True,
-            universal_newlines=True,
+        return probe_output(
+            "nextpnr-ice40 -V || true", ["nextpnr-ice40"],
             stderr=subprocess.STDOUT
         ).strip()
 
@@ -251,9 +251,7 @@ class Arachne(Icestorm):
         $ arachne-pnr -v
         arachne-pnr 0.1+203+0 (git sha1 7e135ed, g++ 4.8.4-2ubuntu1~14.04.3 -O2)
         '''
-        return subprocess.check_output(
-            "arachne-pnr -v", shell=True, universal_newlines=True
-        ).strip()
+        return probe_output("arachne-pnr -v", ["arachne-pnr"]).strip()
 
     def versions(self):
         return {
@@ -25,8 +25,12 @@ from pathlib import Path
 import sys
 
 from toolchains.toolchain import Toolchain
-from utils.utils import Timed, have_exec, get_file_dict, get_vivado_max_freq, get_yosys_resources
-from utils.utils import removeprefix, removesuffix
+from utils.utils import Timed, have_exec, get_file_dict, get_vivado_max_freq, get_yosys_extractors
+from utils.environment import capture_environment
+from utils.log_parser import Extractor
+from utils.progress import get_stage_extractor
+from utils.tools import locate_binary
+from utils.versions import probe_output
 
 YOSYS_REGEXP = re.compile("(Yosys [a-z0-9+.]+) (\(git sha1) ([a-z0-9]+),.*")
 
@@ -53,24 +57,7 @@ class NextpnrGeneric(Toolchain):
         self.nextpnr_log = "nextpnr.log"
 
     def get_share_data(self):
-        out = subprocess.run(
-            ["find", ".", "-name", self.toolchain_bin], stdout=subprocess.PIPE
-        )
-        nextpnr_locations = out.stdout.decode('utf-8').split('\n')
-        nextpnr_location = None
-
-        for location in nextpnr_locations:
-            if "env/bin/{}".format(self.toolchain_bin) in location:
-                nextpnr_location = os.path.abspath(os.path.dirname(location))
-                break
-
-        if not nextpnr_location:
-            out = subprocess.run(
-                ["which", self.toolchain_bin], stdout=subprocess.PIPE
-            )
-            decoded = out.stdout.decode('utf-8')
-            if decoded != '':
-                nextpnr_location = os.path.abspath(os.path.dirname(decoded))
+        nextpnr_location = locate_binary(self.rootdir, self.toolchain_bin)
 
         assert nextpnr_location
 
@@ -125,118 +112,148 @@ class NextpnrGeneric(Toolchain):
         options['clocks'] = self.clocks
         options['nextpnr_options'] = self.options
 
+    def get_synthesis_target(self):
+        return self.project_name + '.json'
+
     def run_steps(self):
         with Timed(self, 'bitstream'):
-            self.backend.build_main(self.project_name + '.bit')
+            self.build_target(self.project_name + '.bit')
 
     def generic_run(self, prepare_edam):
         with Timed(self, 'total'):
-            with Timed(self, 'prepare'):
-                self.edam = prepare_edam()
-                os.environ["EDALIZE_LAUNCHER"] = f"source {self.env_script} &&"
-                self.backend = edalize.get_edatool('symbiflow')(
-                    edam=self.edam, work_root=self.out_dir
-                )
-                self.backend.configure("")
             try:
-                self.backend.build_main(self.project_name + '.fasm')
+                with Timed(self, 'prepare'):
+                    self.edam = prepare_edam()
+                    self.enter_environment(self.env_script)
+                    self.backend = edalize.get_edatool('symbiflow')(
+                        edam=self.edam, work_root=self.out_dir
+                    )
+                    self.backend.configure("")
+
+                # The targets of the base build are up to date
+                if self.base_build is not None:
+                    self.reuse_build(self.base_build)
+
+                self.build_target(self.get_synthesis_target())
+                self.build_target(self.project_name + '.fasm')
                 self.run_steps()
             finally:
-                del os.environ['EDALIZE_LAUNCHER']
+                self.exit_environment()
 
         self.add_runtimes()
         self.add_wirelength()
 
-    def add_wirelength(self):
-        def get_wirelength(log_file):
-            wirelen = 0
-            with open(log_file, 'r') as fp:
-                for l in fp:
-                    l = l.strip()
-                    if 'wirelen =' in l:
-                        l_split = l.split()
-                        wirelen = l_split[l_split.index("wirelen") + 2]
-                        wirelen = ''.join(c for c in wirelen if c.isdigit())
-                        wirelen = int(wirelen)
-            return wirelen
-
-        route_log = os.path.join(self.out_dir, self.nextpnr_log)
-        self.wirelength = get_wirelength(route_log)
-
-    def max_freq(self):
-        """Returns the max frequencies of the implemented design."""
-        log_file = os.path.join(self.out_dir, self.nextpnr_log)
-
-        clocks = dict()
-
-        with open(log_file, "r") as file:
-            in_routing = False
-            for line in file:
-                if "Routing.." in line:
-                    in_routing = True
-
-                if "Max frequency" in line and in_routing:
-                    regex = ".*\'(.*)\': ([0-9]*\.[0-9]*).*\(([A-Z]*) at ([0-9]*\.[0-9]*).*"
-                    match = re.match(regex, line)
-                    if match:
-                        clk_name = match.groups()[0]
-                        clk_freq = float(match.groups()[1])
-                        req_clk_freq = float(match.groups()[3])
-
-                        clocks[clk_name] = dict()
-                        clocks[clk_name]['actual'] = float(
-                            "{:.3f}".format(clk_freq)
-                        )
-                        clocks[clk_name]['requested'] = float(
-                            "{:.3f}".format(req_clk_freq)
-                        )
-                        clocks[clk_name]['met'] = match.groups()[2] == "PASS"
-                        clocks[clk_name]['setup_violation'] = 0
-                        clocks[clk_name]['hold_violation'] = 0
-
-        return clocks
+    def get_log_extractors(self):
+        def add_clock(clocks, match):
+            clk_name = match.groups()[0]
+            clk_freq = float(match.groups()[1])
+            req_clk_freq = float(match.groups()[3])
 
-    def get_resources(self):
-        """Returns a dictionary with the resources parsed from the nextpnr log file"""
-
-        resources = dict()
-
-        log_file = os.path.join(self.out_dir, self.nextpnr_log)
-
-        with open(log_file, "r") as f:
-            lines = f.readlines()
-
-        processing = False
-        for line in lines:
-            line = line.strip()
+            clocks[clk_name] = dict()
+            clocks[clk_name]['actual'] = float("{:.3f}".format(clk_freq))
+            clocks[clk_name]['requested'] = float(
+                "{:.3f}".format(req_clk_freq)
+            )
+            clocks[clk_name]['met'] = match.groups()[2] == "PASS"
+            clocks[clk_name]['setup_violation'] = 0
+            clocks[clk_name]['hold_violation'] = 0
+            return clocks
+
+        def add_resource(resources, match):
+            resources[match.group(1)] = int(match.group(2))
+            return resources
+
+        def get_wirelength(_, match):
+            wirelen = ''.join(c for c in match.group(1) if c.isdigit())
+            return int(wirelen)
+
+        def add_time(total, match):
+            return total + float(match.group(1))
+
+        nextpnr_extractors = [
+            Extractor(
+                'wirelength',
+                r'(?:^|\s)wirelen\s+=\s+(\S+)',
+                get_wirelength,
+                initial=0
+            ),
+            # Max frequency for clock 'clk': 130.2 MHz (PASS at 100.0 MHz)
+            Extractor(
+                'clocks',
+                r"^(?=.*Max frequency).*\'(.*)\': ([0-9]*\.[0-9]*).*\(([A-Z]*) at ([0-9]*\.[0-9]*).*",
+                add_clock,
+                initial=dict,
+                start=r'Routing\.\.'
+            ),
+            # Device utilisation:
+            #          SLICE_LUTX:    10/  1000     1%
+            Extractor(
+                'resources',
+                r'^[^:]*:\s*([^:]*?)\s*:\s*([0-9]+)/',
+                add_resource,
+                initial=dict,
+                start=r'Device utilisation',
+                end=r'^\s*$'
+            ),
+            Extractor(
+                'place',
+                r'^\s*(?:Info: )?(?:HeAP Placer Time: |SA placement time )(.*?)s?\s*$',
+                add_time,
+                initial=0.0
+            ),
+            Extractor(
+                'route',
+                r'^\s*(?:Info: )?Router[12] time (.*?)s?\s*$',
+                add_time,
+                initial=0.0
+            ),
+        ]
 
-            if "Device utilisation" in line:
-                processing = True
-                continue
+        return {
+            'yosys.log': get_yosys_extractors(),
+            self.nextpnr_log: nextpnr_extractors,
+        }
 
-            if not processing:
-                continue
-            else:
-                if len(line) == 0:
-                    break
+    def get_progress_extractors(self):
+        # Info: iter=3 wires=1234 overused=56 overuse=78 archfail=NA
+        return {
+            'yosys.log': [get_stage_extractor('synth')],
+            self.nextpnr_log:
+                [
+                    get_stage_extractor('pack', r'^Info: Pack'),
+                    get_stage_extractor(
+                        'place', r'^Info: (?:Placing|Running .*placer)'
+                    ),
+                    get_stage_extractor(
+                        'route', r'^Info: (?:Routing\.\.|Running router)'
+                    ),
+                    Extractor(
+                        'iteration', r'\biter=(\d+)',
+                        lambda _, m: int(m.group(1))
+                    ),
+                    Extractor(
+                        'overused', r'\boverused=(\d+)',
+                        lambda _, m: int(m.group(1))
+                    ),
+                ],
+        }
 
-                res = line.split(":")
-                res_type = res[1].strip()
+    def add_wirelength(self):
+        self.wirelength = self.get_log_metrics(self.nextpnr_log)['wirelength']
 
-                regex = "([0-9]*)\/.*"
-                match = re.match(regex, res[2].lstrip())
+    def max_freq(self):
+        """Returns the max frequencies of the implemented design."""
+        clocks = self.get_log_metrics(self.nextpnr_log)['clocks']
 
-                assert match
+        return {clk: dict(clk_data) for clk, clk_data in clocks.items()}
 
-                res_count = int(match.groups()[0])
-                resources[res_type] = res_count
+    def get_resources(self):
+        """Returns a dictionary with the resources parsed from the nextpnr log file"""
 
-        return resources
+        return dict(self.get_log_metrics(self.nextpnr_log)['resources'])
 
     def resources(self):
-        synth_resources = get_yosys_resources(
-            os.path.join(self.out_dir, "yosys.log")
-        )
+        synth_resources = self.get_log_metrics("yosys.log")['cells']
         synth_resources = self.get_resources_count(synth_resources)
 
         impl_resources = self.get_resources()
@@ -244,70 +261,22 @@ class NextpnrGeneric(Toolchain):
 
         return {"synth": synth_resources, "impl": impl_resources}
 
-    def get_yosys_runtimes(self, logfile):
-        runtime_re = 'CPU: user (\d+\.\d+)s system (\d+\.\d+)s'
-        log = dict()
-        with open(logfile, 'r') as fp:
-            for l in fp:
-                m = re.search(runtime_re, l)
-                if not m:
-                    continue
-                time = float(m[1]) + float(m[2])
-                log['synthesis'] = time
-
-                return log
-
-        assert False, "No run time found for yosys."
-
-    def get_nextpnr_runtimes(self, logfile):
-        def parse_time(string, prefix):
-            string = removeprefix(string, prefix)
-            return removesuffix(string, "s")
-
-        log = dict()
-
-        placement = 0.0
-        routing = 0.0
-
-        with open(logfile, 'r') as fp:
-            for l in fp:
-                l = l.strip()
-                if len(l) == 0:
-                    continue
-
-                l = removeprefix(l, "Info: ")
-                heap_placer_string = "HeAP Placer Time: "
-                sa_placer_string = "SA placement time "
-
-                router1_string = "Router1 time "
-                router2_string = "Router2 time "
-
-                if heap_placer_string in l:
-                    time = float(parse_time(l, heap_placer_string))
-                    placement += time
-                elif sa_placer_string in l:
-                    time = float(parse_time(l, sa_placer_string))
-                    placement += time
-                elif router1_string in l:
-                    time = float(parse_time(l, router1_string))
-                    routing += time
-                elif router2_string in l:
-                    time = float(parse_time(l, router2_string))
-                    routing += time
-
-        log["place"] = placement
-        log["route"] = routing
-
-        return log
+    def get_yosys_runtimes(self, log_name):
+        time = self.get_log_metrics(log_name)['synthesis']
+        assert time is not None, "No run time found for yosys."
+
+        return {'synthesis': time}
+
+    def get_nextpnr_runtimes(self, log_name):
+        metrics = self.get_log_metrics(log_name)
+
+        return {"place": metrics["place"], "route": metrics["route"]}
 
     def add_runtimes(self):
         """Returns the runtimes of the various steps"""
 
-        yosys_log = os.path.join(self.out_dir, 'yosys.log')
-        nextpnr_log = os.path.join(self.out_dir, self.nextpnr_log)
-
-        synth_times = self.get_yosys_runtimes(yosys_log)
-        impl_times = self.get_nextpnr_runtimes(nextpnr_log)
+        synth_times = self.get_yosys_runtimes('yosys.log')
+        impl_times = self.get_nextpnr_runtimes(self.nextpnr_log)
 
         for t in synth_times:
             self.add_runtime(t, synth_times[t])
@@ -317,9 +286,7 @@ class NextpnrGeneric(Toolchain):
     @staticmethod
     def yosys_ver():
         # Yosys 0.7+352 (git sha1 baddb017, clang 3.8.1-24 -fPIC -Os)
-        yosys_version = subprocess.check_output(
-            "yosys -V", shell=True, universal_newlines=True
-        ).strip()
+        yosys_version = probe_output("yosys -V", ["yosys"]).strip()
 
         m = YOSYS_REGEXP.match(yosys_version)
 
@@ -327,16 +294,28 @@ class NextpnrGeneric(Toolchain):
 
         return "{} {} {})".format(m.group(1), m.group(2), m.group(3))
 
+    @staticmethod
+    def get_env_binaries(toolchain):
+        '''Files identifying the nextpnr environment set up by env.sh'''
+        return [
+            os.path.abspath('env.sh'),
+            os.path.abspath(
+                os.path.join(
+                    'env', 'conda', 'envs', 'nextpnr-env', 'bin', toolchain
+                )
+            )
+        ]
+
     @staticmethod
     def nextpnr_version(toolchain):
         '''
         nextpnr-<variant>  --version
         '''
-        return subprocess.check_output(
-            'bash -c ". ./env.sh nextpnr && {} --version"'.format(toolchain),
-            shell=True,
-            universal_newlines=True,
-            stderr=subprocess.STDOUT
+        return probe_output(
+            '{} --version'.format(toolchain),
+            NextpnrGeneric.get_env_binaries(toolchain),
+            stderr=subprocess.STDOUT,
+            env=capture_environment('env.sh', ['nextpnr'])
         ).strip()
 
     def versions(self):
@@ -351,6 +330,10 @@ class NextpnrGeneric(Toolchain):
     def seedable():
         return True
 
+    @staticmethod
+    def has_synthesis_stage():
+        return True
+
     @staticmethod
     def check_env(toolchain):
         return {
@@ -426,24 +409,36 @@ class NextpnrFPGAInterchange(NextpnrGeneric):
             }
         )
 
+    @staticmethod
+    def get_chip(family, device):
+        return family + device
+
+    @classmethod
+    def get_chip_files(cls, rootdir, family, device, package):
+        chip = cls.get_chip(family, device)
+        device_dir = os.path.join(
+            rootdir, 'env', 'interchange', 'devices', chip
+        )
+        return [
+            os.path.join(device_dir, '{}.bin'.format(chip)),
+            os.path.join(device_dir, '{}.device'.format(chip)),
+        ]
+
     def prepare_edam(self):
         assert "fasm2bels" not in self.toolchain, "fasm2bels unsupported for fpga_interchange variant"
-        self.chip = self.family + self.device
+        self.chip = self.get_chip(self.family, self.device)
         share_dir = NextpnrGeneric.get_share_data(self)
-        self.chipdb = os.path.join(
-            self.rootdir, 'env', 'interchange', 'devices', self.chip,
-            '{}.bin'.format(self.chip)
+        chipdb, device_file = self.get_chip_files(
+            self.rootdir, self.family, self.device, self.package
         )
+        self.chipdb = self.get_chip_file(chipdb)
 
         self.schema_dir = os.path.join(
             self.rootdir, 'third_party', 'fpga-interchange-schema',
             'interchange'
         )
 
-        self.device_file = os.path.join(
-            self.rootdir, 'env', 'interchange', 'devices', self.chip,
-            '{}.device'.format(self.chip)
-        )
+        self.device_file = self.get_chip_file(device_file)
         self.files.append(get_file_dict(self.device_file, 'device'))
 
         self.yosys_additional_commands = ["setundef -zero -params"]
@@ -494,6 +489,10 @@ class NextpnrFPGAInterchange(NextpnrGeneric):
 
         return edam
 
+    @staticmethod
+    def has_synthesis_stage():
+        return False
+
     def run_steps(self):
         with Timed(self, 'fasm'):
             self.backend.build_main(self.project_name + '.fasm')
@@ -501,23 +500,23 @@ class NextpnrFPGAInterchange(NextpnrGeneric):
             self.backend.build_main(self.project_name + '.bit')
 
     def run(self):
-        with Timed(self, 'total'):
-            with Timed(self, 'prepare'):
-                self.edam = self.prepare_edam()
-                os.environ["EDALIZE_LAUNCHER"
-                           ] = f"source {self.env_script} nextpnr &&"
-                self.backend = edalize.get_edatool('symbiflow')(
-                    edam=self.edam, work_root=self.out_dir
-                )
-                self.backend.configure("")
-
-            self.backend.build_main(self.project_name + '.phys')
-            self.run_steps()
-
-        with Timed(self, 'report_timing'):
-            self.backend.build_main(self.project_name + '.timing')
+        try:
+            with Timed(self, 'total'):
+                with Timed(self, 'prepare'):
+                    self.edam = self.prepare_edam()
+                    self.enter_environment(self.env_script + ' nextpnr')
+                    self.backend = edalize.get_edatool('symbiflow')(
+                        edam=self.edam, work_root=self.out_dir
+                    )
+                    self.backend.configure("")
+
+                self.backend.build_main(self.project_name + '.phys')
+                self.run_steps()
 
-        del os.environ["EDALIZE_LAUNCHER"]
+            with Timed(self, 'report_timing'):
+                self.backend.build_main(self.project_name + '.timing')
+        finally:
+            self.exit_environment()
 
         self.add_runtimes()
         self.add_wirelength()
@@ -537,16 +536,7 @@ class NextPnrInterchangeNoSynth(NextpnrFPGAInterchange):
         self.nextpnr_log = "next.log"
 
     def get_share_data(self):
-        out = subprocess.run(
-            ['find', '.', '-name', self.toolchain_bin], stdout=subprocess.PIPE
-        )
-        nextpnr_locations = out.stdout.decode('utf-8').split('\n')
-        nextpnr_location = None
-
-        for location in nextpnr_locations:
-            if "env/bin/{}".format(self.toolchain_bin) in location:
-                nextpnr_location = os.path.abspath(os.path.dirname(location))
-                break
+        nextpnr_location = locate_binary(self.rootdir, self.toolchain_bin)
 
         assert nextpnr_location
 
@@ -577,41 +567,44 @@ class NextPnrInterchangeNoSynth(NextpnrFPGAInterchange):
 
     def run(self):
         with Timed(self, 'total'):
-            with Timed(self, 'prepare'):
-                self.edam = self.prepare_edam()
-                os.environ["EDALIZE_LAUNCHER"
-                           ] = f"source {self.env_script} nextpnr &&"
-                self.backend = edalize.get_edatool('nextpnr')(
-                    edam=self.edam, work_root=self.out_dir
-                )
-                self.backend.flow_config = {'arch': 'fpga_interchange'}
-                self.backend.configure("")
-
-            self.backend.build_main(self.project_name + '.phys')
-            self.run_steps()
+            try:
+                with Timed(self, 'prepare'):
+                    self.edam = self.prepare_edam()
+                    self.enter_environment(self.env_script + ' nextpnr')
+                    self.backend = edalize.get_edatool('nextpnr')(
+                        edam=self.edam, work_root=self.out_dir
+                    )
+                    self.backend.flow_config = {'arch': 'fpga_interchange'}
+                    self.backend.configure("")
+
+                self.backend.build_main(self.project_name + '.phys')
+                self.run_steps()
+            finally:
+                self.exit_environment()
 
         # TODO: Support for timing
         # with Timed(self, 'report_timing'):
         #     self.backend.build_main(self.project_name + '.timing')
 
-        del os.environ["EDALIZE_LAUNCHER"]
-
         self.add_runtimes()
         self.add_wirelength()
 
-    def prepare_edam(self):
-        assert "fasm2bels" not in self.toolchain, "fasm2bels unsupported for fpga_interchange variant"
-
+    @staticmethod
+    def get_chip(family, device):
         # TODO: This is a bad approach.
-        if self.family not in ['xcup']:
-            self.chip = self.family + self.device
+        if family not in ['xcup']:
+            return family + device
         else:
-            self.chip = self.device
+            return device
+
+    def prepare_edam(self):
+        assert "fasm2bels" not in self.toolchain, "fasm2bels unsupported for fpga_interchange variant"
 
-        self.chipdb = os.path.join(
-            self.rootdir, 'env', 'interchange', 'devices', self.chip,
-            '{}.bin'.format(self.chip)
+        self.chip = self.get_chip(self.family, self.device)
+        chipdb, device_file = self.get_chip_files(
+            self.rootdir, self.family, self.device, self.package
         )
+        self.chipdb = self.get_chip_file(chipdb)
 
         self.tool_options['chipdb'] = self.chipdb
 
@@ -620,10 +613,7 @@ class NextPnrInterchangeNoSynth(NextpnrFPGAInterchange):
             'interchange'
         )
 
-        self.device_file = os.path.join(
-            self.rootdir, 'env', 'interchange', 'devices', self.chip,
-            '{}.device'.format(self.chip)
-        )
+        self.device_file = self.get_chip_file(device_file)
         self.files.append(get_file_dict(self.device_file, 'device'))
 
         self.options = ['--disable-lut-mapping-cache']
@@ -661,8 +651,7 @@ class NextPnrInterchangeNoSynth(NextpnrFPGAInterchange):
     def add_runtimes(self):
         """Returns the runtimes of the various steps"""
 
-        nextpnr_log = os.path.join(self.out_dir, self.nextpnr_log)
-        impl_times = self.get_nextpnr_runtimes(nextpnr_log)
+        impl_times = self.get_nextpnr_runtimes(self.nextpnr_log)
 
         for t in impl_times:
             self.add_runtime(t, impl_times[t])
@@ -673,12 +662,11 @@ class NextPnrInterchangeNoSynth(NextpnrFPGAInterchange):
         nextpnr-<variant>  --version
         '''
         try:
-            return subprocess.check_output(
-                'bash -c ". ./env.sh nextpnr && {} --version"'.
-                format(toolchain),
-                shell=True,
-                universal_newlines=True,
-                stderr=subprocess.STDOUT
+            return probe_output(
+                '{} --version'.format(toolchain),
+                NextpnrGeneric.get_env_binaries(toolchain),
+                stderr=subprocess.STDOUT,
+                env=capture_environment('env.sh', ['nextpnr'])
             ).strip()
         except subprocess.CalledProcessError as e:
             print("ERROR (stdout/sterr):")
@@ -706,6 +694,11 @@ class NextPnrInterchangeExperimentalNoSynth(NextPnrInterchangeNoSynth):
         super().configure()
         self.tool_options['binary_path'] = self.toolchain_bin
 
+    @staticmethod
+    def cores():
+        # Only reserved for the run, nextpnr picks its number of threads
+        return 4
+
 
 class NextPnrInterchangeExperimentalNoSynthSingleThread(
         NextPnrInterchangeNoSynth):
@@ -719,6 +712,10 @@ class NextPnrInterchangeExperimentalNoSynthSingleThread(
         self.tool_options['nextpnr_options'] = self.options + ['--threads=1']
         self.tool_options['binary_path'] = self.toolchain_bin
 
+    @staticmethod
+    def cores():
+        return 1
+
 
 class NextpnrXilinx(NextpnrGeneric):
     '''nextpnr Xilinx variant using Yosys for synthesis'''
@@ -760,9 +757,11 @@ class NextpnrXilinx(NextpnrGeneric):
         self.chip = self.family + self.device
         share_dir = NextpnrGeneric.get_share_data(self)
 
-        self.chipdb = os.path.join(
-            share_dir, 'nextpnr-xilinx',
-            '{}{}.bin'.format(self.family, self.part)
+        self.chipdb = self.get_chip_file(
+            os.path.join(
+                share_dir, 'nextpnr-xilinx',
+                '{}{}.bin'.format(self.family, self.part)
+            )
         )
         self.files.append(get_file_dict(self.chipdb, 'bba'))
 
@@ -782,6 +781,19 @@ class NextpnrXilinx(NextpnrGeneric):
 
         return edam
 
+    @staticmethod
+    def get_chip_files(rootdir, family, device, package):
+        nextpnr_location = locate_binary(rootdir, 'nextpnr-xilinx')
+        if nextpnr_location is None:
+            return []
+
+        return [
+            os.path.join(
+                nextpnr_location, '..', 'share', 'nextpnr-xilinx',
+                '{}{}{}.bin'.format(family, device, package)
+            )
+        ]
+
     def run(self):
         NextpnrGeneric.generic_run(self, self.prepare_edam)
 
@@ -865,20 +877,21 @@ class NextpnrOxide(NextpnrGeneric):
 
     def run(self):
         with Timed(self, 'total'):
-            with Timed(self, 'prepare'):
-                self.edam = self.prepare_edam()
-                os.environ["EDALIZE_LAUNCHER"] = f"source {self.env_script} &&"
-                self.backend = edalize.get_edatool('oxide')(
-                    edam=self.edam, work_root=self.out_dir
-                )
-                self.backend.configure("")
             try:
+                with Timed(self, 'prepare'):
+                    self.edam = self.prepare_edam()
+                    self.enter_environment(self.env_script)
+                    self.backend = edalize.get_edatool('oxide')(
+                        edam=self.edam, work_root=self.out_dir
+                    )
+                    self.backend.configure("")
+
                 with Timed(self, 'fasm'):
                     self.backend.build_main(self.project_name + '.fasm')
                 with Timed(self, 'bitstream'):
                     self.backend.build_main(self.project_name + '.bit')
             finally:
-                del os.environ['EDALIZE_LAUNCHER']
+                self.exit_environment()
 
         self.add_runtimes()
         self.add_wirelength()
@@ -887,6 +900,10 @@ class NextpnrOxide(NextpnrGeneric):
     def seedable():
         return True
 
+    @staticmethod
+    def has_synthesis_stage():
+        return False
+
     @staticmethod
     def check_env():
         return {
@@ -19,7 +19,9 @@
 
 import collections
 import datetime
+import fnmatch
 import glob
+import hashlib
 import json
 import math
 from pathlib import Path
@@ -30,11 +32,25 @@ from subprocess import check_call
 import sys
 import time
 
+from utils.artifacts import link_or_copy
+from utils.chipdb import get_staged_path
+from utils.environment import capture_environment
+from utils.log_parser import parse_log
 from utils.utils import Timed, have_exec, get_file_dict
 
+# Results of a run, collected once by Toolchain.collect_metrics
+Metrics = collections.namedtuple(
+    'Metrics',
+    ['max_freq', 'resources', 'runtimes', 'wirelength', 'maximum_memory_use']
+)
+
 
 class Toolchain:
     '''A toolchain takes in verilog files and produces a .bitstream'''
+
+    # Files of the output directory holding the results of a run
+    retained_files = ['meta.json', '*.log', '*.rpt', '*.txt']
+
     def __init__(self, rootdir):
         self.rootdir = rootdir
         self.runtimes = collections.OrderedDict()
@@ -53,6 +69,14 @@ class Toolchain:
         self.seed = None
         self.build = None
         self.build_type = None
+        self.task_id = None
+        self.saved_environ = None
+        self.stage_cache = None
+        self.cached_targets = None
+        self.stage_key = None
+        self.stage_cache_hits = []
+        self.base_build = None
+        self.chipdb_dir = None
         self.date = datetime.datetime.utcnow()
 
         self.family = None
@@ -63,13 +87,19 @@ class Toolchain:
 
         self.project_name = None
         self.srcs = None
+        self.data = None
         self.top = None
         self.out_dir = None
+        self.result_dir = None
         self.clocks = None
         self.clock_aliases = None
 
         self.wirelength = None
         self.maximum_memory_use = None
+        self.log_metrics = dict()
+        self.log_timings = dict()
+        self.metrics = None
+        self.progress = None
 
     def canonicalize(self, fns):
         return [os.path.realpath(self.rootdir + '/' + fn) for fn in fns]
@@ -150,6 +180,9 @@ class Toolchain:
         if self.seed:
             ret += '_seed_' + str(self.seed)
 
+        if self.task_id:
+            ret += '_' + self.task_id
+
         return ret
 
     def project(
@@ -202,11 +235,272 @@ class Toolchain:
         os.makedirs(os.path.expanduser(out_dir), exist_ok=True)
         print('Writing to %s' % out_dir)
         data = project.get('data', None)
+        self.data = self.canonicalize(data) if data else []
         if data:
             for f in data:
                 dst = os.path.join(out_dir, os.path.basename(f))
-                print("Copying data file {} to {}".format(f, dst))
-                shutil.copy(f, dst)
+                method = link_or_copy(f, dst)
+                print("Staging data file {} to {} ({})".format(f, dst, method))
+
+    def fingerprint(self, parameters=True):
+        '''Returns a hash of all the inputs of the run.
+
+        This covers the content of the sources, data and constraint files,
+        the tool parameters, the seed and the versions of the tools. The
+        tool parameters and the seed are left out if parameters is False.
+        '''
+        digest = hashlib.sha256()
+
+        def update(value):
+            digest.update(str(value).encode('utf-8'))
+            digest.update(b'\0')
+
+        for fn in self.srcs + self.data + [self.pcf, self.sdc, self.xdc,
+                                           self.pdc]:
+            update(fn and os.path.basename(fn))
+            if fn is None:
+                continue
+            with open(fn, 'rb') as fp:
+                for chunk in iter(lambda: fp.read(1 << 20), b''):
+                    digest.update(chunk)
+
+        for value in (self.toolchain, self.family, self.part, self.board,
+                      self.top, self.strategy, self.carry):
+            update(value)
+
+        if parameters:
+            for value in self.get_parameters():
+                update(value)
+
+        update(json.dumps(self.versions(), sort_keys=True))
+
+        return digest.hexdigest()
+
+    def get_parameters(self):
+        '''Returns the seed and the tool parameters of the run.'''
+        parameters = [self.seed, self.params_string]
+        if self.params_file:
+            params_path = os.path.join(
+                os.getcwd(), 'assets', 'tool_parameters', self.params_file
+            )
+            with open(params_path, 'r') as fp:
+                parameters.append(fp.read())
+
+        return parameters
+
+    def get_synthesis_target(self):
+        '''Returns the build target producing the synthesized netlist, for
+        the toolchains having a synthesis stage (see has_synthesis_stage).'''
+        return None
+
+    def get_stage_options(self, target):
+        '''Returns the options a build target depends on, besides the
+        outputs of the previous targets.
+
+        Synthesis does not depend on any of them, every other target depends
+        on all the tool parameters and on the seed.
+        '''
+        if target == self.get_synthesis_target():
+            return []
+
+        return self.get_parameters()
+
+    def get_output_stamps(self):
+        stamps = dict()
+        with os.scandir(self.out_dir) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    stamps[entry.name] = (stat.st_mtime_ns, stat.st_size)
+
+        return stamps
+
+    def build_target(self, target):
+        '''Builds an edalize target, reusing its outputs from the stage cache
+        if it was already built from the same input artifacts and options.
+
+        Targets must be built in the order of the flow: the key of a target
+        is derived from the key of the previous one and from the content of
+        the artifacts it produced.
+        '''
+        if self.stage_cache is None or (self.cached_targets is not None
+                                        and target not in self.cached_targets):
+            self.backend.build_main(target)
+            return
+
+        if self.stage_key is None:
+            self.stage_key = self.fingerprint(parameters=False)
+
+        key = hashlib.sha256(
+            json.dumps(
+                [self.stage_key, target,
+                 self.get_stage_options(target)]
+            ).encode('utf-8')
+        ).hexdigest()
+
+        outputs = self.stage_cache.restore(key, self.out_dir)
+        if outputs:
+            # Make the restored outputs newer than the files written by the
+            # configuration step, so that make considers them up to date.
+            now = time.time_ns()
+            for index, name in enumerate(sorted(outputs)):
+                timestamp = now + index
+                os.utime(
+                    os.path.join(self.out_dir, name),
+                    ns=(timestamp, timestamp)
+                )
+            self.stage_cache_hits.append(target)
+            print('Restored {} from the stage cache'.format(target))
+        else:
+            stamps = self.get_output_stamps()
+            self.backend.build_main(target)
+            outputs = [
+                name for name, stamp in self.get_output_stamps().items()
+                if stamps.get(name) != stamp
+            ]
+            self.stage_cache.store(key, self.out_dir, outputs)
+
+        # Logs and reports hold timings, which would make the keys of the
+        # following targets differ even for identical artifacts.
+        digest = hashlib.sha256(key.encode('utf-8'))
+        for name in sorted(outputs):
+            if any(fnmatch.fnmatch(name, pattern)
+                   for pattern in self.retained_files):
+                continue
+            digest.update(name.encode('utf-8'))
+            digest.update(b'\0')
+            with open(os.path.join(self.out_dir, name), 'rb') as fp:
+                for chunk in iter(lambda: fp.read(1 << 20), b''):
+                    digest.update(chunk)
+        self.stage_key = digest.hexdigest()
+
+    def is_up_to_date(self):
+        '''Returns whether the output directory already holds a successful
+        run of the very same inputs.'''
+        meta_path = Path(self.out_dir) / 'meta.json'
+        if not meta_path.exists():
+            return False
+
+        try:
+            with meta_path.open('r') as rfptr:
+                meta = json.load(rfptr)
+        except ValueError:
+            return False
+
+        return meta.get('status') == 'succeeded' and meta.get(
+            'fingerprint'
+        ) == self.fingerprint()
+
+    def get_chip_file(self, path):
+        '''Returns the copy of a chip database staged in chipdb_dir, if
+        any, or the chip database itself.'''
+        if self.chipdb_dir is not None:
+            staged_path = get_staged_path(self.chipdb_dir, path)
+            if os.path.exists(staged_path):
+                return staged_path
+
+        return path
+
+    def reuse_build(self, build_dir):
+        '''Copies the outputs of another build of the same design (see
+        base_toolchain) into the output directory.
+
+        The files already in the output directory, e.g. the ones written by
+        the configuration step, are kept. The copied files get the current
+        time, in the order they were written in, so that make considers the
+        targets they belong to up to date.
+        '''
+        entries = []
+        with os.scandir(build_dir) as scan:
+            for entry in scan:
+                if entry.name == 'meta.json' or not entry.is_file():
+                    continue
+                if os.path.exists(os.path.join(self.out_dir, entry.name)):
+                    continue
+                entries.append((entry.stat().st_mtime_ns, entry.name))
+
+        now = time.time_ns()
+        for index, (_, name) in enumerate(sorted(entries)):
+            path = os.path.join(self.out_dir, name)
+            shutil.copy2(os.path.join(build_dir, name), path)
+            os.utime(path, ns=(now + index, now + index))
+
+        print('Reusing the outputs of {}'.format(build_dir))
+
+    def enter_scratch_dir(self, scratch_dir):
+        '''Moves the run to a directory of scratch_dir (e.g. a tmpfs or a
+        local disk), until leave_scratch_dir copies its results back.'''
+        self.result_dir = self.out_dir
+        self.out_dir = os.path.join(
+            scratch_dir, os.path.basename(os.path.normpath(self.result_dir))
+        )
+        if os.path.exists(self.out_dir):
+            shutil.rmtree(self.out_dir)
+        os.makedirs(self.out_dir)
+
+        for f in self.data:
+            link_or_copy(f, os.path.join(self.out_dir, os.path.basename(f)))
+
+    def leave_scratch_dir(self):
+        '''Copies the run back to the output directory, as left by the
+        pruning of its intermediate files if any, and removes the scratch
+        directory. The data files are already staged in the output
+        directory.'''
+        data = set(os.path.basename(f) for f in self.data)
+        try:
+            for dirpath, _, filenames in os.walk(self.out_dir):
+                relpath = os.path.relpath(dirpath, self.out_dir)
+                result_dir = os.path.normpath(
+                    os.path.join(self.result_dir, relpath)
+                )
+                os.makedirs(result_dir, exist_ok=True)
+                for name in filenames:
+                    if relpath == '.' and name in data:
+                        continue
+                    shutil.copy2(
+                        os.path.join(dirpath, name),
+                        os.path.join(result_dir, name),
+                        follow_symlinks=False
+                    )
+        finally:
+            shutil.rmtree(self.out_dir, ignore_errors=True)
+            self.out_dir = self.result_dir
+
+    def update_metadata(self, **kwargs):
+        '''Updates fields of an already written meta.json.'''
+        meta_path = Path(self.out_dir) / 'meta.json'
+        with meta_path.open('r') as rfptr:
+            meta = json.load(rfptr)
+
+        meta.update(kwargs)
+
+        with meta_path.open('w') as wfptr:
+            json.dump(meta, wfptr, sort_keys=True, indent=4)
+
+    def enter_environment(self, env_script, **variables):
+        '''Sets up the environment of an env.sh invocation (e.g. "env.sh
+        nextpnr") for the following steps, including the ones run by edalize.
+
+        The environment is captured once per session instead of sourcing
+        env.sh before every step.
+        '''
+        script, *args = env_script.split()
+        env = capture_environment(script, args)
+        env.update(variables)
+
+        self.saved_environ = dict(os.environ)
+        os.environ.clear()
+        os.environ.update(env)
+
+    def exit_environment(self):
+        '''Restores the environment saved by enter_environment, if it was
+        entered, so that it can be called from a finally clause.'''
+        if self.saved_environ is None:
+            return
+
+        os.environ.clear()
+        os.environ.update(self.saved_environ)
+        self.saved_environ = None
 
     def cmd(self, cmd, argstr, env=None):
         print("Running: %s %s" % (cmd, argstr))
@@ -232,6 +526,48 @@ class Toolchain:
                 env=env
             )
 
+    def get_log_extractors(self):
+        '''Returns the extractors of the metrics found in the logs of a build,
+        by log file name (relative to the output directory)'''
+        return dict()
+
+    def get_progress_extractors(self):
+        '''Returns the extractors of the progress of a run (e.g. its stage,
+        the router iteration or the overused nodes), by log file name
+        (relative to the output directory)'''
+        return dict()
+
+    def get_log_metrics(self, log_name):
+        '''
+        Returns the metrics extracted from a log of the build.
+
+        The log is streamed once by all the extractors registered for it, and
+        parsed again only if it changed (copying it back from a scratch
+        directory preserves its stamp). The time spent in each extractor is
+        kept in log_timings and printed in verbose mode.
+        '''
+        log_file = os.path.join(self.out_dir, log_name)
+        st = os.stat(log_file)
+        stamp = (st.st_size, st.st_mtime_ns)
+
+        if log_name in self.log_metrics:
+            metrics_stamp, metrics = self.log_metrics[log_name]
+            if metrics_stamp == stamp:
+                return metrics
+
+        extractors = self.get_log_extractors()[log_name]
+        timings = dict() if self.verbose else None
+        metrics = parse_log(log_file, extractors, timings)
+        self.log_metrics[log_name] = (stamp, metrics)
+
+        if timings is not None:
+            self.log_timings[log_name] = timings
+            print('Parsed {}'.format(log_name))
+            for name, dt in timings.items():
+                print('  {}: {:.3f}s'.format(name, dt))
+
+        return metrics
+
     def get_runtimes(self):
         """Returns a standard runtime dictionary.
 
@@ -348,7 +684,46 @@ class Toolchain:
 
         return max_freq, resources
 
-    def write_metadata(self, output_error):
+    def collect_metrics(self):
+        '''
+        Returns the Metrics of a successful run.
+
+        They are computed once, the first time they are needed: the printed
+        statistics, the metadata and any other report read the same results
+        and must not modify them.
+        '''
+        if self.metrics is None:
+            max_freq, resources = self.get_metrics()
+            self.metrics = Metrics(
+                max_freq=max_freq,
+                resources=resources,
+                runtimes=self.get_runtimes(),
+                wirelength=self.wirelength,
+                maximum_memory_use=self.maximum_memory_use
+            )
+
+        return self.metrics
+
+    def get_partial_metrics(self):
+        '''Returns the Metrics that the logs of an interrupted run already
+        provide, with None for the others.'''
+        try:
+            max_freq, resources = self.get_metrics()
+        except Exception:
+            max_freq, resources = None, None
+
+        return Metrics(
+            max_freq=max_freq,
+            resources=resources,
+            runtimes=None,
+            wirelength=self.wirelength,
+            maximum_memory_use=self.maximum_memory_use
+        )
+
+    def get_metadata(
+        self, output_error, status, metrics, versions, fingerprint
+    ):
+        '''Returns the metadata of the run, with the given results'''
         synth_tool, pr_tool = {
             'vpr': ('yosys', 'vpr'),
             'vpr-fasm2bels': ('yosys', 'vpr'),
@@ -371,13 +746,14 @@ class Toolchain:
             'synpro-radiant': ('synplify', 'radiant')
         }[self.toolchain]
 
-        max_freq, resources = (None,
-                               None) if output_error else self.get_metrics()
+        base_build = os.path.basename(
+            self.base_build
+        ) if self.base_build else None
 
         # Meta information
         json_data = {
             'date': self.date.replace(microsecond=0).isoformat(),
-            'status': "failed" if output_error else "succeeded",
+            'status': status or ("failed" if output_error else "succeeded"),
             'error_msg': output_error,
 
             # Task information
@@ -405,21 +781,48 @@ class Toolchain:
             'seed': self.seed,
             'build': self.build,
             'build_type': self.build_type,
+            'task_id': self.task_id,
             'strategy': self.strategy,
             'parameters': self.params_file or self.params_string,
             'sources': [x.replace(os.getcwd(), '.') for x in self.srcs],
             'top': self.top,
-            'versions': self.versions(),
+            'versions': versions,
+            'fingerprint': fingerprint,
+            'stage_cache_hits': self.stage_cache_hits,
+            'base_build': base_build,
+            'progress': self.progress,
             'cmds': self.cmds,
 
             # Results
-            'runtime': None if output_error else self.get_runtimes(),
-            'max_freq': max_freq,
-            'resources': resources,
-            'wirelength': self.wirelength,
-            'maximum_memory_use': self.maximum_memory_use,
+            'runtime': metrics.runtimes,
+            'max_freq': metrics.max_freq,
+            'resources': metrics.resources,
+            'wirelength': metrics.wirelength,
+            'maximum_memory_use': metrics.maximum_memory_use,
+
+            # Execution information
+            'cpu_affinity': self.get_cpu_affinity(),
         }
 
+        return json_data
+
+    def write_metadata(self, output_error, status=None):
+        if status == 'aborted':
+            metrics = self.get_partial_metrics()
+        elif output_error:
+            metrics = Metrics(
+                max_freq=None,
+                resources=None,
+                runtimes=None,
+                wirelength=self.wirelength,
+                maximum_memory_use=self.maximum_memory_use
+            )
+        else:
+            metrics = self.collect_metrics()
+
+        json_data = self.get_metadata(
+            output_error, status, metrics, self.versions(), self.fingerprint()
+        )
         with (Path(self.out_dir) / 'meta.json').open('w') as wfptr:
             json.dump(json_data, wfptr, sort_keys=True, indent=4)
 
@@ -434,10 +837,61 @@ lscpu >lscpu.txt
             cwd=self.out_dir
         )
 
+    def write_failure_metadata(self, output_error, status):
+        '''
+        Writes the metadata of a run whose process died before writing it,
+        with the same entries as write_metadata but no results.
+
+        Nothing is probed: the tools and the sources might be what the run
+        failed on.
+        '''
+        metrics = Metrics(
+            max_freq=None,
+            resources=None,
+            runtimes=None,
+            wirelength=None,
+            maximum_memory_use=None
+        )
+        json_data = self.get_metadata(
+            output_error, status, metrics, dict(), None
+        )
+        with (Path(self.out_dir) / 'meta.json').open('w') as wfptr:
+            json.dump(json_data, wfptr, sort_keys=True, indent=4)
+
+    @staticmethod
+    def get_cpu_affinity():
+        if hasattr(os, 'sched_getaffinity'):
+            return sorted(os.sched_getaffinity(0))
+        return None
+
     @staticmethod
     def seedable():
         return False
 
+    @staticmethod
+    def has_synthesis_stage():
+        '''Whether the synthesis is built as a separate target, so that it
+        can be shared by the runs differing only in their seed, build number
+        or place and route parameters.'''
+        return False
+
+    @staticmethod
+    def get_chip_files(rootdir, family, device, package):
+        '''Chip databases the toolchain loads for a device, which can be
+        staged on a faster disk before running the tasks.'''
+        return []
+
+    @staticmethod
+    def base_toolchain():
+        '''Toolchain whose build of the same task the toolchain starts from,
+        e.g. to validate its bitstream, instead of running the whole flow.'''
+        return None
+
+    @staticmethod
+    def cores():
+        '''Number of cores the toolchain makes use of when running'''
+        return 1
+
     @staticmethod
     def check_env():
         return {}
@@ -18,7 +18,6 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import os
-import subprocess
 import time
 import collections
 import json
@@ -27,12 +26,15 @@ import shutil
 import sys
 import glob
 import datetime
-import asciitable
 import edalize
 import glob
 
 from toolchains.toolchain import Toolchain
+from utils.log_parser import Extractor
+from utils.progress import get_stage_extractor
 from utils.utils import Timed, get_vivado_max_freq, have_exec, get_yosys_resources, get_file_dict
+from utils.versions import probe_output
+from utils.vivado_report import read_report_tables
 
 
 class Vivado(Toolchain):
@@ -125,6 +127,29 @@ class Vivado(Toolchain):
         for t in impl_times:
             self.add_runtime(t, impl_times[t])
 
+    def get_progress_extractors(self):
+        # Command: route_design -directive Explore
+        # Phase 4.1 Global Iteration 0
+        # Number of Nodes with overlaps = 1234
+        extractors = [
+            Extractor('stage', r'^Command: (\w+)', lambda _, m: m.group(1)),
+            Extractor(
+                'iteration', r'Global Iteration (\d+)',
+                lambda _, m: int(m.group(1))
+            ),
+            Extractor(
+                'overused', r'Number of Nodes with overlaps = (\d+)',
+                lambda _, m: int(m.group(1))
+            ),
+        ]
+        runs_dir = self.project_name + '.runs'
+
+        return {
+            'vivado.log': extractors,
+            os.path.join(runs_dir, 'synth_1', 'runme.log'): extractors,
+            os.path.join(runs_dir, 'impl_1', 'runme.log'): extractors,
+        }
+
     def prepare_edam(self):
         if self.family == "xcup":
             part = self.device + "-" + self.package
@@ -210,6 +235,11 @@ class Vivado(Toolchain):
     def seedable():
         return False
 
+    @staticmethod
+    def cores():
+        # general.maxThreads defaults to 8 on Linux
+        return 8
+
     def check_env():
         return {
             'vivado': have_exec('vivado'),
@@ -221,37 +251,9 @@ class Vivado(Toolchain):
         return get_vivado_max_freq(report_file)
 
     def vivado_resources(self, report_file):
-        with open(report_file, 'r') as fp:
-            report_data = fp.read()
-            report_data = report_data.split('\n\n')
-            report = dict()
-            section = None
-            for d in report_data:
-                match = re.search(r'\n-+$', d)
-                if match is not None:
-                    match = re.search(r'\n?[0-9\.]+ (.*)', d)
-                    if match is not None:
-                        section = match.groups()[0]
-                if d.startswith('+--'):
-                    if section is not None:
-                        # cleanup the table
-                        d = re.sub(r'\+-.*-\+\n', '', d)
-                        d = re.sub(r'\+-.*-\+$', '', d)
-                        d = re.sub(r'^\|\s+', '', d, flags=re.M)
-                        d = re.sub(r'\s\|\n', '\n', d)
-
-                        report[section.lower()] = asciitable.read(
-                            d,
-                            delimiter='|',
-                            guess=False,
-                            comment=r'(\+.*)|(\*.*)',
-                            numpy=False
-                        )
-
-        prims = report["primitives"]
-        zip_it = zip(prims["Ref Name"], prims["Used"])
-
-        return dict(zip_it)
+        tables = read_report_tables(report_file, ['Primitives'])
+
+        return {row['Ref Name']: row['Used'] for row in tables['primitives']}
 
     def resources(self, report_file=None):
         def get_report_file(step, suffix):
@@ -273,10 +275,14 @@ class Vivado(Toolchain):
         return {"synth": synth_resources, "impl": impl_resources}
 
     def vivado_ver(self):
-        cmd = "source $(find -L /opt -wholename \"*Xilinx/Vivado/*/settings64.sh\" 2>/dev/null | sort | head -n 1);"
+        settings = os.getenv('VIVADO_SETTINGS')
+        if settings:
+            cmd = "source {};".format(settings)
+        else:
+            cmd = "source $(find -L /opt -wholename \"*Xilinx/Vivado/*/settings64.sh\" 2>/dev/null | sort | head -n 1);"
         cmd += "which vivado"
-        output = subprocess.check_output(
-            cmd, shell=True, universal_newlines=True, executable="/bin/bash"
+        output = probe_output(
+            cmd, [settings, '/opt/Xilinx/Vivado'], executable="/bin/bash"
         ).strip()
 
         version_re = re.compile(".*/Vivado/([0-9]+\.[0-9]+)/.*")
@@ -417,9 +423,7 @@ class VivadoYosys(Vivado):
     @staticmethod
     def yosys_ver():
         # Yosys 0.7+352 (git sha1 baddb017, clang 3.8.1-24 -fPIC -Os)
-        return subprocess.check_output(
-            "yosys -V", shell=True, universal_newlines=True
-        ).strip()
+        return probe_output("yosys -V", ["yosys"]).strip()
 
     def resources(self):
         def get_report_file(step, suffix):
@@ -440,6 +444,12 @@ class VivadoYosys(Vivado):
 
         return {"synth": synth_resources, "impl": impl_resources}
 
+    def get_progress_extractors(self):
+        extractors = {'yosys.log': [get_stage_extractor('synth')]}
+        extractors.update(Vivado.get_progress_extractors(self))
+
+        return extractors
+
     def get_yosys_runtimes(self, logfile):
         log = dict()
         commands = list()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import signal
+import threading
+
+from utils.proc import terminate_children
+
+
+class StalledRouting:
+    """Class to give up on a routing whose number of overused nodes did not
+    improve for the given number of router iterations."""
+    def __init__(self, iterations):
+        self.iterations = iterations
+        self.best = None
+        self.best_iteration = None
+
+    def check(self, status):
+        iteration = status.get('iteration')
+        overused = status.get('overused')
+        if iteration is None or overused is None:
+            return None
+
+        if self.best_iteration is not None and iteration < self.best_iteration:
+            # The router started over (e.g. with another channel width)
+            self.best = None
+
+        if self.best is None or overused < self.best:
+            self.best = overused
+            self.best_iteration = iteration
+            return None
+
+        if iteration - self.best_iteration < self.iterations:
+            return None
+
+        return 'no fewer than {} overused nodes since iteration {} ({} iterations)'.format(
+            self.best, self.best_iteration, iteration - self.best_iteration
+        )
+
+
+class SlowCriticalPath:
+    """Class to give up on a routing whose critical path is more than margin
+    percent longer than the best one of the previous seeds and parameters."""
+    def __init__(self, margin, best_critical_path):
+        self.margin = margin
+        self.best_critical_path = best_critical_path
+
+    def check(self, status):
+        cpd = status.get('cpd')
+        if cpd is None or not self.best_critical_path:
+            return None
+
+        if cpd <= self.best_critical_path * (1 + self.margin / 100):
+            return None
+
+        return 'critical path of {:.3f} ns, more than {:g}% over the best one so far ({:.3f} ns)'.format(
+            cpd, self.margin, self.best_critical_path
+        )
+
+
+ABORT_POLICIES = {
+    'stall': StalledRouting,
+    'cpd': SlowCriticalPath,
+}
+
+
+def check_abort_policy(spec):
+    """Validates an abort policy specification (<policy>:<value>)."""
+    name, sep, value = spec.partition(':')
+    if name not in ABORT_POLICIES or not sep:
+        raise ValueError(spec)
+    if name == 'stall':
+        # A number of router iterations
+        int(value)
+    else:
+        float(value)
+
+    return spec
+
+
+def get_abort_policies(specs, best_critical_path=None):
+    """Returns the abort policies given by their specifications:
+
+    stall:K   the overused nodes did not improve for K router iterations
+    cpd:X     the critical path is X% longer than the best one so far
+    """
+    policies = []
+    for spec in specs or []:
+        name, _, value = check_abort_policy(spec).partition(':')
+        if name == 'stall':
+            policies.append(StalledRouting(int(value)))
+        else:
+            policies.append(SlowCriticalPath(float(value), best_critical_path))
+
+    return policies
+
+
+class RunAborted(Exception):
+    pass
+
+
+class EarlyAbort:
+    """Class to abort a run as soon as one of its policies gives up on it.
+
+    The policies are checked against the status of a ProgressMonitor after
+    each of its progress events. Since they are checked in the thread of the
+    monitor, the run is interrupted by a signal: its handler stops all the
+    tools spawned by the run, as on timeouts, and raises RunAborted in the
+    main thread.
+    """
+    def __init__(self, policies, monitor):
+        self.policies = policies
+        self.monitor = monitor
+        self.reason = None
+        self.armed = False
+        monitor.add_listener(self.update)
+
+    def arm(self):
+        self.armed = True
+        signal.signal(signal.SIGUSR1, self.handle_signal)
+
+    def disarm(self):
+        self.armed = False
+        signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+
+    def update(self, name, value):
+        if not self.armed or self.reason is not None:
+            return
+
+        for policy in self.policies:
+            reason = policy.check(self.monitor.status)
+            if reason is not None:
+                self.reason = reason
+                signal.pthread_kill(
+                    threading.main_thread().ident, signal.SIGUSR1
+                )
+                return
+
+    def handle_signal(self, signum, frame):
+        terminate_children()
+        raise RunAborted('ERROR: Aborted: {}'.format(self.reason))
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import fcntl
+import fnmatch
+import gzip
+import os
+import shutil
+
+import yaml
+
+# ioctl cloning a file on copy-on-write filesystems (btrfs, XFS)
+FICLONE = 0x40049409
+
+
+def link_or_copy(src, dst):
+    """Stages a file in a build directory, sharing its content with the
+    original file when possible.
+
+    The file is cloned (reflink) if the filesystem supports it, hardlinked if
+    both files are on the same filesystem, and copied otherwise. Returns the
+    method used.
+    """
+    if os.path.lexists(dst):
+        os.unlink(dst)
+
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        shutil.copymode(src, dst)
+        return 'reflink'
+    except OSError:
+        os.unlink(dst)
+
+    try:
+        os.link(src, dst)
+        return 'hardlink'
+    except OSError:
+        pass
+
+    shutil.copy(src, dst)
+    return 'copy'
+
+
+def get_prune_policy(root_dir, build_type):
+    """Returns the pruning policy of a build type, defined in
+    assets/prune.yaml."""
+    with open(os.path.join(root_dir, 'assets', 'prune.yaml'), 'r') as fp:
+        policies = yaml.safe_load(fp)
+
+    for policy in policies:
+        if fnmatch.fnmatch(build_type or '', policy['build_type']):
+            return policy
+
+    return None
+
+
+def prune_directory(out_dir, policy, keep=()):
+    """Deletes or compresses the intermediate files of a build directory
+    according to a pruning policy.
+
+    The files matching one of the keep patterns (e.g. meta.json and the
+    logs the metrics are parsed from) are left untouched. Returns the number
+    of bytes reclaimed.
+    """
+    def matches(name, patterns):
+        return any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+
+    keep = list(keep) + policy.get('keep', [])
+
+    reclaimed = 0
+    for dirpath, _, filenames in os.walk(out_dir):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.islink(path) or matches(name, keep):
+                continue
+
+            stat = os.stat(path)
+            # Removing a hardlinked file does not free its content
+            size = stat.st_size if stat.st_nlink == 1 else 0
+
+            if matches(name, policy.get('delete', [])):
+                os.unlink(path)
+                reclaimed += size
+            elif matches(name, policy.get('compress', [])):
+                with open(path, 'rb') as fsrc, gzip.open(path + '.gz',
+                                                         'wb') as fdst:
+                    shutil.copyfileobj(fsrc, fdst)
+                os.unlink(path)
+                reclaimed += size - os.stat(path + '.gz').st_size
+
+    return reclaimed
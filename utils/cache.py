@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import glob
+import json
+import os
+import shutil
+import tempfile
+
+CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'fpga-tool-perf'
+)
+
+
+class JSONCache:
+    """Class to hold a small dictionary persisted in a JSON file, shared by
+    all the processes running on the machine.
+
+    Updates are merged with the content of the file and written atomically,
+    so concurrent writers can only lose their own entries, never corrupt
+    the file.
+    """
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.entries = self.read()
+
+    def read(self):
+        try:
+            with open(self.cache_file, 'r') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return dict()
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries = self.read()
+        self.entries[key] = value
+
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(
+                dir=os.path.dirname(self.cache_file)
+            )
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(self.entries, fp, sort_keys=True, indent=4)
+            os.replace(tmp_file, self.cache_file)
+        except OSError:
+            # The cache is an optimization: keep going without it
+            pass
+
+
+class BuildCache:
+    """Class to store the results of successful builds in a directory, keyed
+    by the fingerprint of their inputs.
+
+    Each entry holds the metadata, logs and reports of a build, or the
+    outputs of a single stage of a build (see Toolchain.build_target). Once the
+    cache grows above max_size (MiB), the least recently used entries are
+    evicted.
+    """
+    def __init__(self, cache_dir, max_size=None):
+        self.cache_dir = os.path.abspath(os.path.expanduser(cache_dir))
+        self.max_size = max_size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def restore(self, key, out_dir):
+        """Copies the files of a cache entry into out_dir.
+
+        Returns the names of the restored files, or None if the entry was
+        not found.
+        """
+        entry_dir = self.get_entry_dir(key)
+        try:
+            names = os.listdir(entry_dir)
+            for name in names:
+                shutil.copy2(os.path.join(entry_dir, name), out_dir)
+            # Mark the entry as recently used
+            os.utime(entry_dir)
+        except OSError:
+            # Missing, or evicted in the meantime
+            return None
+
+        return names
+
+    def store(self, key, out_dir, patterns):
+        """Adds the files of out_dir matching the patterns to the cache."""
+        entry_dir = self.get_entry_dir(key)
+        if os.path.exists(entry_dir):
+            return
+
+        os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(prefix='.', dir=os.path.dirname(entry_dir))
+        for pattern in patterns:
+            for path in glob.glob(os.path.join(out_dir, pattern)):
+                if os.path.isfile(path):
+                    shutil.copy2(path, tmp_dir)
+
+        try:
+            # Entries appear atomically, even with concurrent builds
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self.evict()
+
+    def get_entries(self):
+        """Returns the (last use, size, path) of all the cache entries."""
+        entries = []
+        for entry_dir in glob.glob(os.path.join(self.cache_dir, '??', '*')):
+            try:
+                last_use = os.stat(entry_dir).st_mtime
+                size = sum(
+                    entry.stat().st_size for entry in os.scandir(entry_dir)
+                )
+            except OSError:
+                continue
+            entries.append((last_use, size, entry_dir))
+
+        return entries
+
+    def evict(self):
+        """Removes the least recently used entries above the size limit."""
+        if self.max_size is None:
+            return
+
+        entries = sorted(self.get_entries())
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in entries:
+            if total_size <= self.max_size * 1024 * 1024:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
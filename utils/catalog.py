@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+from collections import defaultdict
+
+import yaml
+
+
+class Catalog:
+    """Class to hold the projects, vendors and boards definitions, parsed
+    once and indexed for constant-time lookups.
+
+    On refresh, the catalog is reloaded if one of the YAML files it was built
+    from was added, removed or modified.
+    """
+    def __init__(self, root_dir):
+        self.project_dir = os.path.join(root_dir, 'assets', 'project')
+        self.vendors_file = os.path.join(root_dir, 'assets', 'vendors.yaml')
+        self.boards_file = os.path.join(root_dir, 'assets', 'boards.yaml')
+        self.mtimes = None
+
+    def get_mtimes(self):
+        mtimes = dict()
+        for path in (self.project_dir, self.vendors_file, self.boards_file):
+            mtimes[path] = os.stat(path).st_mtime_ns
+
+        with os.scandir(self.project_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.yaml'):
+                    mtimes[entry.path] = entry.stat().st_mtime_ns
+
+        return mtimes
+
+    def refresh(self):
+        """Reloads the catalog if any of its files changed."""
+        mtimes = self.get_mtimes()
+        if mtimes != self.mtimes:
+            self.load()
+            self.mtimes = mtimes
+
+    def load(self):
+        with open(self.vendors_file, 'r') as fp:
+            self.vendors = yaml.safe_load(fp)
+        with open(self.boards_file, 'r') as fp:
+            self.boards = yaml.safe_load(fp)
+
+        project_files = sorted(
+            name[:-len('.yaml')]
+            for name in os.listdir(self.project_dir)
+            if name.endswith('.yaml')
+        )
+        self.projects = dict()
+        for project_file in project_files:
+            project_fn = os.path.join(
+                self.project_dir, '{}.yaml'.format(project_file)
+            )
+            with open(project_fn, 'r') as fp:
+                self.projects[project_file] = yaml.safe_load(fp)
+
+        self.project_names = {
+            project_file: project['name']
+            for project_file, project in self.projects.items()
+        }
+
+        self.vendor_boards = dict()
+        self.vendors_by_toolchain = defaultdict(list)
+        self.vendors_by_board = defaultdict(list)
+        for vendor, vendor_dict in self.vendors.items():
+            self.vendor_boards[vendor] = set(vendor_dict['boards'])
+            for toolchain in vendor_dict['toolchains']:
+                self.vendors_by_toolchain[toolchain].append(vendor)
+            for board in vendor_dict['boards']:
+                self.vendors_by_board[board].append(vendor)
+
+        self.required = set()
+        for project_file, project in self.projects.items():
+            for toolchain in project.get('required_toolchains', list()):
+                self.required.add((project_file, toolchain))
+
+    def get_project(self, project_file):
+        return self.projects[project_file]
+
+    def get_project_name(self, project_file):
+        return self.project_names[project_file]
+
+    def get_vendor_boards(self, vendor):
+        return self.vendor_boards[vendor]
+
+    def get_project_boards(self, project_file, vendor):
+        """Returns the boards of a vendor supported by a project."""
+        boards = self.projects[project_file]['vendors'].get(vendor) or list()
+        return [
+            board for board in boards if board in self.vendor_boards[vendor]
+        ]
+
+    def is_required(self, project_file, toolchain):
+        return (project_file, toolchain) in self.required
+
+
+catalog = None
+
+
+def load_catalog(root_dir, refresh=False):
+    """Returns the catalog of the given root directory, built once per process.
+
+    The files of the catalog are checked for changes only when refresh is
+    set (e.g. once per run), so that lookups do not touch the file system.
+    """
+    global catalog
+
+    if catalog is None or catalog.project_dir != os.path.join(
+            root_dir, 'assets', 'project'):
+        catalog = Catalog(root_dir)
+        catalog.refresh()
+    elif refresh:
+        catalog.refresh()
+
+    return catalog
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+
+def get_staged_path(stage_dir, path):
+    """Returns the location of the staged copy of a chip database."""
+    path = os.path.realpath(path)
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(stage_dir, digest, os.path.basename(path))
+
+
+def stage_file(stage_dir, path):
+    """Copies a chip database to the staging directory (e.g. a tmpfs), unless
+    an up-to-date copy is already there.
+
+    Returns the size of the copied data, in bytes.
+    """
+    staged_path = get_staged_path(stage_dir, path)
+    stat = os.stat(path)
+    try:
+        staged_stat = os.stat(staged_path)
+        if staged_stat.st_size == stat.st_size and \
+                staged_stat.st_mtime_ns == stat.st_mtime_ns:
+            return 0
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(staged_path))
+    os.close(fd)
+    try:
+        shutil.copy2(path, tmp_path)
+        # Tasks only ever see complete copies
+        os.replace(tmp_path, staged_path)
+    except OSError:
+        os.unlink(tmp_path)
+        raise
+
+    return stat.st_size
+
+
+def set_page_cache(path, warm):
+    """Loads a file into the page cache (warm) or evicts it (cold), so that
+    the tasks loading it are measured in the same conditions."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        if warm:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            while os.read(fd, 1 << 20):
+                pass
+        else:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
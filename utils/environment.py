@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import json
+import os
+import subprocess
+
+from utils.cache import CACHE_DIR, JSONCache
+
+# Variables describing the shell that captured the environment, rather than
+# the environment itself.
+SHELL_VARIABLES = ['PWD', 'OLDPWD', 'SHLVL', '_']
+
+environments_cache = None
+
+
+def capture_environment(script, args=()):
+    """Returns the environment set up by sourcing a shell script (e.g. env.sh)
+    with the given arguments.
+
+    The script is evaluated once per session: the environment is cached on
+    disk, keyed by the script, its modification time, the arguments and the
+    environment it gets sourced from.
+    """
+    global environments_cache
+
+    script = os.path.abspath(script)
+    key = hashlib.sha1(
+        json.dumps(
+            [
+                script,
+                os.stat(script).st_mtime_ns,
+                list(args),
+                sorted(os.environ.items()),
+            ]
+        ).encode('utf-8')
+    ).hexdigest()
+
+    if environments_cache is None:
+        environments_cache = JSONCache(
+            os.path.join(CACHE_DIR, 'environments.json')
+        )
+
+    env = environments_cache.get(key)
+    if env is None:
+        output = subprocess.check_output(
+            [
+                'bash', '-c', 'source "$0" "$@" >/dev/null && env -0', script,
+                *args
+            ],
+            cwd=os.path.dirname(script)
+        )
+
+        env = dict()
+        for variable in output.decode('utf-8').split('\0'):
+            name, sep, value = variable.partition('=')
+            if sep:
+                env[name] = value
+
+        environments_cache.set(key, env)
+
+    env = dict(env)
+    for name in SHELL_VARIABLES:
+        env.pop(name, None)
+        if name in os.environ:
+            env[name] = os.environ[name]
+
+    return env
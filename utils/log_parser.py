@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import re
+import time
+
+
+class Extractor:
+    """Class to describe a metric extracted from a log file.
+
+    Each line of the log, without its line terminator, is searched for the
+    precompiled pattern, and every match is passed to collect(value, match),
+    which returns the new value of the metric. The value starts as initial(),
+    or initial if it is not callable.
+
+    If a section is given, by patterns matching the lines it starts and ends
+    with, only the lines in between are searched. A section is entered again
+    each time its start matches, and lasts until the end of the log if it has
+    no end. With once, the extractor stops at its first match.
+
+    Extractors sharing a name update the same value, in their order, which
+    lets a metric combine several sections of a log.
+    """
+    def __init__(
+        self,
+        name,
+        pattern,
+        collect,
+        initial=None,
+        start=None,
+        end=None,
+        once=False
+    ):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.collect = collect
+        self.initial = initial
+        self.start = re.compile(start) if start is not None else None
+        self.end = re.compile(end) if end is not None else None
+        self.once = once
+
+    def get_initial_value(self):
+        return self.initial() if callable(self.initial) else self.initial
+
+
+class ExtractorState:
+    """Class to hold the state of an extractor while a log is parsed."""
+    def __init__(self, extractor):
+        self.extractor = extractor
+        self.in_section = extractor.start is None
+        self.done = False
+
+    def feed(self, line, values):
+        extractor = self.extractor
+
+        if not self.in_section:
+            if extractor.start is not None and extractor.start.search(line):
+                self.in_section = True
+            return
+
+        if extractor.end is not None and extractor.end.search(line):
+            self.in_section = False
+            return
+
+        match = extractor.pattern.search(line)
+        if match:
+            values[extractor.name
+                   ] = extractor.collect(values[extractor.name], match)
+            self.done = extractor.once
+
+
+def get_initial_values(extractors):
+    values = dict()
+    for extractor in extractors:
+        if extractor.name not in values:
+            values[extractor.name] = extractor.get_initial_value()
+
+    return values
+
+
+def parse_log(log_file, extractors, timings=None):
+    """Streams a log file once, feeding each line to all the extractors.
+
+    Returns the values of the metrics, by name. If a timings dictionary is
+    given, the time spent in each extractor is added to it, by name.
+    """
+    values = get_initial_values(extractors)
+    states = [ExtractorState(extractor) for extractor in extractors]
+    if timings is not None:
+        for extractor in extractors:
+            timings.setdefault(extractor.name, 0.0)
+
+    with open(log_file, 'r') as fp:
+        for line in fp:
+            if not states:
+                # Every extractor found what it was looking for
+                break
+
+            line = line.rstrip('\n')
+            for state in states:
+                if timings is None:
+                    state.feed(line, values)
+                    continue
+
+                start = time.perf_counter()
+                state.feed(line, values)
+                timings[state.extractor.name] += time.perf_counter() - start
+
+            if any(state.done for state in states):
+                states = [state for state in states if not state.done]
+
+    return values
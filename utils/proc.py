@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import os
+import signal
+import time
+from collections import defaultdict, namedtuple
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+ProcessInfo = namedtuple(
+    'ProcessInfo', ['pid', 'state', 'ppid', 'pgrp', 'rss']
+)
+
+
+def get_processes():
+    """Returns a snapshot of the running processes read from /proc.
+
+    The RSS of each process is expressed in MiB.
+    """
+    processes = dict()
+    try:
+        pids = [int(pid) for pid in os.listdir('/proc') if pid.isdigit()]
+    except OSError:
+        return processes
+
+    for pid in pids:
+        try:
+            with open('/proc/{}/stat'.format(pid), 'r') as fp:
+                stat = fp.read()
+        except OSError:
+            # The process exited in the meantime
+            continue
+
+        # The command name may contain spaces, the fields start after it
+        fields = stat[stat.rfind(')') + 2:].split()
+        processes[pid] = ProcessInfo(
+            pid=pid,
+            state=fields[0],
+            ppid=int(fields[1]),
+            pgrp=int(fields[2]),
+            rss=int(fields[21]) * PAGE_SIZE / (1024 * 1024)
+        )
+
+    return processes
+
+
+def get_tree_rss(root_pids, processes=None):
+    """Returns a dictionary with the total RSS (MiB) of the process tree rooted
+    at each of the given pids."""
+    if processes is None:
+        processes = get_processes()
+
+    children = defaultdict(list)
+    for process in processes.values():
+        children[process.ppid].append(process.pid)
+
+    rss = dict()
+    for root_pid in root_pids:
+        total = 0.0
+        stack = [root_pid]
+        while stack:
+            pid = stack.pop()
+            if pid in processes:
+                total += processes[pid].rss
+            stack.extend(children[pid])
+        rss[root_pid] = total
+
+    return rss
+
+
+def get_physical_cores():
+    """Returns the logical CPUs this process may run on, grouped by the
+    physical core they belong to (SMT siblings share a physical core)."""
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+
+    cores = defaultdict(list)
+    for cpu in cpus:
+        topology = '/sys/devices/system/cpu/cpu{}/topology'.format(cpu)
+        try:
+            with open(os.path.join(topology, 'physical_package_id')) as fp:
+                package = int(fp.read())
+            with open(os.path.join(topology, 'core_id')) as fp:
+                core = int(fp.read())
+        except (OSError, ValueError):
+            package, core = None, cpu
+        cores[(package, core)].append(cpu)
+
+    return sorted(cores.values())
+
+
+def set_affinity(cpus):
+    """Pins the calling process, and the processes it spawns, to the given
+    logical CPUs."""
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cpus)
+
+
+def terminate_process_group(pgrp, grace=10.0):
+    """Terminates all the processes of a process group, except the calling
+    one, escalating from SIGTERM to SIGKILL after the grace period.
+
+    This reaches the whole tree of tools spawned by a task (shells, make,
+    place and route tools), including the processes that got reparented.
+    """
+    terminate_process_groups([pgrp], grace)
+
+
+def terminate_process_groups(pgrps, grace=10.0):
+    """Terminates several process groups at once (see
+    terminate_process_group), sharing a single grace period."""
+    pgrps = set(pgrps)
+
+    def get_members():
+        # Zombies are already dead, they are just waiting to be reaped
+        return [
+            process.pid
+            for process in get_processes().values()
+            if process.pgrp in pgrps and process.pid != os.getpid()
+            and process.state != 'Z'
+        ]
+
+    terminate_processes(get_members, grace)
+
+
+def terminate_children(grace=10.0):
+    """Terminates the processes spawned by the calling one.
+
+    If it leads its process group (e.g. a task of exhaust.py), the whole
+    group is terminated. Otherwise (e.g. fpgaperf.py run from a shell), its
+    descendants are, leaving alone the other members of the group, which
+    receive the Ctrl-C of the terminal along with it.
+    """
+    if os.getpgrp() == os.getpid():
+        terminate_process_group(os.getpgrp(), grace)
+        return
+
+    processes = get_processes()
+    children = defaultdict(list)
+    for process in processes.values():
+        children[process.ppid].append(process.pid)
+
+    descendants = set()
+    stack = list(children[os.getpid()])
+    while stack:
+        pid = stack.pop()
+        descendants.add(pid)
+        stack.extend(children[pid])
+
+    def get_members():
+        # The descendants get reparented as their parents exit
+        return [
+            process.pid
+            for process in get_processes().values()
+            if process.pid in descendants and process.state != 'Z'
+        ]
+
+    terminate_processes(get_members, grace)
+
+
+def terminate_processes(get_members, grace):
+    """Sends SIGTERM to the processes returned by get_members, then SIGKILL
+    to the ones still running after the grace period."""
+    def send(pids, sig):
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    send(get_members(), signal.SIGTERM)
+
+    deadline = time.time() + grace
+    members = get_members()
+    while members and time.time() < deadline:
+        time.sleep(0.1)
+        members = get_members()
+
+    send(members, signal.SIGKILL)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+
+from utils.log_parser import Extractor, ExtractorState, get_initial_values
+
+
+class LogTail:
+    """Class to parse a log incrementally, while a tool is writing it.
+
+    Each poll reads what was appended to the log since the previous one and
+    feeds the complete lines to the extractors, whose states are kept between
+    the polls. A log that was replaced or truncated is parsed again from its
+    start.
+    """
+    def __init__(self, log_file, extractors):
+        self.log_file = log_file
+        self.extractors = extractors
+        self.reset(None)
+
+    def reset(self, inode):
+        self.inode = inode
+        self.offset = 0
+        self.partial = b''
+        self.states = [
+            ExtractorState(extractor) for extractor in self.extractors
+        ]
+        self.values = get_initial_values(self.extractors)
+
+    def poll(self):
+        """Parses the new lines of the log.
+
+        Returns the values which changed, by name.
+        """
+        try:
+            st = os.stat(self.log_file)
+            if st.st_ino != self.inode or st.st_size < self.offset:
+                self.reset(st.st_ino)
+            if st.st_size == self.offset:
+                return dict()
+
+            with open(self.log_file, 'rb') as fp:
+                fp.seek(self.offset)
+                data = fp.read()
+        except OSError:
+            # Not created yet, or moved away in the meantime
+            return dict()
+
+        self.offset += len(data)
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+
+        previous = dict(self.values)
+        for line in lines:
+            line = line.decode('utf-8', errors='replace')
+            for state in self.states:
+                if not state.done:
+                    state.feed(line, self.values)
+
+        return {
+            name: value
+            for name, value in self.values.items()
+            if value is not None and value != previous[name]
+        }
+
+
+class ProgressMonitor(threading.Thread):
+    """Class to follow the progress of a run by tailing the logs of its tools
+    in a background thread.
+
+    The extractors of each log (see Toolchain.get_progress_extractors) should
+    produce plain values (e.g. the current stage, the router iteration or the
+    number of overused nodes). Each value that changed since the previous
+    poll is a progress event, passed as (name, value) to the listeners; the
+    latest value of each is written to progress_file, if given, for the
+    runner to display.
+    """
+    def __init__(self, out_dir, extractors, progress_file=None, interval=2.0):
+        super().__init__(daemon=True)
+        self.tails = [
+            LogTail(os.path.join(out_dir, log_name), log_extractors)
+            for log_name, log_extractors in extractors.items()
+        ]
+        self.progress_file = progress_file
+        self.interval = interval
+        self.listeners = []
+        self.status = dict()
+        self.stopped = threading.Event()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def run(self):
+        # The signals of the run (timeout, cancellation, abort) must interrupt
+        # the main thread
+        signal.pthread_sigmask(
+            signal.SIG_BLOCK,
+            [signal.SIGALRM, signal.SIGTERM, signal.SIGINT, signal.SIGUSR1]
+        )
+
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def stop(self):
+        """Stops following the logs, once their last lines were parsed."""
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        self.poll()
+
+    def poll(self):
+        events = []
+        for tail in self.tails:
+            events.extend(tail.poll().items())
+
+        # The listeners get to see the whole status of the poll
+        self.status.update(events)
+        for name, value in events:
+            for listener in self.listeners:
+                listener(name, value)
+
+        if events:
+            self.write()
+
+    def write(self):
+        if self.progress_file is None:
+            return
+
+        status = dict(self.status, updated=time.time())
+        try:
+            fd, tmp_file = tempfile.mkstemp(
+                dir=os.path.dirname(self.progress_file)
+            )
+            with os.fdopen(fd, 'w') as fp:
+                json.dump(status, fp, sort_keys=True)
+            os.replace(tmp_file, self.progress_file)
+        except OSError:
+            # The progress is informative only
+            pass
+
+
+def read_progress(progress_file):
+    """Returns the latest progress written by a ProgressMonitor, if any."""
+    try:
+        with open(progress_file, 'r') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def get_stage_extractor(stage, pattern=r''):
+    """Returns an extractor setting the stage of a run, once a line of the log
+    matches pattern (by default, once the log is written)."""
+    return Extractor('stage', pattern, lambda *_: stage, once=True)
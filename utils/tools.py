@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import glob
+import os
+
+from utils.cache import CACHE_DIR, JSONCache
+from utils.utils import which
+
+
+class ToolIndex:
+    """Class to locate the binaries installed in the conda environments of
+    the repository (env/conda/envs/*/bin).
+
+    The index is persisted on disk and shared by all the tasks and workers.
+    It is validated by the modification times of the indexed directories,
+    which change whenever a binary or an environment is added or removed.
+    """
+    def __init__(self, root_dir):
+        self.root_dir = os.path.abspath(root_dir)
+        self.envs_dir = os.path.join(self.root_dir, 'env', 'conda', 'envs')
+        self.cache = JSONCache(os.path.join(CACHE_DIR, 'tools.json'))
+
+    def get_stamps(self):
+        stamps = dict()
+        for path in [self.envs_dir] + glob.glob(os.path.join(self.envs_dir,
+                                                             '*', 'bin')):
+            try:
+                stamps[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+
+        return stamps
+
+    def get_index(self):
+        stamps = self.get_stamps()
+
+        index = self.cache.get(self.root_dir)
+        if index is not None and index['stamps'] == stamps:
+            return index
+
+        binaries = dict()
+        for bin_dir in sorted(stamps):
+            if bin_dir == self.envs_dir:
+                continue
+            for name in os.listdir(bin_dir):
+                binaries.setdefault(name, bin_dir)
+
+        index = {'stamps': stamps, 'binaries': binaries}
+        self.cache.set(self.root_dir, index)
+
+        return index
+
+    def locate(self, binary):
+        """Returns the directory holding a binary, looking it up in PATH only
+        if it is not installed in the environments of the repository."""
+        bin_dir = self.get_index()['binaries'].get(binary)
+        if bin_dir is not None:
+            return bin_dir
+
+        path = which(binary)
+        if path is not None:
+            return os.path.dirname(os.path.abspath(path))
+
+        return None
+
+
+tool_indices = dict()
+
+
+def locate_binary(root_dir, binary):
+    """Returns the directory holding a toolchain binary."""
+    if root_dir not in tool_indices:
+        tool_indices[root_dir] = ToolIndex(root_dir)
+
+    return tool_indices[root_dir].locate(binary)
@@ -20,6 +20,8 @@
 import time
 import os
 
+from utils.log_parser import Extractor, parse_log
+
 
 class Timed:
     def __init__(self, t, name, unprinted_runtime=False):
@@ -105,26 +107,33 @@ def get_vivado_max_freq(report_file):
     return freqs
 
 
-def get_yosys_resources(yosys_log):
-    with open(yosys_log, "r") as f:
-        data = f.readlines()
-
-    resources = dict()
-    print_stats = False
-    proc_cells = False
-    for line in data:
-        print_stats = "Printing statistics" in line or print_stats
-
-        if not print_stats:
-            continue
-
-        if proc_cells and line.strip():
-            cell, count = line.split()
-            resources[cell] = count
+def get_yosys_extractors():
+    """Returns the extractors of the synthesis runtime and of the cells
+    counted by the statistics of a Yosys log."""
+    def add_cell(resources, match):
+        resources[match.group(1)] = match.group(2)
+        return resources
+
+    return [
+        Extractor(
+            'synthesis',
+            r'CPU: user (\d+\.\d+)s system (\d+\.\d+)s',
+            lambda _, m: float(m.group(1)) + float(m.group(2)),
+            once=True
+        ),
+        Extractor(
+            'cells',
+            r'^\s*(\S+)\s+(\S+)\s*$',
+            add_cell,
+            initial=dict,
+            start=r'Number of cells',
+            end=r'^\s*$'
+        ),
+    ]
 
-        proc_cells = ("Number of cells" in line or proc_cells) and line.strip()
 
-    return resources
+def get_yosys_resources(yosys_log):
+    return parse_log(yosys_log, get_yosys_extractors())['cells']
 
 
 def have_exec(mybin):
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import json
+import os
+import subprocess
+
+from utils.cache import CACHE_DIR, JSONCache
+from utils.utils import which
+
+
+def get_binary_stamp(binary):
+    """Returns the location and modification time of a binary, given its name
+    (looked up in PATH) or its path."""
+    path = which(binary) if os.path.basename(binary) == binary else binary
+    if path is None:
+        return None
+
+    try:
+        return os.path.realpath(path), os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+versions_cache = None
+
+
+def probe_output(cmd, binaries, **kwargs):
+    """Returns the output of a shell command probing the version of tools.
+
+    The output is cached on disk per environment: the command is run again
+    only if PATH, the conda prefix or the location or modification time of
+    one of the given binaries (names or paths) changed.
+    """
+    global versions_cache
+
+    environment = [
+        cmd,
+        sorted(kwargs.items()),
+        os.environ.get('PATH'),
+        os.environ.get('CONDA_PREFIX'),
+        [get_binary_stamp(binary) for binary in binaries if binary],
+    ]
+    key = hashlib.sha1(json.dumps(environment).encode('utf-8')).hexdigest()
+
+    if versions_cache is None:
+        versions_cache = JSONCache(os.path.join(CACHE_DIR, 'versions.json'))
+
+    output = versions_cache.get(key)
+    if output is None:
+        output = subprocess.check_output(
+            cmd, shell=True, universal_newlines=True, **kwargs
+        )
+        versions_cache.set(key, output)
+
+    return output
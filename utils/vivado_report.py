@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright 2018-2022 F4PGA Authors
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import re
+
+# Numbered headings of the report sections, e.g. "7. Primitives" or
+# "1.1 Summary of Registers by Type", underlined by a line of dashes.
+SECTION_HEADING = re.compile(r'[0-9\.]+ (.*)')
+SECTION_UNDERLINE = re.compile(r'-+$')
+
+
+def parse_value(value):
+    """Returns the value of a table cell as an int or a float, if possible."""
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+
+    return value
+
+
+def split_row(line):
+    return [cell.strip() for cell in line.strip()[1:-1].split('|')]
+
+
+def read_report_tables(report_file, sections):
+    """Returns the rows of the tables of the given sections of a Vivado report
+    (e.g. report_utilization), indexed by the lowercase section names.
+
+    The report is read line by line, only the first table of each section
+    (drawn with +---+ borders) is parsed, and reading stops as soon as the
+    tables of all the requested sections were read. Each row is a dictionary
+    indexed by the table header, with the numeric cells converted.
+    """
+    sections = {section.lower() for section in sections}
+    tables = dict()
+    section = None
+    header = None
+    rows = None
+    previous = ''
+
+    with open(report_file, 'r') as fp:
+        for line in fp:
+            line = line.rstrip()
+
+            if rows is not None and line.startswith('|'):
+                cells = split_row(line)
+                if header is None:
+                    header = cells
+                else:
+                    rows.append(dict(zip(header, map(parse_value, cells))))
+                continue
+
+            if line.startswith('+-'):
+                if rows is None and section in sections and \
+                        section not in tables:
+                    header = None
+                    rows = list()
+                continue
+
+            if rows is not None:
+                tables[section] = rows
+                rows = None
+                if len(tables) == len(sections):
+                    break
+
+            if SECTION_UNDERLINE.match(line):
+                match = SECTION_HEADING.match(previous)
+                if match is not None:
+                    section = match.group(1).lower()
+
+            previous = line
+
+    if rows is not None:
+        tables[section] = rows
+
+    return tables